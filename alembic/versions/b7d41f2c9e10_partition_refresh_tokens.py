@@ -0,0 +1,97 @@
+"""partition_refresh_tokens
+
+Opt-in: range-partitions refresh_tokens by expires_at on Postgres so the
+reaper can drop whole months instead of deleting row by row. Run with
+
+    alembic -x partition_refresh_tokens=true upgrade head
+
+Without the flag, or on other databases, the upgrade does nothing.
+
+Revision ID: b7d41f2c9e10
+Revises: 5e3526e9e493
+Create Date: 2026-10-17 09:12:40.118204
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d41f2c9e10'
+down_revision: Union[str, Sequence[str], None] = '5e3526e9e493'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month_start(value: datetime, offset: int = 0) -> datetime:
+    month = value.year * 12 + value.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+def _is_partitioned(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'refresh_tokens')"
+    )).scalar()
+
+
+def _restore_constraints(primary_key: str) -> None:
+    op.execute(f"ALTER TABLE refresh_tokens ADD CONSTRAINT refresh_tokens_pkey PRIMARY KEY ({primary_key})")
+    op.execute(
+        "ALTER TABLE refresh_tokens ADD CONSTRAINT refresh_tokens_user_id_fkey "
+        "FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE"
+    )
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'])
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    enabled = context.get_x_argument(as_dictionary=True).get('partition_refresh_tokens', '')
+    if bind.dialect.name != 'postgresql' or enabled.lower() not in ('1', 'true', 'yes'):
+        return
+    if _is_partitioned(bind):
+        return
+
+    # The primary key must include the partition key, so it becomes
+    # (id, expires_at); ids are random UUIDs and stay unique in practice.
+    op.execute(
+        "CREATE TABLE refresh_tokens_partitioned (LIKE refresh_tokens INCLUDING DEFAULTS) "
+        "PARTITION BY RANGE (expires_at)"
+    )
+    now = datetime.now(timezone.utc).replace(tzinfo=None)
+    oldest = bind.execute(sa.text("SELECT min(expires_at) FROM refresh_tokens")).scalar() or now
+    month = _month_start(min(oldest, now))
+    last = _month_start(now, MONTHS_AHEAD)
+    while month <= last:
+        end = _month_start(month, 1)
+        op.execute(
+            f"CREATE TABLE refresh_tokens_p{month:%Y%m} PARTITION OF refresh_tokens_partitioned "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+        )
+        month = end
+    # Catches rows beyond the prepared months if partition upkeep lags
+    op.execute("CREATE TABLE refresh_tokens_default PARTITION OF refresh_tokens_partitioned DEFAULT")
+
+    op.execute("INSERT INTO refresh_tokens_partitioned SELECT * FROM refresh_tokens")
+    op.drop_table('refresh_tokens')
+    op.rename_table('refresh_tokens_partitioned', 'refresh_tokens')
+    _restore_constraints('id, expires_at')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql' or not _is_partitioned(bind):
+        return
+
+    op.execute("CREATE TABLE refresh_tokens_plain (LIKE refresh_tokens INCLUDING DEFAULTS)")
+    op.execute("INSERT INTO refresh_tokens_plain SELECT * FROM refresh_tokens")
+    op.drop_table('refresh_tokens')
+    op.rename_table('refresh_tokens_plain', 'refresh_tokens')
+    _restore_constraints('id')
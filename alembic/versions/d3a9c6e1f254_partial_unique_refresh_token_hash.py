@@ -0,0 +1,63 @@
+"""partial_unique_refresh_token_hash
+
+Replaces the full index on refresh_tokens.token_hash with a unique index
+over active (non-revoked) tokens only.
+
+Revision ID: d3a9c6e1f254
+Revises: b7d41f2c9e10
+Create Date: 2026-10-17 11:03:52.640117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a9c6e1f254'
+down_revision: Union[str, Sequence[str], None] = 'b7d41f2c9e10'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+INDEX_NAME = 'uq_refresh_tokens_active_token_hash'
+ACTIVE = sa.text('revoked = false')
+
+
+def _is_partitioned(bind) -> bool:
+    if bind.dialect.name != 'postgresql':
+        return False
+    return bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'refresh_tokens')"
+    )).scalar()
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if _is_partitioned(bind):
+        # Unique indexes on a partitioned table must include the partition key.
+        op.create_index(
+            INDEX_NAME, 'refresh_tokens', ['token_hash', 'expires_at'],
+            unique=True, postgresql_where=ACTIVE,
+        )
+    elif bind.dialect.name == 'postgresql':
+        # Build without blocking refreshes on a large table.
+        with op.get_context().autocommit_block():
+            op.create_index(
+                INDEX_NAME, 'refresh_tokens', ['token_hash'],
+                unique=True, postgresql_where=ACTIVE, postgresql_concurrently=True,
+            )
+    else:
+        op.create_index(
+            INDEX_NAME, 'refresh_tokens', ['token_hash'],
+            unique=True, sqlite_where=ACTIVE,
+        )
+    op.drop_index('ix_refresh_tokens_token_hash', table_name='refresh_tokens')
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.create_index('ix_refresh_tokens_token_hash', 'refresh_tokens', ['token_hash'])
+    op.drop_index(INDEX_NAME, table_name='refresh_tokens')
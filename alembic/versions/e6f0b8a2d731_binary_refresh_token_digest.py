@@ -0,0 +1,175 @@
+"""binary_refresh_token_digest
+
+Stores refresh token hashes as 32-byte token_digest values (backfilled from
+the hex token_hash) and, on SQLite, UUIDs as 16 raw bytes. token_hash stays
+as a nullable column with a small partial index over rows that have no
+digest, for instances still writing hex during the rollout; drop it once
+REFRESH_TOKEN_LEGACY_HEX is disabled everywhere.
+
+Revision ID: e6f0b8a2d731
+Revises: d3a9c6e1f254
+Create Date: 2026-10-17 13:41:09.552830
+
+"""
+import uuid
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e6f0b8a2d731'
+down_revision: Union[str, Sequence[str], None] = 'd3a9c6e1f254'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+BATCH_SIZE = 10_000
+OLD_INDEX = 'uq_refresh_tokens_active_token_hash'
+DIGEST_INDEX = 'uq_refresh_tokens_active_token_digest'
+LEGACY_INDEX = 'ix_refresh_tokens_legacy_token_hash'
+GUID_COLUMNS = {'users': ['id'], 'refresh_tokens': ['id', 'user_id']}
+
+
+def _is_partitioned(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'refresh_tokens')"
+    )).scalar()
+
+
+def _rewrite_rows(bind, table: str, columns: list[str], where: str, convert) -> None:
+    """Set new values, from ``convert(row)``, on the rows matching ``where``."""
+    rows = bind.execute(sa.text(
+        f"SELECT rowid, {', '.join(columns)} FROM {table} WHERE {where}"
+    )).mappings().all()
+    if not rows:
+        return
+    values = [{'_rowid': row['rowid'], **convert(row)} for row in rows]
+    assignments = ', '.join(f"{column} = :{column}" for column in values[0] if column != '_rowid')
+    update_sql = sa.text(f"UPDATE {table} SET {assignments} WHERE rowid = :_rowid")
+    for start in range(0, len(values), BATCH_SIZE):
+        bind.execute(update_sql, values[start:start + BATCH_SIZE])
+
+
+def _uuid_bytes(value) -> bytes:
+    if isinstance(value, bytes):
+        value = value.decode()
+    return uuid.UUID(value).bytes
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        _upgrade_postgresql(bind)
+    else:
+        _upgrade_sqlite(bind)
+
+
+def _upgrade_postgresql(bind) -> None:
+    op.add_column('refresh_tokens', sa.Column('token_digest', sa.LargeBinary(32), nullable=True))
+    op.alter_column('refresh_tokens', 'token_hash', existing_type=sa.String(), nullable=True)
+    # Backfill in batches so no single statement rewrites the whole table.
+    while bind.execute(sa.text(
+        "UPDATE refresh_tokens SET token_digest = decode(token_hash, 'hex') "
+        "WHERE id IN (SELECT id FROM refresh_tokens "
+        "WHERE token_digest IS NULL AND token_hash IS NOT NULL LIMIT :n)"
+    ), {'n': BATCH_SIZE}).rowcount:
+        pass
+
+    if _is_partitioned(bind):
+        # Unique indexes on a partitioned table must include the partition key.
+        op.create_index(
+            DIGEST_INDEX, 'refresh_tokens', ['token_digest', 'expires_at'],
+            unique=True, postgresql_where=sa.text('revoked = false'),
+        )
+        op.create_index(
+            LEGACY_INDEX, 'refresh_tokens', ['token_hash'],
+            postgresql_where=sa.text('token_digest IS NULL'),
+        )
+    else:
+        with op.get_context().autocommit_block():
+            op.create_index(
+                DIGEST_INDEX, 'refresh_tokens', ['token_digest'],
+                unique=True, postgresql_where=sa.text('revoked = false'),
+                postgresql_concurrently=True,
+            )
+            op.create_index(
+                LEGACY_INDEX, 'refresh_tokens', ['token_hash'],
+                postgresql_where=sa.text('token_digest IS NULL'),
+                postgresql_concurrently=True,
+            )
+    op.drop_index(OLD_INDEX, table_name='refresh_tokens')
+
+
+def _upgrade_sqlite(bind) -> None:
+    op.drop_index(OLD_INDEX, table_name='refresh_tokens')
+    for table, columns in GUID_COLUMNS.items():
+        with op.batch_alter_table(table) as batch:
+            if table == 'refresh_tokens':
+                batch.add_column(sa.Column('token_digest', sa.LargeBinary(32), nullable=True))
+                batch.alter_column('token_hash', existing_type=sa.String(), nullable=True)
+            for column in columns:
+                batch.alter_column(column, existing_type=sa.String(36), type_=sa.LargeBinary(16))
+
+    # The table rebuild casts the text UUIDs to 36-byte blobs; pack them.
+    for table, columns in GUID_COLUMNS.items():
+        _rewrite_rows(
+            bind, table, columns, f"length({columns[0]}) = 36",
+            lambda row, columns=columns: {c: _uuid_bytes(row[c]) for c in columns},
+        )
+    _rewrite_rows(
+        bind, 'refresh_tokens', ['token_hash'],
+        'token_digest IS NULL AND token_hash IS NOT NULL',
+        lambda row: {'token_digest': bytes.fromhex(row['token_hash'])},
+    )
+    op.create_index(
+        DIGEST_INDEX, 'refresh_tokens', ['token_digest'],
+        unique=True, sqlite_where=sa.text('revoked = false'),
+    )
+    op.create_index(
+        LEGACY_INDEX, 'refresh_tokens', ['token_hash'],
+        sqlite_where=sa.text('token_digest IS NULL'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    if bind.dialect.name == 'postgresql':
+        bind.execute(sa.text(
+            "UPDATE refresh_tokens SET token_hash = encode(token_digest, 'hex') "
+            "WHERE token_hash IS NULL"
+        ))
+        columns = ['token_hash', 'expires_at'] if _is_partitioned(bind) else ['token_hash']
+        op.create_index(
+            OLD_INDEX, 'refresh_tokens', columns,
+            unique=True, postgresql_where=sa.text('revoked = false'),
+        )
+        op.drop_index(LEGACY_INDEX, table_name='refresh_tokens')
+        op.drop_index(DIGEST_INDEX, table_name='refresh_tokens')
+        op.drop_column('refresh_tokens', 'token_digest')
+        op.alter_column('refresh_tokens', 'token_hash', existing_type=sa.String(), nullable=False)
+        return
+
+    bind.execute(sa.text(
+        "UPDATE refresh_tokens SET token_hash = lower(hex(token_digest)) WHERE token_hash IS NULL"
+    ))
+    op.drop_index(LEGACY_INDEX, table_name='refresh_tokens')
+    op.drop_index(DIGEST_INDEX, table_name='refresh_tokens')
+    for table, columns in GUID_COLUMNS.items():
+        _rewrite_rows(
+            bind, table, columns, f"length({columns[0]}) = 16",
+            lambda row, columns=columns: {c: str(uuid.UUID(bytes=row[c])) for c in columns},
+        )
+        with op.batch_alter_table(table) as batch:
+            if table == 'refresh_tokens':
+                batch.drop_column('token_digest')
+                batch.alter_column('token_hash', existing_type=sa.String(), nullable=False)
+            for column in columns:
+                batch.alter_column(column, existing_type=sa.LargeBinary(16), type_=sa.String(36))
+    op.create_index(
+        OLD_INDEX, 'refresh_tokens', ['token_hash'],
+        unique=True, sqlite_where=sa.text('revoked = false'),
+    )
@@ -0,0 +1,116 @@
+"""user_sessions
+
+Adds the user_sessions table and refresh_tokens.session_id. Every active
+refresh token becomes its own session, reusing the token's id, so existing
+logins show up in the session list and can be revoked individually.
+
+Revision ID: f2c81d5a7b36
+Revises: e6f0b8a2d731
+Create Date: 2026-10-17 15:20:47.381902
+
+"""
+from datetime import datetime, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2c81d5a7b36'
+down_revision: Union[str, Sequence[str], None] = 'e6f0b8a2d731'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+LIST_INDEX = 'ix_user_sessions_user_id_revoked_created_at'
+SESSION_INDEX = 'ix_refresh_tokens_active_session_id'
+SESSIONLESS_INDEX = 'ix_refresh_tokens_sessionless_user_id'
+
+
+def _is_partitioned(bind) -> bool:
+    return bind.execute(sa.text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+        "JOIN pg_class c ON c.oid = p.partrelid WHERE c.relname = 'refresh_tokens')"
+    )).scalar()
+
+
+def _guid(bind):
+    if bind.dialect.name == 'postgresql':
+        return postgresql.UUID(as_uuid=True)
+    return sa.LargeBinary(16)
+
+
+def _create_token_indexes(**kw) -> None:
+    op.create_index(
+        SESSION_INDEX, 'refresh_tokens', ['session_id'],
+        postgresql_where=sa.text('revoked = false'),
+        sqlite_where=sa.text('revoked = false'),
+        **kw,
+    )
+    op.create_index(
+        SESSIONLESS_INDEX, 'refresh_tokens', ['user_id'],
+        postgresql_where=sa.text('session_id IS NULL'),
+        sqlite_where=sa.text('session_id IS NULL'),
+        **kw,
+    )
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    bind = op.get_bind()
+    op.create_table(
+        'user_sessions',
+        sa.Column('id', _guid(bind), primary_key=True),
+        sa.Column('user_id', _guid(bind), sa.ForeignKey('users.id', ondelete='CASCADE'), nullable=False),
+        sa.Column('device_label', sa.String(100), nullable=True),
+        sa.Column('ip_address', sa.String(45), nullable=True),
+        sa.Column('user_agent', sa.String(512), nullable=True),
+        sa.Column('revoked', sa.Boolean(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('last_used_at', sa.DateTime(), nullable=False),
+    )
+    op.create_index(LIST_INDEX, 'user_sessions', ['user_id', 'revoked', 'created_at'])
+
+    session_id = sa.Column(
+        'session_id', _guid(bind),
+        sa.ForeignKey('user_sessions.id', name='fk_refresh_tokens_session_id', ondelete='CASCADE'),
+        nullable=True,
+    )
+    if bind.dialect.name == 'postgresql':
+        op.add_column('refresh_tokens', session_id)
+    else:
+        with op.batch_alter_table('refresh_tokens') as batch:
+            batch.add_column(session_id)
+
+    active = {'now': datetime.now(timezone.utc).replace(tzinfo=None)}
+    bind.execute(sa.text(
+        "INSERT INTO user_sessions (id, user_id, revoked, created_at, last_used_at) "
+        "SELECT id, user_id, false, created_at, created_at FROM refresh_tokens "
+        "WHERE revoked = false AND expires_at > :now"
+    ), active)
+    bind.execute(sa.text(
+        "UPDATE refresh_tokens SET session_id = id "
+        "WHERE revoked = false AND expires_at > :now"
+    ), active)
+
+    if bind.dialect.name == 'postgresql' and not _is_partitioned(bind):
+        with op.get_context().autocommit_block():
+            _create_token_indexes(postgresql_concurrently=True)
+    else:
+        _create_token_indexes()
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    bind = op.get_bind()
+    op.drop_index(SESSIONLESS_INDEX, table_name='refresh_tokens')
+    op.drop_index(SESSION_INDEX, table_name='refresh_tokens')
+    if bind.dialect.name == 'postgresql':
+        op.drop_constraint('fk_refresh_tokens_session_id', 'refresh_tokens', type_='foreignkey')
+        op.drop_column('refresh_tokens', 'session_id')
+    else:
+        with op.batch_alter_table('refresh_tokens') as batch:
+            batch.drop_column('session_id')
+    op.drop_index(LIST_INDEX, table_name='user_sessions')
+    op.drop_table('user_sessions')
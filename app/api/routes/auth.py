@@ -1,17 +1,26 @@
 """
 Authentication routes.
 """
-from datetime import datetime, timezone, timedelta
+import logging
+import math
+import uuid
+from datetime import timedelta
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
-from sqlalchemy import and_
-from jose import jwt, JWTError
-
-from app.core.dependencies import get_current_user
-from app.db.models import User, RefreshToken
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import select, update
+from sqlalchemy.exc import IntegrityError
+from jose import JWTError
+
+from app.core.dependencies import get_current_db_user
+from app.db.models import User, RefreshToken, utc_now_naive
+from app.db.refresh_tokens import (
+    digest_columns,
+    revoke_refresh_tokens,
+    rotate_refresh_token,
+)
+from app.db.user_sessions import new_session, revoke_all_sessions
 from app.db.session import get_db
 from app.schemas.auth import (
     RegisterRequest,
@@ -19,53 +28,133 @@ from app.schemas.auth import (
     RefreshRequest,
     TokenResponse,
 )
+from app.core.hashing import HashingPoolBusy, ahash_password, averify_password
 from app.core.security import (
     create_access_token,
     create_refresh_token,
-    hash_user_password,
-    verify_user_password,
-    hash_refresh_token,
+    decode_access_token,
+    refresh_token_digest,
 )
 from app.core.config import settings
+from app.core.rate_limit import RateLimit, client_identifier
+from auth.password import needs_rehash
+from auth.validator import is_breached
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Authentication"])
 security = HTTPBearer()
 
 
+async def _store_upgraded_hash(
+    bind, user_id: uuid.UUID, old_hash: str, new_hash: str
+) -> None:
+    """Swap in the new hash unless the password changed in the meantime."""
+    # The request session is closed once the response is sent, so use a
+    # fresh one on the same engine.
+    async with AsyncSession(bind=bind) as db:
+        await db.execute(
+            update(User)
+            .where(User.id == user_id, User.password_hash == old_hash)
+            .values(password_hash=new_hash)
+        )
+        await db.commit()
+
+
+async def _upgrade_password_hash(
+    bind, user_id: uuid.UUID, password: str, old_hash: str
+) -> None:
+    """Re-hash a verified password with the current Argon2 parameters."""
+    try:
+        new_hash = await ahash_password(password)
+    except HashingPoolBusy:
+        # Best effort: the next login will try again.
+        return
+    await _store_upgraded_hash(bind, user_id, old_hash, new_hash)
+    logger.info("Upgraded password hash parameters for user %s", user_id)
+
+
+async def _open_session(
+    db: AsyncSession,
+    request: Request,
+    user_id: uuid.UUID,
+    device_label: str | None,
+    queue: bool = True,
+) -> str:
+    """Store a new session and its first refresh token; returns the token.
+
+    Without the write-behind queue (or with ``queue`` false) the rows are
+    only added to ``db`` and the caller commits.
+    """
+    session = new_session(
+        user_id,
+        device_label=device_label,
+        ip_address=client_identifier(request),
+        user_agent=request.headers.get("user-agent"),
+    )
+    refresh_token_value = create_refresh_token()
+    token = RefreshToken(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        session_id=session.id,
+        **digest_columns(refresh_token_digest(refresh_token_value)),
+        expires_at=session.created_at
+        + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        revoked=False,
+        created_at=session.created_at,
+    )
+    writer = getattr(request.app.state, "token_writer", None)
+    if writer and queue:
+        await writer.open_session(session, token)
+    else:
+        db.add_all([session, token])
+    return refresh_token_value
+
+
 @router.post(
     "/register",
     response_model=TokenResponse,
     status_code=status.HTTP_201_CREATED,
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))]
+    dependencies=[Depends(RateLimit("register", "5/minute"))]
 )
-def register(payload: RegisterRequest, db: Session = Depends(get_db)):
+async def register(
+    payload: RegisterRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
     """Register a new user."""
-    existing_user = db.query(User).filter(User.email == payload.email).first()
-    if existing_user:
+    if await is_breached(payload.password):
         raise HTTPException(
-            status_code=status.HTTP_409_CONFLICT,
-            detail="Email already registered",
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This password has appeared in a data breach; choose another",
         )
 
+    # One transaction: ids are generated here, so nothing needs to be read
+    # back, and the unique index on email decides duplicates.
     user = User(
+        id=uuid.uuid4(),
         email=payload.email,
-        password_hash=hash_user_password(payload.password),
+        password_hash=await ahash_password(payload.password),
+        is_active=True,
+        token_version=1,
+        created_at=utc_now_naive(),
     )
     db.add(user)
-    db.commit()
-    db.refresh(user)
+    # The user is not committed yet, so this cannot go through the
+    # write-behind queue.
+    refresh_token_value = await _open_session(
+        db, request, user.id, payload.device_label, queue=False
+    )
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Email already registered",
+        )
 
     access_token = create_access_token(str(user.id), user.token_version)
-    refresh_token_value = create_refresh_token()
-
-    db.add(
-        RefreshToken(
-            user_id=user.id,
-            token_hash=hash_refresh_token(refresh_token_value),
-            expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-        )
-    )
-    db.commit()
 
     return TokenResponse(
         access_token=access_token,
@@ -76,13 +165,32 @@ def register(payload: RegisterRequest, db: Session = Depends(get_db)):
 @router.post(
     "/login",
     response_model=TokenResponse,
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))]
+    dependencies=[Depends(RateLimit("login", "5/minute"))]
 )
-def login(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login(
+    payload: LoginRequest,
+    request: Request,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+):
     """Login with email and password."""
-    user = db.query(User).filter(User.email == payload.email).first()
+    # Reject locked-out accounts and IPs before any database or Argon2 work.
+    throttle = getattr(request.app.state, "login_throttle", None)
+    client_ip = client_identifier(request)
+    if throttle:
+        retry_after = await throttle.check(payload.email, client_ip)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many failed login attempts, try again later",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
+
+    user = await db.scalar(select(User).where(User.email == payload.email))
 
-    if not user or not verify_user_password(payload.password, user.password_hash):
+    if not user or not await averify_password(payload.password, user.password_hash):
+        if throttle:
+            await throttle.record_failure(payload.email, client_ip)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid email or password",
@@ -94,17 +202,23 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
             detail="Account is deactivated",
         )
 
-    access_token = create_access_token(str(user.id), user.token_version)
-    refresh_token_value = create_refresh_token()
+    if throttle:
+        await throttle.record_success(payload.email, client_ip)
 
-    db.add(
-        RefreshToken(
-            user_id=user.id,
-            token_hash=hash_refresh_token(refresh_token_value),
-            expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+    if needs_rehash(user.password_hash):
+        background_tasks.add_task(
+            _upgrade_password_hash,
+            db.bind,
+            user.id,
+            payload.password,
+            user.password_hash,
         )
+
+    access_token = create_access_token(str(user.id), user.token_version)
+    refresh_token_value = await _open_session(
+        db, request, user.id, payload.device_label
     )
-    db.commit()
+    await db.commit()
 
     return TokenResponse(
         access_token=access_token,
@@ -115,44 +229,34 @@ def login(payload: LoginRequest, db: Session = Depends(get_db)):
 @router.post(
     "/refresh",
     response_model=TokenResponse,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))]
+    dependencies=[Depends(RateLimit("refresh", "10/minute"))]
 )
-def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
+async def refresh(
+    payload: RefreshRequest,
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+):
     """Refresh access token using refresh token."""
-    hashed = hash_refresh_token(payload.refresh_token)
-
-    token = (
-        db.query(RefreshToken)
-        .filter(
-            and_(
-                RefreshToken.token_hash == hashed,
-                RefreshToken.revoked == False,
-                RefreshToken.expires_at > datetime.now(timezone.utc),
-            )
-        )
-        .first()
+    writer = getattr(request.app.state, "token_writer", None)
+    new_refresh = create_refresh_token()
+    now = utc_now_naive()
+    rotated = await rotate_refresh_token(
+        db,
+        refresh_token_digest(payload.refresh_token),
+        refresh_token_digest(new_refresh),
+        now + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        touch_session=writer is None,
     )
 
-    if not token:
+    if not rotated:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired refresh token",
         )
+    if writer and rotated.session_id is not None:
+        await writer.touch_session(rotated.session_id, now)
 
-    token.revoked = True
-
-    user = db.query(User).filter(User.id == token.user_id).first()
-    new_access = create_access_token(str(token.user_id), user.token_version)
-    new_refresh = create_refresh_token()
-
-    db.add(
-        RefreshToken(
-            user_id=token.user_id,
-            token_hash=hash_refresh_token(new_refresh),
-            expires_at=datetime.now(timezone.utc) + timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
-        )
-    )
-    db.commit()
+    new_access = create_access_token(str(rotated.user_id), rotated.token_version)
 
     return TokenResponse(
         access_token=new_access,
@@ -162,29 +266,26 @@ def refresh(payload: RefreshRequest, db: Session = Depends(get_db)):
 
 @router.post(
     "/logout",
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))]
+    dependencies=[Depends(RateLimit("logout", "10/minute"))]
 )
 async def logout(
     request: Request,
     payload: RefreshRequest,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     credentials: HTTPAuthorizationCredentials = Depends(security),
 ):
-    """Logout - revoke refresh token AND blacklist access token."""
-    hashed = hash_refresh_token(payload.refresh_token)
-    db_token = db.query(RefreshToken).filter(RefreshToken.token_hash == hashed).first()
-
-    if db_token:
-        db_token.revoked = True
-        db.commit()
+    """Logout - end the token's session, revoke it AND blacklist access token."""
+    digest = refresh_token_digest(payload.refresh_token)
+    writer = getattr(request.app.state, "token_writer", None)
+    if writer:
+        await writer.revoke(digest)
+    else:
+        await revoke_refresh_tokens(db, [digest])
+        await db.commit()
 
     access_token = credentials.credentials
     try:
-        token_payload = jwt.decode(
-            access_token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        token_payload = decode_access_token(access_token)
         jti = token_payload.get("jti")
         exp = token_payload.get("exp")
 
@@ -199,20 +300,17 @@ async def logout(
 
 @router.post(
     "/logout-all",
-    dependencies=[Depends(RateLimiter(times=5, seconds=60))]
+    dependencies=[Depends(RateLimit("logout_all", "5/minute"))]
 )
 async def logout_all_devices(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_user),
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user: User = Depends(get_current_db_user),
 ):
     """Logout from all devices by incrementing token_version."""
     current_user.token_version += 1
-
-    db.query(RefreshToken).filter(
-        RefreshToken.user_id == current_user.id,
-        RefreshToken.revoked == False
-    ).update({"revoked": True})
-
-    db.commit()
+    await revoke_all_sessions(db, current_user.id)
+    await db.commit()
+    await request.app.state.user_cache.invalidate(current_user.id)
 
     return {"message": "All sessions invalidated"}
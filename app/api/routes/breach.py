@@ -0,0 +1,35 @@
+"""
+k-anonymity range queries against the local breached-password store.
+"""
+
+import asyncio
+
+from fastapi import APIRouter, HTTPException, Path, Request, Response, status
+
+from app.core.config import settings
+from auth.breach import RANGE_PREFIX_LENGTH, ShardedBreachStore
+
+router = APIRouter(prefix="/breached-passwords", tags=["Breached passwords"])
+
+
+@router.get("/range/{prefix}")
+async def breach_range(
+    request: Request,
+    prefix: str = Path(pattern=f"^[0-9A-Fa-f]{{{RANGE_PREFIX_LENGTH}}}$"),
+):
+    """
+    Suffixes of the breached SHA-1 hashes starting with ``prefix``, one per
+    line, in the format of the Pwned Passwords range API.
+    """
+    store = getattr(request.app.state, "breach_store", None)
+    if not settings.BREACHED_PASSWORDS_SERVE or not isinstance(
+        store, ShardedBreachStore
+    ):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    suffixes = await asyncio.to_thread(store.range, prefix.upper())
+    return Response(
+        content="".join(f"{suffix}\r\n" for suffix in suffixes),
+        media_type="text/plain",
+        # The store only changes on deploy, so shared caches can absorb load
+        headers={"Cache-Control": "public, max-age=86400"},
+    )
@@ -0,0 +1,34 @@
+"""
+Public key discovery for local token verification.
+"""
+
+import hashlib
+import json
+
+from fastapi import APIRouter, Request, Response
+
+from app.core.config import settings
+from app.core.security import jwt_codec
+
+router = APIRouter(tags=["Keys"])
+
+# Keys only change on deploy, so the document and its ETag are built once.
+_JWKS_BODY = json.dumps(jwt_codec.jwks(), separators=(",", ":")).encode()
+_JWKS_ETAG = f'"{hashlib.sha256(_JWKS_BODY).hexdigest()[:32]}"'
+_CACHE_HEADERS = {
+    "Cache-Control": f"public, max-age={settings.JWKS_MAX_AGE_SECONDS}",
+    "ETag": _JWKS_ETAG,
+}
+
+
+@router.get("/.well-known/jwks.json")
+def jwks(request: Request):
+    """JSON Web Key Set of the keys that verify access tokens."""
+    if_none_match = request.headers.get("If-None-Match", "")
+    if _JWKS_ETAG in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers=_CACHE_HEADERS)
+    return Response(
+        content=_JWKS_BODY,
+        media_type="application/jwk-set+json",
+        headers=_CACHE_HEADERS,
+    )
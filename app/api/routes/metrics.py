@@ -0,0 +1,19 @@
+"""
+Prometheus scrape endpoint.
+"""
+
+from fastapi import APIRouter, Response
+
+from app.core.config import settings
+from app.core.metrics import render_latest
+
+router = APIRouter(tags=["Health"])
+
+
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus text exposition of the service metrics."""
+    if not settings.METRICS_ENABLED:
+        return Response(status_code=404)
+    body, content_type = render_latest()
+    return Response(content=body, media_type=content_type)
@@ -1,20 +1,27 @@
 """
 Protected user routes - require authentication.
 """
-from fastapi import APIRouter, Depends, HTTPException, status
-from fastapi_limiter.depends import RateLimiter
-from sqlalchemy.orm import Session
+import uuid
 
-from app.core.dependencies import get_current_user
-from app.core.security import hash_user_password, verify_user_password
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.dependencies import get_current_db_user, get_current_user
+from app.core.user_cache import UserSnapshot
+from app.core.hashing import ahash_password, averify_password
+from app.core.rate_limit import RateLimit
 from app.db.session import get_db
 from app.db.models import User
+from app.db.user_sessions import list_sessions, revoke_session
 from app.schemas.user import (
     UserResponse,
     UserProfileResponse,
     UpdateProfileRequest,
     ChangePasswordRequest,
+    SessionListResponse,
 )
+from auth.validator import is_breached
 
 router = APIRouter(prefix="/users", tags=["Users"])
 
@@ -22,10 +29,10 @@ router = APIRouter(prefix="/users", tags=["Users"])
 @router.get(
     "/me",
     response_model=UserProfileResponse,
-    dependencies=[Depends(RateLimiter(times=30, seconds=60))]
+    dependencies=[Depends(RateLimit("read_profile", "30/minute"))]
 )
 async def get_current_user_profile(
-    current_user: User = Depends(get_current_user),
+    current_user: UserSnapshot = Depends(get_current_user),
 ):
     """
     Get current authenticated user's profile.
@@ -37,19 +44,20 @@ async def get_current_user_profile(
 @router.patch(
     "/me",
     response_model=UserProfileResponse,
-    dependencies=[Depends(RateLimiter(times=10, seconds=60))]
+    dependencies=[Depends(RateLimit("update_profile", "10/minute"))]
 )
 async def update_profile(
+    request: Request,
     payload: UpdateProfileRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_db_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Update current user's profile.
     """
     if payload.email and payload.email != current_user.email:
         # Check if email is already taken
-        existing = db.query(User).filter(User.email == payload.email).first()
+        existing = await db.scalar(select(User).where(User.email == payload.email))
         if existing:
             raise HTTPException(
                 status_code=status.HTTP_409_CONFLICT,
@@ -57,52 +65,111 @@ async def update_profile(
             )
         current_user.email = payload.email
 
-    db.commit()
-    db.refresh(current_user)
+    await db.commit()
+    await db.refresh(current_user)
+    await request.app.state.user_cache.invalidate(current_user.id)
 
     return current_user
 
 
 @router.post(
     "/me/change-password",
-    dependencies=[Depends(RateLimiter(times=3, seconds=60))]
+    dependencies=[Depends(RateLimit("change_password", "3/minute"))]
 )
 async def change_password(
+    request: Request,
     payload: ChangePasswordRequest,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_db_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Change current user's password.
     Rate limited: 3 requests per 60 seconds.
     """
     # Verify current password
-    if not verify_user_password(payload.current_password, current_user.password_hash):
+    if not await averify_password(payload.current_password, current_user.password_hash):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Current password is incorrect",
         )
 
+    if await is_breached(payload.new_password):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="This password has appeared in a data breach; choose another",
+        )
+
     # Update password
-    current_user.password_hash = hash_user_password(payload.new_password)
-    db.commit()
+    current_user.password_hash = await ahash_password(payload.new_password)
+    await db.commit()
+    await request.app.state.user_cache.invalidate(current_user.id)
 
     return {"message": "Password changed successfully"}
 
 
+@router.get(
+    "/me/sessions",
+    response_model=SessionListResponse,
+    dependencies=[Depends(RateLimit("list_sessions", "30/minute"))]
+)
+async def get_sessions(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: str | None = None,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    List the current user's active sessions, newest first.
+    Pass next_cursor as cursor to fetch the following page.
+    """
+    try:
+        sessions, next_cursor = await list_sessions(db, current_user.id, limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor",
+        )
+    return SessionListResponse(items=sessions, next_cursor=next_cursor)
+
+
+@router.delete(
+    "/me/sessions/{session_id}",
+    dependencies=[Depends(RateLimit("revoke_session", "10/minute"))]
+)
+async def delete_session(
+    session_id: uuid.UUID,
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
+):
+    """
+    Sign out one device. Its refresh token stops working; access tokens
+    already issued to it remain valid until they expire.
+    """
+    if not await revoke_session(db, current_user.id, session_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Session not found",
+        )
+    await db.commit()
+
+    return {"message": "Session revoked"}
+
+
 @router.delete(
     "/me",
-    dependencies=[Depends(RateLimiter(times=3, seconds=60))]
+    dependencies=[Depends(RateLimit("delete_account", "3/minute"))]
 )
 async def delete_account(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db),
+    request: Request,
+    current_user: User = Depends(get_current_db_user),
+    db: AsyncSession = Depends(get_db),
 ):
     """
     Deactivate current user's account.
     This performs a soft delete (sets is_active to False).
     """
     current_user.is_active = False
-    db.commit()
+    await db.commit()
+    await request.app.state.user_cache.invalidate(current_user.id)
 
     return {"message": "Account deactivated successfully"}
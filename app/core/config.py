@@ -1,6 +1,8 @@
 """
 Application configuration.
 """
+from typing import Literal
+
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import field_validator
 
@@ -10,15 +12,140 @@ class Settings(BaseSettings):
 
     # Database
     DATABASE_URL: str = "postgresql+psycopg2://postgres:postgres@db:5432/auth_db"
+    # Derived from DATABASE_URL (asyncpg / aiosqlite) when not set
+    ASYNC_DATABASE_URL: str | None = None
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_RECYCLE_SECONDS: int = 1800
+    DB_POOL_TIMEOUT_SECONDS: float = 30.0
+    # "always" pings on every checkout, "idle" only after the connection sat
+    # in the pool for DB_PRE_PING_IDLE_SECONDS, "never" disables pinging
+    DB_PRE_PING: Literal["always", "idle", "never"] = "idle"
+    DB_PRE_PING_IDLE_SECONDS: float = 30.0
+    DB_SLOW_CHECKOUT_MS: float = 100.0
+    # Tables missing at startup: "auto" runs create_all unless the database
+    # is at the Alembic head, "always" runs it, "never" leaves it to Alembic
+    DB_CREATE_TABLES: Literal["auto", "always", "never"] = "auto"
 
-    # Redis
+    # Redis (REDIS_MAX_CONNECTIONS caps this process's pool; requests wait
+    # for a free connection at the cap)
     REDIS_URL: str = "redis://redis:6379/0"
+    REDIS_MAX_CONNECTIONS: int | None = None
+
+    # Token blacklist: per-worker Bloom filter answering negative lookups
+    BLACKLIST_LOCAL_FILTER: bool = True
+    BLACKLIST_FILTER_CAPACITY: int = 100_000
+    BLACKLIST_FILTER_ERROR_RATE: float = 0.001
+    BLACKLIST_FILTER_REBUILD_SECONDS: float = 300.0
+    # Concurrent lookups reaching Redis within the window share one MGET
+    # (0 disables batching)
+    BLACKLIST_BATCH_WINDOW_MS: float = 1.0
+    BLACKLIST_BATCH_MAX_SIZE: int = 128
 
     # JWT
     JWT_SECRET_KEY: str = "your-super-secret-key-change-in-production-min-32-chars"
     JWT_ALGORITHM: str = "HS256"
+    # EdDSA / ES256: PEM private key used for signing, plus PEM public keys
+    # of previous signing keys that should still verify during rotation
+    JWT_PRIVATE_KEY_FILE: str | None = None
+    JWT_PUBLIC_KEY_FILES: list[str] = []
+    JWKS_MAX_AGE_SECONDS: int = 300
+    # "jose" (python-jose) or "hmac" (precomputed HMAC, HS* only)
+    JWT_BACKEND: Literal["jose", "hmac"] = "jose"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     REFRESH_TOKEN_EXPIRE_DAYS: int = 7
+    # Verified access-token claims cached per worker (0 disables)
+    JWT_DECODE_CACHE_SIZE: int = 10_000
+    # Also write and match the legacy hex token_hash column; turn off once
+    # every instance stores binary token_digest values
+    REFRESH_TOKEN_LEGACY_HEX: bool = True
+
+    # Refresh token cleanup (interval 0 disables the in-process reaper;
+    # `python -m app.db.reaper` runs it once)
+    REFRESH_TOKEN_REAPER_INTERVAL_SECONDS: float = 3600.0
+    REFRESH_TOKEN_REAPER_BATCH_SIZE: int = 1000
+    # Monthly partitions created ahead when refresh_tokens is partitioned
+    REFRESH_TOKEN_PARTITION_MONTHS_AHEAD: int = 2
+    # Batch session/token inserts, logout revocations and last-used updates
+    # from concurrent requests into one commit per window. "flush" answers
+    # after the batch commits; "async" answers before it (see
+    # app/db/write_behind.py for what can be lost); "off" commits per request
+    REFRESH_TOKEN_WRITE_BEHIND: Literal["off", "flush", "async"] = "off"
+    REFRESH_TOKEN_WRITE_BEHIND_WINDOW_MS: float = 2.0
+    REFRESH_TOKEN_WRITE_BEHIND_MAX_BATCH: int = 256
+    # Queued writes beyond which "async" callers wait for the commit
+    REFRESH_TOKEN_WRITE_BEHIND_MAX_PENDING: int = 10_000
+
+    # Argon2 parameters (ARGON2_CALIBRATE benchmarks the host at startup,
+    # once in the app.server master, and overrides the fixed costs below)
+    ARGON2_TIME_COST: int = 3
+    ARGON2_MEMORY_COST_KIB: int = 64 * 1024
+    ARGON2_PARALLELISM: int = 2
+    ARGON2_CALIBRATE: bool = False
+    ARGON2_TARGET_MS: float = 250.0
+    ARGON2_MEMORY_BUDGET_KIB: int = 64 * 1024
+
+    # Breached/common password list for auth.validator: an index built with
+    # `python -m auth.blacklist build` or a plain-text list (unset: bundled list)
+    PASSWORD_BLACKLIST_PATH: str | None = None
+    # SHA-1 breach corpus checked on register and change-password: a local
+    # store built with `python -m auth.breach build`, or else the range API
+    # of a pod serving one (BREACHED_PASSWORDS_SERVE) or of HIBP. Remote
+    # failures allow the password unless BREACHED_PASSWORDS_FAIL_CLOSED
+    BREACHED_PASSWORDS_PATH: str | None = None
+    BREACHED_PASSWORDS_URL: str | None = None
+    BREACHED_PASSWORDS_TIMEOUT_SECONDS: float = 0.5
+    BREACHED_PASSWORDS_FAIL_CLOSED: bool = False
+    BREACHED_PASSWORDS_SERVE: bool = False
+
+    # Password hashing pool
+    HASH_POOL_KIND: Literal["process", "thread"] = "process"
+    HASH_POOL_WORKERS: int = 2
+    HASH_POOL_MAX_QUEUE: int = 32
+    HASH_POOL_RETRY_AFTER_SECONDS: int = 1
+
+    # Authenticated user cache (TTL 0 disables it)
+    USER_CACHE_MAX_SIZE: int = 10_000
+    USER_CACHE_TTL_SECONDS: float = 30.0
+
+    # Rate limiting. RATE_LIMITS overrides per-route defaults by name, e.g.
+    # {"login": "10/minute"}; the local tier admits requests without Redis
+    # until a key has used RATE_LIMIT_LOCAL_FRACTION of its limit
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_ALGORITHM: Literal["sliding_window", "token_bucket"] = "sliding_window"
+    RATE_LIMIT_LOCAL_FRACTION: float = 0.5
+    RATE_LIMIT_MAX_KEYS: int = 100_000
+    RATE_LIMITS: dict[str, str] = {}
+
+    # Peers whose X-Forwarded-For is trusted when keying rate limits, login
+    # throttles and session IPs: addresses or CIDR ranges, "*" for any.
+    # Requests from other peers are keyed on the peer address.
+    FORWARDED_ALLOW_IPS: list[str] = ["127.0.0.1", "::1"]
+
+    # Failed-login throttle: after the threshold, each further failure
+    # doubles the lockout (from the base, capped at the max)
+    LOGIN_THROTTLE_ENABLED: bool = True
+    LOGIN_ACCOUNT_MAX_FAILURES: int = 5
+    LOGIN_IP_MAX_FAILURES: int = 20
+    LOGIN_FAILURE_WINDOW_SECONDS: float = 900.0
+    LOGIN_LOCKOUT_BASE_SECONDS: float = 30.0
+    LOGIN_LOCKOUT_MAX_SECONDS: float = 900.0
+    LOGIN_THROTTLE_LOCAL_TTL_SECONDS: float = 2.0
+
+    # Server (python -m app.server). SERVER_WORKERS=0 starts one worker per
+    # available CPU. The budgets are totals split evenly between workers
+    # (DB_POOL_SIZE + DB_MAX_OVERFLOW and REDIS_MAX_CONNECTIONS per worker);
+    # unset, every worker gets the per-process values. The hashing budget
+    # caps HASH_POOL_WORKERS the same way and defaults to the available CPUs
+    SERVER_WORKERS: int = 1
+    SERVER_DB_CONNECTION_BUDGET: int | None = None
+    SERVER_REDIS_CONNECTION_BUDGET: int | None = None
+    SERVER_HASH_POOL_BUDGET: int | None = None
+    SERVER_GRACEFUL_TIMEOUT_SECONDS: float = 30.0
+    SERVER_READY_TIMEOUT_SECONDS: float = 60.0
+
+    # Metrics (/metrics; set PROMETHEUS_MULTIPROC_DIR when running several workers)
+    METRICS_ENABLED: bool = True
 
     # CORS
     ALLOWED_ORIGINS: list[str] = [
@@ -27,11 +154,13 @@ class Settings(BaseSettings):
         "http://127.0.0.1:3000",
     ]
 
-    @field_validator("ALLOWED_ORIGINS", mode="before")
+    @field_validator(
+        "ALLOWED_ORIGINS", "JWT_PUBLIC_KEY_FILES", "FORWARDED_ALLOW_IPS", mode="before"
+    )
     @classmethod
     def parse_origins(cls, v):
         if isinstance(v, str):
-            return [origin.strip() for origin in v.split(",")]
+            return [origin.strip() for origin in v.split(",") if origin.strip()]
         return v
 
     model_config = SettingsConfigDict(
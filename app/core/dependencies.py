@@ -1,14 +1,20 @@
 """
 Authentication dependencies.
 """
+import time
+import uuid
+
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from jose import JWTError, jwt
-from sqlalchemy.orm import Session
+from jose import JWTError
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.config import settings
+from app.core.metrics import BLACKLIST_LOOKUP
+from app.core.security import decode_access_token
 from app.db.session import get_db
 from app.db.models import User
+from app.core.user_cache import UserSnapshot
 
 security = HTTPBearer()
 
@@ -16,10 +22,13 @@ security = HTTPBearer()
 async def get_current_user(
     request: Request,  # Add request to access app.state
     credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
+    db: AsyncSession = Depends(get_db)
+) -> UserSnapshot:
     """
     Validate access token and check blacklist before returning user.
+
+    Returns a read-only snapshot, served from the user cache when possible.
+    Routes that modify the user should depend on ``get_current_db_user``.
     """
     token = credentials.credentials
 
@@ -36,11 +45,7 @@ async def get_current_user(
     )
 
     try:
-        payload = jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM]
-        )
+        payload = decode_access_token(token)
 
         jti: str = payload.get("jti")
         user_id: str = payload.get("sub")
@@ -49,18 +54,42 @@ async def get_current_user(
         if user_id is None or jti is None:
             raise credentials_exception
 
+        try:
+            user_uuid = uuid.UUID(user_id)
+        except (TypeError, ValueError):
+            raise credentials_exception
+
         # Check if token is blacklisted (use app.state.token_blacklist)
         token_blacklist = request.app.state.token_blacklist
-        if token_blacklist and await token_blacklist.is_blacklisted(jti):
-            raise revoked_exception
+        if token_blacklist:
+            start = time.perf_counter()
+            revoked = await token_blacklist.is_blacklisted(jti)
+            BLACKLIST_LOOKUP.observe(time.perf_counter() - start)
+            if revoked:
+                raise revoked_exception
 
     except JWTError:
         raise credentials_exception
 
-    # Fetch user from database
-    user = db.query(User).filter(User.id == user_id).first()
+    # Fetch user from cache, falling back to the database. A version
+    # mismatch against a cached snapshot may just mean this worker has not
+    # seen the invalidation yet, so it is re-checked against the database.
+    user_cache = getattr(request.app.state, "user_cache", None)
+    user = user_cache.get(user_id) if user_cache else None
+    if (
+        user is not None
+        and token_version is not None
+        and user.token_version != token_version
+    ):
+        user = None
     if user is None:
-        raise credentials_exception
+        epoch = user_cache.epoch() if user_cache else 0
+        db_user = await db.scalar(select(User).where(User.id == user_uuid))
+        if db_user is None:
+            raise credentials_exception
+        user = UserSnapshot.from_user(db_user)
+        if user_cache:
+            user_cache.put(user, epoch)
 
     # Check token version (logout-all-devices support)
     if token_version is not None and user.token_version != token_version:
@@ -69,9 +98,26 @@ async def get_current_user(
     return user
 
 
-async def get_current_active_user(
-    current_user: User = Depends(get_current_user)
+async def get_current_db_user(
+    current_user: UserSnapshot = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db),
 ) -> User:
+    """
+    Load the authenticated user's row for routes that modify it.
+    """
+    user = await db.get(User, current_user.id)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return user
+
+
+async def get_current_active_user(
+    current_user: UserSnapshot = Depends(get_current_user)
+) -> UserSnapshot:
     """
     Ensure user is active.
     """
@@ -0,0 +1,231 @@
+"""
+Bounded executor for Argon2 password hashing.
+
+Argon2 is deliberately CPU and memory hungry, so it must never run on the
+event loop or in the shared Starlette threadpool. Hashes are submitted to a
+dedicated pool with a fixed number of workers and a bounded queue; once the
+queue is full new work is shed with ``HashingPoolBusy`` (mapped to a 503 with
+``Retry-After`` in ``app.main``).
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable
+
+from app.core.config import settings
+from app.core.metrics import (
+    ARGON2_HASH,
+    ARGON2_IN_FLIGHT,
+    ARGON2_QUEUE_DEPTH,
+    ARGON2_QUEUE_WAIT,
+    ARGON2_REJECTED,
+    ARGON2_VERIFY,
+)
+from auth import password as password_module
+from auth.calibration import HashParameters, calibrate
+from auth.password import hash_password, verify_password
+
+logger = logging.getLogger(__name__)
+
+
+class HashingPoolBusy(Exception):
+    """Raised when the hashing queue is full and the request is shed."""
+
+    def __init__(self, retry_after: int):
+        super().__init__("Password hashing pool is at capacity")
+        self.retry_after = retry_after
+
+
+def _timed_hash(password: str) -> tuple[str, float]:
+    """Hash in a worker and report the time spent executing."""
+    start = time.perf_counter()
+    result = hash_password(password)
+    return result, time.perf_counter() - start
+
+
+def _timed_verify(password: str, hashed: str) -> tuple[bool, float]:
+    """Verify in a worker and report the time spent executing."""
+    start = time.perf_counter()
+    result = verify_password(password, hashed)
+    return result, time.perf_counter() - start
+
+
+class HashingExecutor:
+    """Fixed-size worker pool with admission control for password hashing."""
+
+    def __init__(
+        self,
+        workers: int = 2,
+        max_queue: int = 32,
+        kind: str = "process",
+        retry_after: int = 1,
+    ):
+        if workers < 1:
+            raise ValueError("workers must be at least 1")
+        if max_queue < 0:
+            raise ValueError("max_queue must not be negative")
+
+        self.workers = workers
+        self.max_queue = max_queue
+        self.kind = kind
+        self.retry_after = retry_after
+        self.parameters: HashParameters | None = None
+        self._executor: Executor | None = None
+
+        # Only touched from the event loop thread, so no locking is needed.
+        self._pending = 0
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_seconds_total = 0.0
+        self._wait_seconds_max = 0.0
+        self._exec_seconds_total = 0.0
+
+    @property
+    def capacity(self) -> int:
+        """Maximum number of hashes running or waiting at once."""
+        return self.workers + self.max_queue
+
+    def configure(self, parameters: HashParameters) -> None:
+        """Use ``parameters`` for new hashes in this process and in workers."""
+        self.parameters = parameters
+        password_module.configure(
+            parameters.time_cost, parameters.memory_cost, parameters.parallelism
+        )
+        # Worker processes are initialised once; restart them lazily.
+        if self.kind == "process":
+            self.shutdown()
+
+    def start(self) -> None:
+        """Create the underlying pool (idempotent)."""
+        if self._executor is not None:
+            return
+        if self.kind == "process":
+            initargs = ()
+            if self.parameters is not None:
+                initargs = (
+                    self.parameters.time_cost,
+                    self.parameters.memory_cost,
+                    self.parameters.parallelism,
+                )
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=password_module.configure if initargs else None,
+                initargs=initargs,
+            )
+        else:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.workers,
+                thread_name_prefix="argon2",
+            )
+        logger.info(
+            "Hashing pool started (%s, workers=%d, max_queue=%d)",
+            self.kind,
+            self.workers,
+            self.max_queue,
+        )
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the pool; a later submit will start a fresh one."""
+        if self._executor is None:
+            return
+        self._executor.shutdown(wait=wait, cancel_futures=True)
+        self._executor = None
+
+    def _set_pending(self, pending: int) -> None:
+        self._pending = pending
+        ARGON2_IN_FLIGHT.set(min(pending, self.workers))
+        ARGON2_QUEUE_DEPTH.set(max(0, pending - self.workers))
+
+    async def _submit(
+        self, timer, fn: Callable[..., tuple[Any, float]], *args: Any
+    ) -> Any:
+        if self._pending >= self.capacity:
+            self._rejected += 1
+            ARGON2_REJECTED.inc()
+            raise HashingPoolBusy(self.retry_after)
+
+        self.start()
+        loop = asyncio.get_running_loop()
+        self._set_pending(self._pending + 1)
+        self._submitted += 1
+        submitted_at = time.perf_counter()
+        try:
+            result, exec_seconds = await loop.run_in_executor(self._executor, fn, *args)
+        finally:
+            self._set_pending(self._pending - 1)
+
+        wait_seconds = max(0.0, time.perf_counter() - submitted_at - exec_seconds)
+        self._completed += 1
+        self._wait_seconds_total += wait_seconds
+        self._exec_seconds_total += exec_seconds
+        if wait_seconds > self._wait_seconds_max:
+            self._wait_seconds_max = wait_seconds
+        timer.observe(exec_seconds)
+        ARGON2_QUEUE_WAIT.observe(wait_seconds)
+        return result
+
+    async def hash(self, password: str) -> str:
+        """Hash a password in the pool."""
+        return await self._submit(ARGON2_HASH, _timed_hash, password)
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        """Verify a password against its hash in the pool."""
+        return await self._submit(ARGON2_VERIFY, _timed_verify, password, hashed)
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and wait-time metrics."""
+        completed = self._completed or 1
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": min(self._pending, self.workers),
+            "queue_depth": max(0, self._pending - self.workers),
+            "submitted": self._submitted,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "wait_ms_avg": round(self._wait_seconds_total / completed * 1000, 2),
+            "wait_ms_max": round(self._wait_seconds_max * 1000, 2),
+            "exec_ms_avg": round(self._exec_seconds_total / completed * 1000, 2),
+        }
+
+
+def resolve_hash_parameters() -> HashParameters:
+    """Argon2 parameters from settings, calibrated on this host if enabled."""
+    if settings.ARGON2_CALIBRATE:
+        params = calibrate(
+            target_ms=settings.ARGON2_TARGET_MS,
+            memory_budget_kib=settings.ARGON2_MEMORY_BUDGET_KIB,
+            parallelism=settings.ARGON2_PARALLELISM,
+        )
+        logger.info("Calibrated Argon2 parameters: %s", params)
+        return params
+    return HashParameters(
+        time_cost=settings.ARGON2_TIME_COST,
+        memory_cost=settings.ARGON2_MEMORY_COST_KIB,
+        parallelism=settings.ARGON2_PARALLELISM,
+    )
+
+
+# Singleton instance (started/stopped by the application lifespan)
+hashing_executor = HashingExecutor(
+    workers=settings.HASH_POOL_WORKERS,
+    max_queue=settings.HASH_POOL_MAX_QUEUE,
+    kind=settings.HASH_POOL_KIND,
+    retry_after=settings.HASH_POOL_RETRY_AFTER_SECONDS,
+)
+
+
+async def ahash_password(password: str) -> str:
+    """Hash a password without blocking the event loop."""
+    return await hashing_executor.hash(password)
+
+
+async def averify_password(password: str, hashed: str) -> bool:
+    """Verify a password without blocking the event loop."""
+    return await hashing_executor.verify(password, hashed)
@@ -0,0 +1,325 @@
+"""
+JWT encoding/decoding backends.
+
+``JoseCodec`` delegates to python-jose. ``HMACCodec`` is a minimal HS256/384/512
+implementation that keeps the keyed HMAC state and the encoded header
+precomputed, which makes minting and verifying tokens several times cheaper.
+``AsymmetricCodec`` signs with Ed25519 or P-256 keys so other services can
+verify tokens from the published JWKS. All raise python-jose's exception
+types so callers can keep catching ``JWTError``.
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import time
+from abc import ABC, abstractmethod
+from calendar import timegm
+from datetime import datetime
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from cryptography.hazmat.primitives.asymmetric.utils import (
+    decode_dss_signature,
+    encode_dss_signature,
+)
+from jose import jwt
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+_HMAC_DIGESTS = {
+    "HS256": hashlib.sha256,
+    "HS384": hashlib.sha384,
+    "HS512": hashlib.sha512,
+}
+
+ASYMMETRIC_ALGORITHMS = ("EdDSA", "ES256")
+
+
+class JWTCodec(ABC):
+    """Signs and verifies JWTs with a fixed key and algorithm."""
+
+    algorithm: str
+
+    @abstractmethod
+    def encode(self, claims: dict) -> str:
+        """Sign ``claims`` and return the compact token."""
+
+    @abstractmethod
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        """Verify ``token`` and return its claims."""
+
+    def jwks(self) -> dict:
+        """Public keys for local verification (none for shared secrets)."""
+        return {"keys": []}
+
+
+class JoseCodec(JWTCodec):
+    """python-jose backed codec."""
+
+    def __init__(self, key: str | bytes, algorithm: str = "HS256"):
+        self.key = key
+        self.algorithm = algorithm
+
+    def encode(self, claims: dict) -> str:
+        return jwt.encode(claims, self.key, algorithm=self.algorithm)
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        return jwt.decode(
+            token,
+            self.key,
+            algorithms=[self.algorithm],
+            options={"verify_exp": verify_exp},
+        )
+
+
+def _b64encode(data: bytes) -> bytes:
+    return base64.urlsafe_b64encode(data).rstrip(b"=")
+
+
+def _b64decode(segment: str) -> bytes:
+    try:
+        return base64.urlsafe_b64decode(segment + "=" * (-len(segment) % 4))
+    except (ValueError, TypeError):
+        raise JWTError("Invalid token encoding")
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return timegm(value.utctimetuple())
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class _CompactCodec(JWTCodec):
+    """Shared JWS compact serialization for the hand-rolled codecs."""
+
+    _header_segment: bytes
+
+    def _encoded_header(self, header: dict) -> bytes:
+        return _b64encode(json.dumps(header, separators=(",", ":")).encode())
+
+    @abstractmethod
+    def _sign(self, signing_input: bytes) -> bytes:
+        """Return the raw signature for ``signing_input``."""
+
+    @abstractmethod
+    def _verify(self, header: dict, signing_input: bytes, signature: bytes) -> None:
+        """Raise ``JWTError`` unless ``signature`` is valid for ``header``."""
+
+    def encode(self, claims: dict) -> str:
+        payload = json.dumps(claims, separators=(",", ":"), default=_json_default)
+        signing_input = self._header_segment + b"." + _b64encode(payload.encode())
+        return (signing_input + b"." + _b64encode(self._sign(signing_input))).decode()
+
+    def decode(self, token: str, verify_exp: bool = True) -> dict:
+        if not isinstance(token, str):
+            raise JWTError("Invalid token type")
+        try:
+            header_segment, payload_segment, signature_segment = token.split(".")
+        except ValueError:
+            raise JWTError("Not enough segments")
+
+        try:
+            header = json.loads(_b64decode(header_segment))
+        except ValueError:
+            raise JWTError("Invalid header string")
+        if not isinstance(header, dict):
+            raise JWTError("Invalid header string: must be a json object")
+
+        signing_input = f"{header_segment}.{payload_segment}".encode()
+        self._verify(header, signing_input, _b64decode(signature_segment))
+
+        try:
+            claims = json.loads(_b64decode(payload_segment))
+        except ValueError:
+            raise JWTError("Invalid payload string")
+        if not isinstance(claims, dict):
+            raise JWTError("Invalid payload string: must be a json object")
+
+        _validate_time_claims(claims, verify_exp)
+        return claims
+
+
+class HMACCodec(_CompactCodec):
+    """Hand-rolled HMAC-SHA2 codec with precomputed key state."""
+
+    def __init__(self, key: str | bytes, algorithm: str = "HS256"):
+        digest = _HMAC_DIGESTS.get(algorithm)
+        if digest is None:
+            raise ValueError(f"HMACCodec does not support {algorithm!r}")
+        if isinstance(key, str):
+            key = key.encode()
+        self.algorithm = algorithm
+        # hmac.copy() reuses the inner/outer padded key state, so each token
+        # only pays for hashing its own bytes.
+        self._mac = hmac.new(key, digestmod=digest)
+        self._header_segment = self._encoded_header({"alg": algorithm, "typ": "JWT"})
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        mac = self._mac.copy()
+        mac.update(signing_input)
+        return mac.digest()
+
+    def _verify(self, header: dict, signing_input: bytes, signature: bytes) -> None:
+        if header.get("alg") != self.algorithm:
+            raise JWTError("The specified alg value is not allowed")
+        if not hmac.compare_digest(self._sign(signing_input), signature):
+            raise JWTError("Signature verification failed.")
+
+
+def _public_jwk(public_key) -> dict:
+    """Required JWK members for a public key (RFC 7517/8037)."""
+    if isinstance(public_key, ed25519.Ed25519PublicKey):
+        raw = public_key.public_bytes(
+            serialization.Encoding.Raw, serialization.PublicFormat.Raw
+        )
+        return {"crv": "Ed25519", "kty": "OKP", "x": _b64encode(raw).decode()}
+    if isinstance(public_key, ec.EllipticCurvePublicKey) and isinstance(
+        public_key.curve, ec.SECP256R1
+    ):
+        numbers = public_key.public_numbers()
+        return {
+            "crv": "P-256",
+            "kty": "EC",
+            "x": _b64encode(numbers.x.to_bytes(32, "big")).decode(),
+            "y": _b64encode(numbers.y.to_bytes(32, "big")).decode(),
+        }
+    raise ValueError("Only Ed25519 and P-256 keys are supported")
+
+
+def _key_algorithm(public_key) -> str:
+    return "EdDSA" if isinstance(public_key, ed25519.Ed25519PublicKey) else "ES256"
+
+
+def key_thumbprint(public_key) -> str:
+    """RFC 7638 JWK thumbprint, used as the ``kid``."""
+    canonical = json.dumps(
+        _public_jwk(public_key), separators=(",", ":"), sort_keys=True
+    )
+    return _b64encode(hashlib.sha256(canonical.encode()).digest()).decode()
+
+
+class AsymmetricCodec(_CompactCodec):
+    """EdDSA (Ed25519) / ES256 codec with ``kid`` based key rotation.
+
+    Tokens are signed with ``signing_key`` and verified against its public
+    key plus any ``verification_keys`` still in rotation, selected by the
+    ``kid`` header. ``jwks()`` publishes every verification key so other
+    services can validate tokens locally.
+    """
+
+    def __init__(self, signing_key, verification_keys=()):
+        public_key = signing_key.public_key()
+        self.algorithm = _key_algorithm(public_key)
+        self.kid = key_thumbprint(public_key)
+        self._signing_key = signing_key
+        self._keys: dict[str, tuple[str, object]] = {
+            self.kid: (self.algorithm, public_key)
+        }
+        for key in verification_keys:
+            self._keys.setdefault(key_thumbprint(key), (_key_algorithm(key), key))
+        self._header_segment = self._encoded_header(
+            {"alg": self.algorithm, "kid": self.kid, "typ": "JWT"}
+        )
+
+    @classmethod
+    def from_pem(cls, private_pem: bytes, public_pems=()) -> "AsymmetricCodec":
+        signing_key = serialization.load_pem_private_key(private_pem, password=None)
+        return cls(
+            signing_key,
+            [serialization.load_pem_public_key(pem) for pem in public_pems],
+        )
+
+    def _sign(self, signing_input: bytes) -> bytes:
+        if self.algorithm == "EdDSA":
+            return self._signing_key.sign(signing_input)
+        r, s = decode_dss_signature(
+            self._signing_key.sign(signing_input, ec.ECDSA(hashes.SHA256()))
+        )
+        return r.to_bytes(32, "big") + s.to_bytes(32, "big")
+
+    def _verify(self, header: dict, signing_input: bytes, signature: bytes) -> None:
+        entry = self._keys.get(header.get("kid"))
+        if entry is None:
+            raise JWTError("Unknown key id")
+        algorithm, public_key = entry
+        if header.get("alg") != algorithm:
+            raise JWTError("The specified alg value is not allowed")
+        try:
+            if algorithm == "EdDSA":
+                public_key.verify(signature, signing_input)
+            else:
+                if len(signature) != 64:
+                    raise InvalidSignature()
+                der = encode_dss_signature(
+                    int.from_bytes(signature[:32], "big"),
+                    int.from_bytes(signature[32:], "big"),
+                )
+                public_key.verify(der, signing_input, ec.ECDSA(hashes.SHA256()))
+        except InvalidSignature:
+            raise JWTError("Signature verification failed.")
+
+    def jwks(self) -> dict:
+        """JSON Web Key Set of every key that verifies tokens."""
+        return {
+            "keys": [
+                {**_public_jwk(key), "kid": kid, "alg": algorithm, "use": "sig"}
+                for kid, (algorithm, key) in self._keys.items()
+            ]
+        }
+
+
+def _numeric_date(claims: dict, name: str, label: str) -> int | None:
+    # Like jose, accept anything int() does, e.g. floats from other issuers
+    if name not in claims:
+        return None
+    try:
+        return int(claims[name])
+    except (TypeError, ValueError):
+        raise JWTClaimsError(f"{label} claim ({name}) must be an integer.")
+
+
+def _validate_time_claims(claims: dict, verify_exp: bool) -> None:
+    """Check ``iat``, ``nbf`` and ``exp`` in the order python-jose does."""
+    now = timegm(time.gmtime())
+    _numeric_date(claims, "iat", "Issued At")
+    nbf = _numeric_date(claims, "nbf", "Not Before")
+    if nbf is not None and nbf > now:
+        raise JWTClaimsError("The token is not yet valid (nbf)")
+    if verify_exp:
+        exp = _numeric_date(claims, "exp", "Expiration Time")
+        if exp is not None and exp < now:
+            raise ExpiredSignatureError("Signature has expired.")
+
+
+_BACKENDS = {
+    "jose": JoseCodec,
+    "hmac": HMACCodec,
+}
+
+
+def build_codec(
+    backend: str,
+    key: str | bytes,
+    algorithm: str,
+    verification_keys: tuple[bytes, ...] = (),
+) -> JWTCodec:
+    """Instantiate the configured codec backend.
+
+    For EdDSA/ES256 ``key`` is the PEM private key and ``verification_keys``
+    are PEM public keys still accepted during rotation; these algorithms
+    always use ``AsymmetricCodec`` whatever the backend.
+    """
+    if algorithm in ASYMMETRIC_ALGORITHMS:
+        if isinstance(key, str):
+            key = key.encode()
+        codec = AsymmetricCodec.from_pem(key, verification_keys)
+        if codec.algorithm != algorithm:
+            raise ValueError(f"Signing key does not match JWT algorithm {algorithm!r}")
+        return codec
+    try:
+        codec_cls = _BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown JWT backend {backend!r}")
+    return codec_cls(key, algorithm)
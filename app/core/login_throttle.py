@@ -0,0 +1,173 @@
+"""
+Credential-stuffing throttle for the login endpoint.
+
+Failed logins are counted per account and per source IP. Once either count
+reaches its threshold the key is locked out for an exponentially growing
+period, and ``check`` rejects further attempts before any database or
+Argon2 work happens. State lives in Redis so every worker sees it; each
+worker caches lock lookups briefly so an attack in progress is rejected
+without a Redis round-trip. Without Redis the counters are kept per worker.
+"""
+
+import hashlib
+import logging
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Optional
+
+from app.core.metrics import LOGIN_THROTTLE_CACHED_KEYS, LOGIN_THROTTLE_REJECTED
+
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+
+
+logger = logging.getLogger(__name__)
+
+
+class LoginThrottle:
+    """Per-account and per-IP failed-login tracking with backoff lockout."""
+
+    def __init__(
+        self,
+        redis_client: Optional["aioredis.Redis"] = None,
+        max_account_failures: int = 5,
+        max_ip_failures: int = 20,
+        failure_window: float = 900.0,
+        base_lockout: float = 30.0,
+        max_lockout: float = 900.0,
+        local_ttl: float = 2.0,
+        max_keys: int = 100_000,
+    ):
+        self._redis = redis_client
+        self.prefix = "login_throttle:"
+        self.max_account_failures = max_account_failures
+        self.max_ip_failures = max_ip_failures
+        self.failure_window = failure_window
+        self.base_lockout = base_lockout
+        self.max_lockout = max_lockout
+        self.local_ttl = local_ttl
+        self.max_keys = max_keys
+        # key -> (locked_until, cached_until); wall-clock seconds
+        self._locks: OrderedDict[str, tuple[float, float]] = OrderedDict()
+        # Only used without Redis: key -> (failures, window_ends)
+        self._failures: OrderedDict[str, tuple[int, float]] = OrderedDict()
+        self.rejected = 0
+
+    @staticmethod
+    def _keys(email: str, ip: str) -> tuple[str, str]:
+        # Hash the address so Redis keys carry no personal data.
+        account = hashlib.sha256(email.strip().lower().encode()).hexdigest()[:32]
+        return f"acct:{account}", f"ip:{ip}"
+
+    def _lockout(self, failures: int, threshold: int) -> float:
+        if failures < threshold:
+            return 0.0
+        return min(self.max_lockout, self.base_lockout * 2 ** (failures - threshold))
+
+    def _cache(self, key: str, locked_until: float, now: float) -> None:
+        cached_until = max(locked_until, now + self.local_ttl)
+        self._locks[key] = (locked_until, cached_until)
+        self._locks.move_to_end(key)
+        while len(self._locks) > self.max_keys:
+            self._locks.popitem(last=False)
+        LOGIN_THROTTLE_CACHED_KEYS.set(len(self._locks))
+
+    async def check(self, email: str, ip: str) -> float:
+        """Seconds until a login for ``email`` from ``ip`` may be attempted."""
+        now = time.time()
+        keys = self._keys(email, ip)
+        locked_until = 0.0
+        missing = []
+        for key in keys:
+            cached = self._locks.get(key)
+            if cached is not None and cached[1] > now:
+                locked_until = max(locked_until, cached[0])
+            else:
+                missing.append(key)
+
+        if missing and locked_until <= now and self._redis is not None:
+            try:
+                values = await self._redis.mget(
+                    [f"{self.prefix}lock:{key}" for key in missing]
+                )
+            except Exception as e:
+                logger.warning(f"Login throttle lookup failed: {e}")
+                values = [None] * len(missing)
+            for key, value in zip(missing, values):
+                until = float(value) if value else 0.0
+                self._cache(key, until, now)
+                locked_until = max(locked_until, until)
+
+        if locked_until > now:
+            self.rejected += 1
+            LOGIN_THROTTLE_REJECTED.inc()
+            return locked_until - now
+        return 0.0
+
+    async def record_failure(self, email: str, ip: str) -> None:
+        """Count a failed login and lock out keys past their threshold."""
+        account_key, ip_key = self._keys(email, ip)
+        now = time.time()
+        try:
+            failures = await self._incr_failures([account_key, ip_key], now)
+        except Exception as e:
+            logger.warning(f"Login throttle update failed: {e}")
+            return
+
+        for key, count, threshold in (
+            (account_key, failures[0], self.max_account_failures),
+            (ip_key, failures[1], self.max_ip_failures),
+        ):
+            lockout = self._lockout(count, threshold)
+            if lockout:
+                await self._lock(key, now + lockout, lockout)
+                self._cache(key, now + lockout, now)
+
+    async def record_success(self, email: str, ip: str) -> None:
+        """Clear the account's failure count after a successful login."""
+        account_key, _ = self._keys(email, ip)
+        self._locks.pop(account_key, None)
+        LOGIN_THROTTLE_CACHED_KEYS.set(len(self._locks))
+        self._failures.pop(account_key, None)
+        if self._redis is not None:
+            try:
+                await self._redis.delete(
+                    f"{self.prefix}fails:{account_key}",
+                    f"{self.prefix}lock:{account_key}",
+                )
+            except Exception as e:
+                logger.warning(f"Login throttle reset failed: {e}")
+
+    async def _incr_failures(self, keys: list[str], now: float) -> list[int]:
+        if self._redis is None:
+            counts = []
+            for key in keys:
+                count, window_ends = self._failures.pop(key, (0, 0.0))
+                if window_ends <= now:
+                    count = 0
+                self._failures[key] = (count + 1, now + self.failure_window)
+                counts.append(count + 1)
+            while len(self._failures) > self.max_keys:
+                self._failures.popitem(last=False)
+            return counts
+
+        window = int(self.failure_window)
+        async with self._redis.pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.incr(f"{self.prefix}fails:{key}")
+                pipe.expire(f"{self.prefix}fails:{key}", window)
+            results = await pipe.execute()
+        return [int(count) for count in results[::2]]
+
+    async def _lock(self, key: str, locked_until: float, lockout: float) -> None:
+        if self._redis is None:
+            return
+        try:
+            await self._redis.set(
+                f"{self.prefix}lock:{key}", str(locked_until), px=int(lockout * 1000)
+            )
+        except Exception as e:
+            logger.warning(f"Login throttle lock failed: {e}")
+
+    def stats(self) -> dict:
+        return {"cached_keys": len(self._locks), "rejected": self.rejected}
@@ -0,0 +1,200 @@
+"""
+Prometheus metrics.
+
+Set ``PROMETHEUS_MULTIPROC_DIR`` to an empty, writable directory before the
+workers start and prometheus_client switches to its mmap-backed multiprocess
+mode: every worker writes its own file and ``/metrics`` aggregates them, so
+any worker can serve the scrape. Gauges use the ``livesum`` mode, which adds
+up the values of the workers that are still running, except the startup
+phase timings, which report the slowest worker.
+"""
+
+import os
+import time
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Sub-millisecond resolution for cache/JWT paths, seconds for Argon2 and
+# saturated pools.
+LATENCY_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Time to the start of the response, by route template.",
+    ["method", "route", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+OPERATION_LATENCY = Histogram(
+    "auth_operation_duration_seconds",
+    "Latency of hot-path operations.",
+    ["operation"],
+    buckets=LATENCY_BUCKETS,
+)
+
+# Bound once so hot paths skip the label lookup
+ARGON2_HASH = OPERATION_LATENCY.labels("argon2_hash")
+ARGON2_VERIFY = OPERATION_LATENCY.labels("argon2_verify")
+ARGON2_QUEUE_WAIT = OPERATION_LATENCY.labels("argon2_queue_wait")
+JWT_ENCODE = OPERATION_LATENCY.labels("jwt_encode")
+JWT_DECODE = OPERATION_LATENCY.labels("jwt_decode")
+BLACKLIST_LOOKUP = OPERATION_LATENCY.labels("blacklist_lookup")
+DB_QUERY = OPERATION_LATENCY.labels("db_query")
+RATE_LIMIT_CHECK = OPERATION_LATENCY.labels("rate_limit_check")
+
+ARGON2_IN_FLIGHT = Gauge(
+    "argon2_in_flight",
+    "Argon2 hashes and verifications running in the hashing pools.",
+    multiprocess_mode="livesum",
+)
+ARGON2_QUEUE_DEPTH = Gauge(
+    "argon2_queue_depth",
+    "Argon2 hashes and verifications waiting for a hashing pool worker.",
+    multiprocess_mode="livesum",
+)
+ARGON2_REJECTED = Counter(
+    "argon2_rejected",
+    "Argon2 work shed with a 503 because the hashing queue was full.",
+)
+
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out",
+    "Database connections currently checked out of the pool.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_OVERFLOW = Gauge(
+    "db_pool_overflow",
+    "Database connections open beyond DB_POOL_SIZE.",
+    ["pool"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_CHECKOUT_WAIT = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Time to check a connection out of the database pool.",
+    ["pool"],
+    buckets=LATENCY_BUCKETS,
+)
+
+JWT_CACHE_LOOKUPS = Counter(
+    "jwt_cache_lookups",
+    "Verified-claims cache lookups, by result.",
+    ["result"],
+)
+JWT_CACHE_HIT = JWT_CACHE_LOOKUPS.labels("hit")
+JWT_CACHE_MISS = JWT_CACHE_LOOKUPS.labels("miss")
+JWT_CACHE_SIZE = Gauge(
+    "jwt_cache_entries",
+    "Access tokens held in the verified-claims caches.",
+    multiprocess_mode="livesum",
+)
+
+RATE_LIMIT_KEYS = Gauge(
+    "rate_limit_keys",
+    "Keys tracked by the in-memory rate limiter tier.",
+    multiprocess_mode="livesum",
+)
+RATE_LIMIT_REDIS_CHECKS = Counter(
+    "rate_limit_redis_checks",
+    "Rate limit decisions handed to the shared Redis tier.",
+)
+
+LOGIN_THROTTLE_CACHED_KEYS = Gauge(
+    "login_throttle_cached_keys",
+    "Account and IP lockouts cached by the login throttle.",
+    multiprocess_mode="livesum",
+)
+LOGIN_THROTTLE_REJECTED = Counter(
+    "login_throttle_rejected",
+    "Logins rejected because the account or source IP is locked out.",
+)
+
+WRITE_BEHIND_PENDING = Gauge(
+    "write_behind_pending",
+    "Session and refresh-token writes queued for the next batch.",
+    multiprocess_mode="livesum",
+)
+WRITE_BEHIND_BATCHES = Counter(
+    "write_behind_batches",
+    "Write-behind transactions committed.",
+)
+WRITE_BEHIND_WRITES = Counter(
+    "write_behind_writes",
+    "Session and refresh-token writes committed by the write-behind queue.",
+)
+WRITE_BEHIND_FALLBACKS = Counter(
+    "write_behind_fallbacks",
+    "Write-behind batches that failed and were retried one write at a time.",
+)
+
+# Slowest worker, so a one-off slow start stays visible
+STARTUP_PHASE = Gauge(
+    "startup_phase_seconds",
+    "Wall time of each lifespan startup phase.",
+    ["phase"],
+    multiprocess_mode="max",
+)
+
+# Requests that matched no route share one label value
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def observe_request(method: str, route: str, status: int, seconds: float) -> None:
+    REQUEST_LATENCY.labels(method, route, str(status)).observe(seconds)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """Time every statement executed on ``engine`` (a sync or ``.sync_engine``)."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _start(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _stop(conn, cursor, statement, parameters, context, executemany):
+        DB_QUERY.observe(time.perf_counter() - conn.info["query_start"].pop())
+
+    @event.listens_for(engine, "handle_error")
+    def _error(context):
+        starts = (
+            context.connection.info.get("query_start") if context.connection else None
+        )
+        if starts:
+            starts.pop()
+
+
+def render_latest() -> tuple[bytes, str]:
+    """Exposition body and content type for ``/metrics``."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return generate_latest(registry), CONTENT_TYPE_LATEST
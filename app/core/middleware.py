@@ -1,49 +1,94 @@
 """
 Security middleware for the application.
 """
-from fastapi import Request
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.responses import Response
+import itertools
+import os
 import time
-import uuid
 
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
-class SecurityHeadersMiddleware(BaseHTTPMiddleware):
-    """Add security headers to all responses."""
+from app.core.metrics import UNMATCHED_ROUTE, observe_request
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        response = await call_next(request)
+SECURITY_HEADERS = (
+    (b"x-content-type-options", b"nosniff"),
+    (b"x-frame-options", b"DENY"),
+    (b"x-xss-protection", b"1; mode=block"),
+    (b"referrer-policy", b"strict-origin-when-cross-origin"),
+)
+NO_STORE = (b"cache-control", b"no-store, no-cache, must-revalidate")
 
-        response.headers["X-Content-Type-Options"] = "nosniff"
-        response.headers["X-Frame-Options"] = "DENY"
-        response.headers["X-XSS-Protection"] = "1; mode=block"
-        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
 
-        if "/auth/" in request.url.path:
-            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+class _RequestIds:
+    """Unique request IDs from a per-process random prefix and a counter."""
 
-        return response
+    def __init__(self):
+        self.reset()
+        os.register_at_fork(after_in_child=self.reset)
 
+    def reset(self) -> None:
+        self._prefix = os.urandom(6).hex()
+        self._counter = itertools.count(1)
 
-class RequestIDMiddleware(BaseHTTPMiddleware):
-    """Add unique request ID to each request."""
+    def next(self) -> bytes:
+        return f"{self._prefix}-{next(self._counter):x}".encode()
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
-        request.state.request_id = request_id
 
-        response = await call_next(request)
-        response.headers["X-Request-ID"] = request_id
+request_ids = _RequestIds()
 
-        return response
 
+class SecurityMiddleware:
+    """Security headers, request IDs and request timing in a single ASGI layer.
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Log requests with timing."""
+    Adds the static security headers (plus ``Cache-Control: no-store`` under
+    ``/auth/``), echoes or assigns ``X-Request-ID`` (also exposed as
+    ``request.state.request_id``) and reports ``X-Process-Time`` in
+    milliseconds up to the start of the response. With ``metrics`` enabled
+    the same timing feeds the per-route latency histogram.
+    """
 
-    async def dispatch(self, request: Request, call_next) -> Response:
-        start_time = time.time()
-        response = await call_next(request)
-        process_time = time.time() - start_time
-        response.headers["X-Process-Time"] = str(round(process_time * 1000, 2))
-        return response
+    def __init__(self, app: ASGIApp, metrics: bool = False):
+        self.app = app
+        self.metrics = metrics
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        request_id = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                request_id = value
+                break
+        if request_id is None:
+            request_id = request_ids.next()
+        scope.setdefault("state", {})["request_id"] = request_id.decode("latin-1")
+        is_auth = "/auth/" in scope["path"]
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # Build a new list: the response object owns the original.
+                headers = list(message.get("headers", ()))
+                if is_auth:
+                    headers = [h for h in headers if h[0].lower() != b"cache-control"]
+                    headers.append(NO_STORE)
+                headers.extend(SECURITY_HEADERS)
+                elapsed_ns = time.perf_counter_ns() - start
+                elapsed_ms = elapsed_ns / 1_000_000
+                headers.append((b"x-request-id", request_id))
+                headers.append((b"x-process-time", str(round(elapsed_ms, 2)).encode()))
+                message["headers"] = headers
+                if self.metrics:
+                    # The router has stored the matched route in the scope
+                    # by now; label by its template to bound cardinality.
+                    route = scope.get("route")
+                    observe_request(
+                        scope["method"],
+                        getattr(route, "path", UNMATCHED_ROUTE),
+                        message["status"],
+                        elapsed_ns / 1e9,
+                    )
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,304 @@
+"""
+Two-tier request rate limiting.
+
+Every worker keeps an in-memory limiter state per key (token bucket or
+sliding-window log, bounded by an LRU over keys). While a key has used less
+than ``local_fraction`` of its limit locally the request is admitted without
+touching Redis; closer to the limit the locally admitted hits are reported
+to a shared Redis limiter, which makes the final decision. Without Redis, or
+when it errors, the local tier decides alone.
+
+With N workers, up to ``N * local_fraction * times`` requests can be
+admitted before Redis is consulted; use a fraction of 0 for strict limits.
+"""
+
+import ipaddress
+import logging
+import math
+import secrets
+import time
+from collections import OrderedDict, deque
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import TYPE_CHECKING, Callable
+
+from fastapi import HTTPException, Request, status
+
+from app.core.config import settings
+from app.core.metrics import RATE_LIMIT_CHECK, RATE_LIMIT_KEYS, RATE_LIMIT_REDIS_CHECKS
+
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+_UNITS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+
+# KEYS[1] = key; ARGV = limit, window ms, locally admitted hits, member id
+SLIDING_WINDOW_LUA = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - window)
+for i = 1, tonumber(ARGV[3]) do
+    redis.call('ZADD', KEYS[1], now, ARGV[4] .. ':' .. i)
+end
+redis.call('PEXPIRE', KEYS[1], window)
+local count = redis.call('ZCARD', KEYS[1])
+if count >= limit then
+    local oldest = count - limit
+    local edge = redis.call('ZRANGE', KEYS[1], oldest, oldest, 'WITHSCORES')
+    return math.max(1, tonumber(edge[2]) + window - now)
+end
+redis.call('ZADD', KEYS[1], now, ARGV[4] .. ':0')
+return 0
+"""
+
+# KEYS[1] = key; ARGV = capacity, refill period ms, locally admitted hits
+TOKEN_BUCKET_LUA = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local capacity = tonumber(ARGV[1])
+local period = tonumber(ARGV[2])
+local rate = capacity / period
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+tokens = math.max(0, tokens - tonumber(ARGV[3]))
+local retry = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+else
+    retry = math.max(1, math.ceil((1 - tokens) / rate))
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', now)
+redis.call('PEXPIRE', KEYS[1], period)
+return retry
+"""
+
+
+@dataclass(frozen=True, slots=True)
+class RateLimitRule:
+    """``times`` requests per ``seconds``."""
+
+    times: int
+    seconds: float
+
+    @classmethod
+    def parse(cls, value: str) -> "RateLimitRule":
+        """Parse ``"5/minute"``, ``"100/hour"`` or ``"10/30"`` (seconds)."""
+        try:
+            times, period = value.split("/")
+            seconds = _UNITS.get(period.strip()) or float(period)
+            rule = cls(int(times), float(seconds))
+        except ValueError:
+            raise ValueError(f"Invalid rate limit {value!r}")
+        if rule.times < 1 or rule.seconds <= 0:
+            raise ValueError(f"Invalid rate limit {value!r}")
+        return rule
+
+
+class SlidingWindowLog:
+    """Exact sliding window over a ring buffer of the last ``times`` hits."""
+
+    __slots__ = ("log",)
+
+    def __init__(self, rule: RateLimitRule):
+        self.log: deque[float] = deque(maxlen=rule.times)
+
+    def hit(self, now: float, rule: RateLimitRule) -> tuple[float, int]:
+        """Return ``(retry_after, remaining)``; a retry of 0 admits the hit."""
+        log = self.log
+        while log and now - log[0] >= rule.seconds:
+            log.popleft()
+        if len(log) >= rule.times:
+            return log[0] + rule.seconds - now, 0
+        log.append(now)
+        return 0.0, rule.times - len(log)
+
+
+class TokenBucket:
+    """Bucket of ``times`` tokens refilled evenly over ``seconds``."""
+
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, rule: RateLimitRule):
+        self.tokens = float(rule.times)
+        self.updated = time.monotonic()
+
+    def hit(self, now: float, rule: RateLimitRule) -> tuple[float, int]:
+        """Return ``(retry_after, remaining)``; a retry of 0 admits the hit."""
+        rate = rule.times / rule.seconds
+        tokens = min(rule.times, self.tokens + (now - self.updated) * rate)
+        self.updated = now
+        if tokens < 1:
+            self.tokens = tokens
+            return (1 - tokens) / rate, 0
+        self.tokens = tokens - 1
+        return 0.0, int(self.tokens)
+
+
+_ALGORITHMS = {
+    "sliding_window": (SlidingWindowLog, SLIDING_WINDOW_LUA),
+    "token_bucket": (TokenBucket, TOKEN_BUCKET_LUA),
+}
+
+
+class _Entry:
+    __slots__ = ("state", "unsynced")
+
+    def __init__(self, state):
+        self.state = state
+        # Hits admitted locally and not yet reported to Redis
+        self.unsynced = 0
+
+
+class RateLimiter:
+    """Per-worker limiter with an optional shared Redis tier."""
+
+    def __init__(
+        self,
+        algorithm: str = "sliding_window",
+        redis_client: "aioredis.Redis | None" = None,
+        local_fraction: float = 0.5,
+        max_keys: int = 100_000,
+    ):
+        try:
+            self._state_cls, lua = _ALGORITHMS[algorithm]
+        except KeyError:
+            raise ValueError(f"Unknown rate limit algorithm {algorithm!r}")
+        self.algorithm = algorithm
+        self.local_fraction = local_fraction
+        self.max_keys = max_keys
+        # Algorithms keep different Redis types, so they use separate keys
+        self.prefix = f"rate_limit:{algorithm}:"
+        self._redis = redis_client
+        self._script = redis_client.register_script(lua) if redis_client else None
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self.redis_checks = 0
+
+    async def hit(self, key: str, rule: RateLimitRule) -> float:
+        """Record a request for ``key``; return seconds to wait, 0 if admitted."""
+        entry = self._entries.get(key)
+        if entry is None:
+            entry = self._entries[key] = _Entry(self._state_cls(rule))
+            if len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+            RATE_LIMIT_KEYS.set(len(self._entries))
+        else:
+            self._entries.move_to_end(key)
+
+        retry_after, remaining = entry.state.hit(time.monotonic(), rule)
+        if retry_after > 0:
+            # Over the limit on this worker alone, so over it globally too.
+            return retry_after
+        if (
+            self._script is None
+            or rule.times - remaining <= rule.times * self.local_fraction
+        ):
+            entry.unsynced += 1
+            return 0.0
+
+        pending, entry.unsynced = entry.unsynced, 0
+        self.redis_checks += 1
+        RATE_LIMIT_REDIS_CHECKS.inc()
+        try:
+            retry_ms = await self._redis_hit(key, rule, pending)
+        except Exception as e:
+            logger.warning(f"Rate limiter falling back to local state: {e}")
+            entry.unsynced += pending + 1
+            return 0.0
+        return retry_ms / 1000
+
+    async def _redis_hit(self, key: str, rule: RateLimitRule, pending: int) -> int:
+        args = [rule.times, math.ceil(rule.seconds * 1000), pending]
+        if self.algorithm == "sliding_window":
+            args.append(secrets.token_hex(8))
+        return int(await self._script(keys=[f"{self.prefix}{key}"], args=args))
+
+    def stats(self) -> dict:
+        return {
+            "algorithm": self.algorithm,
+            "keys": len(self._entries),
+            "redis_checks": self.redis_checks,
+        }
+
+
+@lru_cache(maxsize=8)
+def _proxy_matcher(entries: tuple[str, ...]) -> Callable[[str], bool]:
+    """Predicate telling whether a host is one of the trusted proxies."""
+    if "*" in entries:
+        return lambda host: True
+    networks = []
+    names = set()
+    for entry in entries:
+        try:
+            networks.append(ipaddress.ip_network(entry, strict=False))
+        except ValueError:
+            # Not an address, e.g. a unix socket path; matched literally
+            names.add(entry)
+
+    def trusted(host: str) -> bool:
+        if host in names:
+            return True
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in networks)
+
+    return trusted
+
+
+def client_identifier(request: Request) -> str:
+    """Address of the client that reached the first trusted proxy.
+
+    ``X-Forwarded-For`` is only read when the peer is in
+    ``FORWARDED_ALLOW_IPS``, and then only as far back as the hops added by
+    trusted proxies: the right-most untrusted hop is the client, since
+    anything left of it may have been sent by the client itself.
+    """
+    peer = request.client.host if request.client else "unknown"
+    trusted = _proxy_matcher(tuple(settings.FORWARDED_ALLOW_IPS))
+    if not trusted(peer):
+        return peer
+    hops = [
+        hop.strip()
+        for header in request.headers.getlist("X-Forwarded-For")
+        for hop in header.split(",")
+        if hop.strip()
+    ]
+    for hop in reversed(hops):
+        if not trusted(hop):
+            return hop
+    # Every hop is a trusted proxy: the left-most is as far back as it goes
+    return hops[0] if hops else peer
+
+
+class RateLimit:
+    """Route dependency enforcing the named limit.
+
+    ``default`` applies unless ``RATE_LIMITS`` in settings overrides ``name``.
+    """
+
+    def __init__(self, name: str, default: str):
+        self.name = name
+        self.rule = RateLimitRule.parse(settings.RATE_LIMITS.get(name, default))
+
+    async def __call__(self, request: Request) -> None:
+        limiter: RateLimiter | None = getattr(request.app.state, "rate_limiter", None)
+        if limiter is None:
+            return
+        start = time.perf_counter()
+        retry_after = await limiter.hit(
+            f"{self.name}:{client_identifier(request)}", self.rule
+        )
+        RATE_LIMIT_CHECK.observe(time.perf_counter() - start)
+        if retry_after > 0:
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too Many Requests",
+                headers={"Retry-After": str(math.ceil(retry_after))},
+            )
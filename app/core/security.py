@@ -3,23 +3,56 @@ Security utilities for authentication.
 """
 import secrets
 import hashlib
+import time
 import uuid
 from datetime import datetime, timezone, timedelta
+from pathlib import Path
 
-from jose import jwt, JWTError
+from jose import JWTError
 
 from app.core.config import settings
+from app.core.jwt_codec import ASYMMETRIC_ALGORITHMS, build_codec
+from app.core.metrics import JWT_DECODE, JWT_ENCODE
+from app.core.token_cache import VerifiedTokenCache
 
 # Import from your secure-auth package (installed as 'auth')
 from auth.password import hash_password, verify_password
 
 
-def create_access_token(subject: str, token_version: int = 1, expires_delta: timedelta | None = None) -> str:
+def _load_jwt_codec():
+    """Build the codec once so keys are not re-read on every call."""
+    if settings.JWT_ALGORITHM in ASYMMETRIC_ALGORITHMS:
+        if not settings.JWT_PRIVATE_KEY_FILE:
+            raise RuntimeError(
+                f"JWT_PRIVATE_KEY_FILE is required for {settings.JWT_ALGORITHM}"
+            )
+        return build_codec(
+            settings.JWT_BACKEND,
+            Path(settings.JWT_PRIVATE_KEY_FILE).read_bytes(),
+            settings.JWT_ALGORITHM,
+            tuple(Path(path).read_bytes() for path in settings.JWT_PUBLIC_KEY_FILES),
+        )
+    return build_codec(
+        settings.JWT_BACKEND, settings.JWT_SECRET_KEY, settings.JWT_ALGORITHM
+    )
+
+
+jwt_codec = _load_jwt_codec()
+
+# Shared by every caller that verifies access tokens
+token_cache = VerifiedTokenCache(max_size=settings.JWT_DECODE_CACHE_SIZE)
+
+
+def create_access_token(
+    subject: str, token_version: int = 1, expires_delta: timedelta | None = None
+) -> str:
     """Create a new JWT access token with JTI for revocation support."""
     if expires_delta:
         expire = datetime.now(timezone.utc) + expires_delta
     else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+        expire = datetime.now(timezone.utc) + timedelta(
+            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
+        )
 
     payload = {
         "sub": subject,
@@ -30,20 +63,25 @@ def create_access_token(subject: str, token_version: int = 1, expires_delta: tim
         "token_version": token_version,
     }
 
-    return jwt.encode(
-        payload,
-        settings.JWT_SECRET_KEY,
-        algorithm=settings.JWT_ALGORITHM,
-    )
+    start = time.perf_counter()
+    token = jwt_codec.encode(payload)
+    JWT_ENCODE.observe(time.perf_counter() - start)
+    return token
 
 
 def decode_access_token(token: str) -> dict:
     """Decode and validate a JWT access token."""
-    return jwt.decode(
-        token,
-        settings.JWT_SECRET_KEY,
-        algorithms=[settings.JWT_ALGORITHM],
-    )
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
+    start = time.perf_counter()
+    try:
+        claims = jwt_codec.decode(token)
+    finally:
+        JWT_DECODE.observe(time.perf_counter() - start)
+    token_cache.put(token, claims)
+    return claims
 
 
 def get_token_payload(token: str) -> dict | None:
@@ -51,13 +89,12 @@ def get_token_payload(token: str) -> dict | None:
     Get token payload without verification.
     Useful for extracting JTI from expired tokens.
     """
+    claims = token_cache.get(token)
+    if claims is not None:
+        return claims
+
     try:
-        return jwt.decode(
-            token,
-            settings.JWT_SECRET_KEY,
-            algorithms=[settings.JWT_ALGORITHM],
-            options={"verify_exp": False},
-        )
+        return jwt_codec.decode(token, verify_exp=False)
     except JWTError:
         return None
 
@@ -77,9 +114,14 @@ def create_refresh_token() -> str:
     return secrets.token_urlsafe(48)
 
 
+def refresh_token_digest(token: str) -> bytes:
+    """SHA-256 digest of a refresh token, as stored in ``token_digest``."""
+    return hashlib.sha256(token.encode()).digest()
+
+
 def hash_refresh_token(token: str) -> str:
-    """Hash a refresh token for storage using SHA256."""
-    return hashlib.sha256(token.encode()).hexdigest()
+    """Hash a refresh token for storage using SHA256 (legacy hex form)."""
+    return refresh_token_digest(token).hex()
 
 
 def verify_refresh_token(plain_token: str, hashed_token: str) -> bool:
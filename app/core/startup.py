@@ -0,0 +1,32 @@
+"""
+Timing of startup phases.
+"""
+
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from app.core.metrics import STARTUP_PHASE
+
+
+class StartupTimer:
+    """Wall time of named phases, in milliseconds, in the order they ran."""
+
+    def __init__(self):
+        self.phases: dict[str, float] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            self.phases[name] = round(seconds * 1000, 2)
+            STARTUP_PHASE.labels(name).set(seconds)
+
+    def total(self) -> float:
+        return round(sum(self.phases.values()), 2)
+
+    def summary(self) -> str:
+        return ", ".join(f"{name}={ms:.1f}ms" for name, ms in self.phases.items())
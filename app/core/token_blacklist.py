@@ -1,23 +1,67 @@
 """
 Token blacklist service using Redis.
 """
-import redis.asyncio as aioredis
+import asyncio
+import logging
 from datetime import datetime, timezone
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Optional
 
+from app.core.bloom import BloomFilter
 from app.core.config import settings
 
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+
+logger = logging.getLogger(__name__)
+
+REVOCATION_CHANNEL = "token_blacklist:revoked"
+
 
 class TokenBlacklist:
-    """Redis-based token blacklist for JWT revocation."""
+    """Redis-based token blacklist for JWT revocation.
+
+    With ``local_filter`` enabled, each worker keeps a Bloom filter of revoked
+    JTIs, loaded from the ``token_blacklist:`` keyspace and kept current via
+    pub/sub. Tokens the filter has never seen are answered locally; only
+    probable hits are confirmed with Redis. Until the filter is loaded, or
+    whenever the subscription is lost, every lookup goes to Redis.
 
-    def __init__(self, redis_client: Optional[aioredis.Redis] = None):
+    With ``batch_window`` > 0, concurrent ``is_blacklisted`` calls that reach
+    Redis within the window are coalesced into a single MGET.
+    """
+
+    def __init__(
+        self,
+        redis_client: Optional["aioredis.Redis"] = None,
+        local_filter: bool = False,
+        filter_capacity: int = 100_000,
+        filter_error_rate: float = 0.001,
+        rebuild_interval: float = 300.0,
+        batch_window: float = 0.0,
+        batch_max_size: int = 128,
+    ):
         self._redis = redis_client
         self.prefix = "token_blacklist:"
+        self.local_filter = local_filter
+        self.filter_capacity = filter_capacity
+        self.filter_error_rate = filter_error_rate
+        self.rebuild_interval = rebuild_interval
+        # None means "not in sync": fall through to Redis.
+        self._filter: BloomFilter | None = None
+        self._building: BloomFilter | None = None
+        self._sync_task: asyncio.Task | None = None
+        self.batch_window = batch_window
+        self.batch_max_size = batch_max_size
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._flush_handle: asyncio.TimerHandle | None = None
+        # In-flight batch lookups, referenced so they cannot be collected.
+        self._tasks: set[asyncio.Task] = set()
 
-    async def _get_redis(self) -> aioredis.Redis:
+    async def _get_redis(self) -> "aioredis.Redis":
         """Get or create Redis connection."""
         if self._redis is None:
+            import redis.asyncio as aioredis
+
             self._redis = aioredis.from_url(
                 settings.REDIS_URL,
                 encoding="utf-8",
@@ -25,6 +69,12 @@ class TokenBlacklist:
             )
         return self._redis
 
+    def _remember(self, jti: str) -> None:
+        if self._filter is not None:
+            self._filter.add(jti)
+        if self._building is not None:
+            self._building.add(jti)
+
     async def add(self, jti: str, exp: int) -> None:
         """Add token JTI to blacklist with TTL."""
         r = await self._get_redis()
@@ -37,15 +87,209 @@ class TokenBlacklist:
                 time=ttl,
                 value="1"
             )
+            self._remember(jti)
+            # Published whether or not this worker filters locally: peers
+            # may be configured differently, e.g. during a rolling deploy.
+            await r.publish(REVOCATION_CHANNEL, jti)
+
+    async def add_many(self, tokens: Iterable[tuple[str, int]]) -> int:
+        """Blacklist several ``(jti, exp)`` pairs in one round-trip.
+
+        Returns the number of tokens written (already expired ones are skipped).
+        """
+        now = int(datetime.now(timezone.utc).timestamp())
+        live = [(jti, exp - now) for jti, exp in tokens if exp > now]
+        if not live:
+            return 0
+        r = await self._get_redis()
+        async with r.pipeline(transaction=False) as pipe:
+            for jti, ttl in live:
+                pipe.setex(name=f"{self.prefix}{jti}", time=ttl, value="1")
+                pipe.publish(REVOCATION_CHANNEL, jti)
+            await pipe.execute()
+        for jti, _ in live:
+            self._remember(jti)
+        return len(live)
 
     async def is_blacklisted(self, jti: str) -> bool:
         """Check if token JTI is blacklisted."""
+        local = self._filter
+        if local is not None and jti not in local:
+            return False
+        if self.batch_window > 0:
+            return await self._enqueue(jti)
         r = await self._get_redis()
         result = await r.exists(f"{self.prefix}{jti}")
         return result > 0
 
+    async def are_blacklisted(self, jtis: Iterable[str]) -> list[bool]:
+        """Check several JTIs, in order, with at most one MGET."""
+        jtis = list(jtis)
+        results = [False] * len(jtis)
+        local = self._filter
+        remote = [
+            i for i, jti in enumerate(jtis)
+            if local is None or jti in local
+        ]
+        if remote:
+            found = await self._mget([jtis[i] for i in remote])
+            for i, hit in zip(remote, found):
+                results[i] = hit
+        return results
+
+    async def _mget(self, jtis: list[str]) -> list[bool]:
+        r = await self._get_redis()
+        values = await r.mget([f"{self.prefix}{jti}" for jti in jtis])
+        return [value is not None for value in values]
+
+    def _enqueue(self, jti: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((jti, future))
+        if len(self._pending) >= self.batch_max_size:
+            self._flush()
+        elif self._flush_handle is None:
+            self._flush_handle = loop.call_later(self.batch_window, self._flush)
+        return future
+
+    def _flush(self) -> None:
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._resolve(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, batch: list[tuple[str, asyncio.Future]]) -> None:
+        # Deduplicate: the same token often arrives on parallel requests.
+        unique = list(dict.fromkeys(jti for jti, _ in batch))
+        try:
+            found = dict(zip(unique, await self._mget(unique)))
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for jti, future in batch:
+            if not future.done():
+                future.set_result(found[jti])
+
+    async def rebuild_filter(self) -> None:
+        """Reload the local filter from the Redis keyspace.
+
+        While ``_sync`` runs, its listener keeps applying revocations from
+        pub/sub during the scan, to both the old and the new filter, so
+        nothing is lost in the swap.
+        """
+        r = await self._get_redis()
+        self._building = BloomFilter(self.filter_capacity, self.filter_error_rate)
+        try:
+            async for key in r.scan_iter(match=f"{self.prefix}*", count=1000):
+                if isinstance(key, bytes):
+                    key = key.decode()
+                self._building.add(key[len(self.prefix):])
+            building = self._building
+        finally:
+            self._building = None
+
+        if building.count > self.filter_capacity // 2:
+            # Keep headroom so the false positive rate stays near target.
+            self.filter_capacity = building.count * 2
+        self._filter = building
+
+    async def _listen(self, pubsub) -> None:
+        """Apply revocations published by other workers until cancelled."""
+        while True:
+            message = await pubsub.get_message(
+                ignore_subscribe_messages=True, timeout=1.0
+            )
+            if message and message.get("type") == "message":
+                data = message["data"]
+                if isinstance(data, bytes):
+                    data = data.decode()
+                self._remember(data)
+
+    @staticmethod
+    async def _while_listening(listener: asyncio.Task, coro) -> None:
+        """Await ``coro``, giving up with the listener's error if it stops."""
+        task = asyncio.ensure_future(coro)
+        try:
+            done, _ = await asyncio.wait(
+                {listener, task}, return_when=asyncio.FIRST_COMPLETED
+            )
+        except asyncio.CancelledError:
+            task.cancel()
+            raise
+        if task not in done:
+            task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+            listener.result()
+            raise ConnectionError("Revocation subscription ended")
+        task.result()
+
+    async def _sync(self) -> None:
+        r = await self._get_redis()
+        backoff = 1.0
+        while True:
+            pubsub = r.pubsub()
+            listener = None
+            try:
+                # Subscribe before scanning so no revocation falls in between.
+                await pubsub.subscribe(REVOCATION_CHANNEL)
+                listener = asyncio.create_task(self._listen(pubsub))
+                while True:
+                    # Expired JTIs never leave a Bloom filter, hence the
+                    # periodic rebuilds.
+                    await self._while_listening(listener, self.rebuild_filter())
+                    backoff = 1.0
+                    await self._while_listening(
+                        listener, asyncio.sleep(self.rebuild_interval)
+                    )
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Token blacklist filter out of sync: {e}")
+                self._filter = None
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 30.0)
+            finally:
+                if listener is not None:
+                    listener.cancel()
+                    await asyncio.gather(listener, return_exceptions=True)
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def start(self) -> None:
+        """Start loading and syncing the local filter."""
+        if self.local_filter and self._sync_task is None:
+            self._sync_task = asyncio.create_task(self._sync())
+
+    async def stop(self) -> None:
+        """Answer pending lookups, then stop syncing the local filter."""
+        if self._pending:
+            self._flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        if self._sync_task is None:
+            return
+        self._sync_task.cancel()
+        try:
+            await self._sync_task
+        except asyncio.CancelledError:
+            pass
+        self._sync_task = None
+        self._filter = None
+
     async def close(self) -> None:
         """Close Redis connection."""
+        await self.stop()
         if self._redis:
             await self._redis.close()
             self._redis = None
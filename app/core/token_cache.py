@@ -0,0 +1,76 @@
+"""
+Cache of verified JWT claims keyed by token digest.
+
+Clients reuse the same access token until it expires, so re-parsing and
+re-verifying it on every request is wasted work. Entries expire at the
+token's own ``exp``; revocation is still checked separately against the
+blacklist and ``token_version``.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from app.core.metrics import JWT_CACHE_HIT, JWT_CACHE_MISS, JWT_CACHE_SIZE
+
+
+class VerifiedTokenCache:
+    """Bounded LRU from SHA-256(token) to its verified claims."""
+
+    def __init__(self, max_size: int = 10_000):
+        self.max_size = max_size
+        self._entries: OrderedDict[bytes, tuple[float, dict]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _key(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    def get(self, token: str) -> dict | None:
+        """Return a copy of the cached claims if the token has not expired."""
+        if self.max_size <= 0:
+            return None
+        key = self._key(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, claims = entry
+                if expires_at > time.time():
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    JWT_CACHE_HIT.inc()
+                    return dict(claims)
+                del self._entries[key]
+                JWT_CACHE_SIZE.set(len(self._entries))
+            self.misses += 1
+        JWT_CACHE_MISS.inc()
+        return None
+
+    def put(self, token: str, claims: dict) -> None:
+        """Cache verified claims until the token's ``exp``."""
+        exp = claims.get("exp")
+        if (
+            self.max_size <= 0
+            or not isinstance(exp, (int, float))
+            or exp <= time.time()
+        ):
+            return
+        key = self._key(token)
+        with self._lock:
+            self._entries[key] = (float(exp), dict(claims))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+            JWT_CACHE_SIZE.set(len(self._entries))
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "size": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / total, 4) if total else 0.0,
+        }
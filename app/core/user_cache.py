@@ -0,0 +1,192 @@
+"""
+In-process cache of authenticated user snapshots.
+
+``get_current_user`` only needs a handful of columns to authorise a request,
+so it keeps a bounded LRU of slim snapshots with a short TTL. Writes that
+change those columns call ``invalidate()``, which evicts locally and publishes
+the user id on Redis so every other worker drops its copy too. While the
+invalidation subscription is down the cache is bypassed, since it would miss
+those messages.
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import TYPE_CHECKING, Optional
+
+if TYPE_CHECKING:
+    import redis.asyncio as aioredis
+
+
+logger = logging.getLogger(__name__)
+
+INVALIDATION_CHANNEL = "user_cache:invalidate"
+RECONNECT_BACKOFF_INITIAL_SECONDS = 0.5
+RECONNECT_BACKOFF_MAX_SECONDS = 30.0
+
+
+@dataclass(frozen=True, slots=True)
+class UserSnapshot:
+    """Read-only view of the user columns needed to authorise a request."""
+
+    id: uuid.UUID
+    email: str
+    is_active: bool
+    created_at: datetime
+    token_version: int
+
+    @classmethod
+    def from_user(cls, user) -> "UserSnapshot":
+        return cls(
+            id=user.id,
+            email=user.email,
+            is_active=user.is_active,
+            created_at=user.created_at,
+            token_version=user.token_version,
+        )
+
+
+class UserCache:
+    """Bounded LRU of user snapshots with TTL and Redis-backed invalidation.
+
+    Only used from the event loop, so no locking is needed.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 10_000,
+        ttl_seconds: float = 30.0,
+        redis_client: Optional["aioredis.Redis"] = None,
+    ):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._redis = redis_client
+        self._entries: OrderedDict[str, tuple[float, UserSnapshot]] = OrderedDict()
+        self._epoch = 0
+        self._listener: asyncio.Task | None = None
+        # With Redis, entries are only trusted while subscribed to invalidations
+        self._subscribed = redis_client is None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0 and self.ttl_seconds > 0
+
+    @property
+    def active(self) -> bool:
+        """Whether lookups are served; False while invalidations can be missed."""
+        return self.enabled and self._subscribed
+
+    def get(self, user_id: str) -> UserSnapshot | None:
+        """Return a fresh cached snapshot, or None."""
+        if not self._subscribed:
+            self.misses += 1
+            return None
+        entry = self._entries.get(user_id)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, snapshot = entry
+        if expires_at <= time.monotonic():
+            del self._entries[user_id]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return snapshot
+
+    def epoch(self) -> int:
+        """Token to pass to ``put`` after loading a user from the database."""
+        return self._epoch
+
+    def put(self, snapshot: UserSnapshot, epoch: int) -> None:
+        """Cache a snapshot unless an invalidation happened since ``epoch``.
+
+        This stops a request that read the row before a concurrent write
+        from re-populating the cache with stale data.
+        """
+        if not self.active or epoch != self._epoch:
+            return
+        key = str(snapshot.id)
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, snapshot)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def invalidate_local(self, user_id: str) -> None:
+        """Drop a user from this worker's cache."""
+        self._epoch += 1
+        self._entries.pop(user_id, None)
+
+    def clear(self) -> None:
+        """Drop every entry and discard puts of rows read before now."""
+        self._epoch += 1
+        self._entries.clear()
+
+    async def invalidate(self, user_id: uuid.UUID | str) -> None:
+        """Drop a user from this worker's cache and tell the other workers."""
+        key = str(user_id)
+        self.invalidate_local(key)
+        if self._redis is not None:
+            try:
+                await self._redis.publish(INVALIDATION_CHANNEL, key)
+            except Exception as e:
+                # Peers fall back to the TTL.
+                logger.warning(f"User cache invalidation publish failed: {e}")
+
+    async def _listen(self) -> None:
+        backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+        while True:
+            pubsub = self._redis.pubsub()
+            try:
+                await pubsub.subscribe(INVALIDATION_CHANNEL)
+                # Entries from before the subscription may have missed messages.
+                self.clear()
+                self._subscribed = True
+                backoff = RECONNECT_BACKOFF_INITIAL_SECONDS
+                async for message in pubsub.listen():
+                    if message.get("type") == "message":
+                        data = message["data"]
+                        if isinstance(data, bytes):
+                            data = data.decode()
+                        self.invalidate_local(data)
+                raise ConnectionError("subscription closed")
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(
+                    "User cache invalidations lost, bypassing cache and "
+                    f"reconnecting in {backoff:.1f}s: {e}"
+                )
+                self._subscribed = False
+                self.clear()
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_BACKOFF_MAX_SECONDS)
+            finally:
+                try:
+                    await pubsub.close()
+                except Exception:
+                    pass
+
+    def start(self) -> None:
+        """Subscribe to invalidations published by other workers."""
+        if self._redis is None or self._listener is not None or not self.enabled:
+            return
+        self._listener = asyncio.create_task(self._listen())
+
+    async def stop(self) -> None:
+        if self._listener is None:
+            return
+        self._listener.cancel()
+        try:
+            await self._listener
+        except (asyncio.CancelledError, Exception):
+            pass
+        self._listener = None
+        self._subscribed = self._redis is None
+        self.clear()
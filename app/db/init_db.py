@@ -5,7 +5,7 @@ import logging
 from sqlalchemy import text
 
 from app.db.session import engine, Base
-from app.db.models import User, RefreshToken  # Import all models
+from app.db.models import User, RefreshToken, UserSession  # noqa: F401 (all models)
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -4,7 +4,16 @@ Database models.
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import String, Boolean, DateTime, ForeignKey, Integer
+from sqlalchemy import (
+    String,
+    Boolean,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    text,
+)
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.session import Base
@@ -33,11 +42,79 @@ class User(Base):
 
     # Relationship to refresh tokens
     refresh_tokens = relationship("RefreshToken", back_populates="user")
+    sessions = relationship("UserSession", back_populates="user")
+
+
+class UserSession(Base):
+    """A signed-in device; its refresh tokens rotate within it."""
+    __tablename__ = "user_sessions"
+    __table_args__ = (
+        # Serves per-user listing (keyset on created_at) and logout-all
+        Index(
+            "ix_user_sessions_user_id_revoked_created_at",
+            "user_id",
+            "revoked",
+            "created_at",
+        ),
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(
+        GUID(), primary_key=True, default=uuid.uuid4
+    )
+    user_id: Mapped[uuid.UUID] = mapped_column(
+        GUID(), ForeignKey("users.id", ondelete="CASCADE")
+    )
+    device_label: Mapped[str | None] = mapped_column(String(100), nullable=True)
+    ip_address: Mapped[str | None] = mapped_column(String(45), nullable=True)
+    user_agent: Mapped[str | None] = mapped_column(String(512), nullable=True)
+    revoked: Mapped[bool] = mapped_column(Boolean, default=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime, default=utc_now_naive
+    )
+    last_used_at: Mapped[datetime] = mapped_column(
+        DateTime, default=utc_now_naive
+    )
+
+    user = relationship("User", back_populates="sessions")
+    refresh_tokens = relationship("RefreshToken", back_populates="session")
 
 
 class RefreshToken(Base):
     """Refresh token model for JWT refresh flow."""
     __tablename__ = "refresh_tokens"
+    __table_args__ = (
+        # Lookups only ever target active tokens, and revoked rows are reaped,
+        # so the index covers just those.
+        Index(
+            "uq_refresh_tokens_active_token_digest",
+            "token_digest",
+            unique=True,
+            postgresql_where=text("revoked = false"),
+            sqlite_where=text("revoked = false"),
+        ),
+        # Rows written by instances that predate token_digest
+        Index(
+            "ix_refresh_tokens_legacy_token_hash",
+            "token_hash",
+            postgresql_where=text("token_digest IS NULL"),
+            sqlite_where=text("token_digest IS NULL"),
+        ),
+        # Active token of a session, for revoking a single device
+        Index(
+            "ix_refresh_tokens_active_session_id",
+            "session_id",
+            postgresql_where=text("revoked = false"),
+            sqlite_where=text("revoked = false"),
+        ),
+        # Tokens issued before sessions existed, which logout-all revokes
+        # directly
+        Index(
+            "ix_refresh_tokens_sessionless_user_id",
+            "user_id",
+            postgresql_where=text("session_id IS NULL"),
+            sqlite_where=text("session_id IS NULL"),
+        ),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(
         GUID(), primary_key=True, default=uuid.uuid4
@@ -45,7 +122,19 @@ class RefreshToken(Base):
     user_id: Mapped[uuid.UUID] = mapped_column(
         GUID(), ForeignKey("users.id", ondelete="CASCADE")
     )
-    token_hash: Mapped[str] = mapped_column(String, index=True)
+    session_id: Mapped[uuid.UUID | None] = mapped_column(
+        GUID(),
+        ForeignKey(
+            "user_sessions.id",
+            name="fk_refresh_tokens_session_id",
+            ondelete="CASCADE",
+        ),
+        nullable=True,
+    )
+    # SHA-256 of the token; token_hash is the legacy hex form, only written
+    # while REFRESH_TOKEN_LEGACY_HEX is enabled
+    token_digest: Mapped[bytes | None] = mapped_column(LargeBinary(32))
+    token_hash: Mapped[str | None] = mapped_column(String, nullable=True)
     expires_at: Mapped[datetime] = mapped_column(DateTime)
     revoked: Mapped[bool] = mapped_column(Boolean, default=False)
     created_at: Mapped[datetime] = mapped_column(
@@ -54,3 +143,4 @@ class RefreshToken(Base):
 
     # Relationship back to user
     user = relationship("User", back_populates="refresh_tokens")
+    session = relationship("UserSession", back_populates="refresh_tokens")
@@ -0,0 +1,239 @@
+"""
+Cleanup of expired and revoked refresh tokens and sessions.
+
+Rows are deleted in bounded batches, each in its own short transaction, so
+the job never holds long locks or builds one huge WAL record. On Postgres,
+when ``refresh_tokens`` has been partitioned by ``expires_at`` (see the
+``partition_refresh_tokens`` migration), upcoming monthly partitions are
+created ahead of time and partitions whose tokens have all expired are
+dropped outright. Sessions go once revoked, or once idle for longer than a
+refresh token lives, after their tokens.
+
+Runs in-process from the application lifespan, or once from cron:
+
+    python -m app.db.reaper
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, exists, or_, select, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db.models import RefreshToken, UserSession, utc_now_naive
+
+logger = logging.getLogger(__name__)
+
+PARTITION_PREFIX = "refresh_tokens_p"
+
+
+async def _delete_in_batches(
+    bind: AsyncEngine, table, stale, batch_size: int, pause: float
+) -> int:
+    stale = select(table.c.id).where(stale).limit(batch_size).scalar_subquery()
+    total = 0
+    while True:
+        async with bind.begin() as conn:
+            result = await conn.execute(delete(table).where(table.c.id.in_(stale)))
+        deleted = result.rowcount
+        total += deleted
+        if deleted < batch_size:
+            return total
+        if pause:
+            await asyncio.sleep(pause)
+
+
+async def reap_refresh_tokens(
+    bind: AsyncEngine,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    now: datetime | None = None,
+) -> int:
+    """Delete expired or revoked refresh tokens, and those of revoked
+    sessions; return the number removed."""
+    cutoff = now or utc_now_naive()
+    table = RefreshToken.__table__
+    sessions = UserSession.__table__
+    stale = or_(
+        table.c.expires_at < cutoff,
+        table.c.revoked.is_(True),
+        exists().where(
+            sessions.c.id == table.c.session_id, sessions.c.revoked.is_(True)
+        ),
+    )
+    return await _delete_in_batches(bind, table, stale, batch_size, pause)
+
+
+async def reap_sessions(
+    bind: AsyncEngine,
+    max_idle: timedelta,
+    batch_size: int = 1000,
+    pause: float = 0.0,
+    now: datetime | None = None,
+) -> int:
+    """Delete revoked sessions and those unused for ``max_idle``; return the
+    number removed. Run after ``reap_refresh_tokens``."""
+    cutoff = (now or utc_now_naive()) - max_idle
+    table = UserSession.__table__
+    stale = or_(table.c.revoked.is_(True), table.c.last_used_at < cutoff)
+    return await _delete_in_batches(bind, table, stale, batch_size, pause)
+
+
+def _month_start(value: datetime, offset: int = 0) -> datetime:
+    month = value.year * 12 + value.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1)
+
+
+async def maintain_partitions(
+    bind: AsyncEngine,
+    months_ahead: int = 2,
+    now: datetime | None = None,
+) -> tuple[list[str], list[str]]:
+    """Create upcoming and drop fully expired monthly partitions.
+
+    Returns ``(created, dropped)`` partition names; a no-op unless
+    ``refresh_tokens`` is a partitioned Postgres table.
+    """
+    if bind.dialect.name != "postgresql":
+        return [], []
+    now = now or utc_now_naive()
+    created, dropped = [], []
+    async with bind.begin() as conn:
+        partitioned = await conn.scalar(
+            text(
+                "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table p "
+                "JOIN pg_class c ON c.oid = p.partrelid "
+                "WHERE c.relname = 'refresh_tokens')"
+            )
+        )
+        if not partitioned:
+            return [], []
+        result = await conn.execute(
+            text(
+                "SELECT c.relname FROM pg_inherits i "
+                "JOIN pg_class c ON c.oid = i.inhrelid "
+                "JOIN pg_class p ON p.oid = i.inhparent "
+                "WHERE p.relname = 'refresh_tokens'"
+            )
+        )
+        existing = set(result.scalars())
+
+        for offset in range(months_ahead + 1):
+            start, end = _month_start(now, offset), _month_start(now, offset + 1)
+            name = f"{PARTITION_PREFIX}{start:%Y%m}"
+            if name not in existing:
+                await conn.execute(
+                    text(
+                        f"CREATE TABLE {name} PARTITION OF refresh_tokens "
+                        f"FOR VALUES FROM ('{start:%Y-%m-%d}') TO ('{end:%Y-%m-%d}')"
+                    )
+                )
+                created.append(name)
+
+        current = _month_start(now)
+        for name in sorted(existing):
+            suffix = name[len(PARTITION_PREFIX) :]
+            if not name.startswith(PARTITION_PREFIX) or not suffix.isdigit():
+                continue
+            start = datetime.strptime(suffix, "%Y%m")
+            if _month_start(start, 1) <= current:
+                # Every token in it expired before this month began.
+                await conn.execute(text(f"DROP TABLE {name}"))
+                dropped.append(name)
+    return created, dropped
+
+
+class RefreshTokenReaper:
+    """Periodic background cleanup task."""
+
+    def __init__(
+        self,
+        bind: AsyncEngine,
+        interval: float = 3600.0,
+        batch_size: int = 1000,
+        months_ahead: int = 2,
+        session_max_idle: timedelta = timedelta(days=7),
+    ):
+        self.bind = bind
+        self.interval = interval
+        self.batch_size = batch_size
+        self.months_ahead = months_ahead
+        self.session_max_idle = session_max_idle
+        self._task: asyncio.Task | None = None
+
+    async def run_once(self) -> int:
+        created, dropped = await maintain_partitions(self.bind, self.months_ahead)
+        if created or dropped:
+            logger.info(f"Refresh token partitions created={created} dropped={dropped}")
+        deleted = await reap_refresh_tokens(self.bind, self.batch_size, pause=0.05)
+        if deleted:
+            logger.info(f"Reaped {deleted} expired or revoked refresh tokens")
+        sessions = await reap_sessions(
+            self.bind, self.session_max_idle, self.batch_size, pause=0.05
+        )
+        if sessions:
+            logger.info(f"Reaped {sessions} revoked or idle sessions")
+        return deleted
+
+    async def _run(self) -> None:
+        # Spread workers out so they do not all reap at the same moment.
+        await asyncio.sleep(random.uniform(0, self.interval))
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Refresh token reaper failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+def main(argv: list[str] | None = None) -> None:
+    from app.core.config import settings
+    from app.db.session import async_engine
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--batch-size", type=int, default=settings.REFRESH_TOKEN_REAPER_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--months-ahead",
+        type=int,
+        default=settings.REFRESH_TOKEN_PARTITION_MONTHS_AHEAD,
+    )
+    args = parser.parse_args(argv)
+
+    async def run() -> int:
+        try:
+            return await RefreshTokenReaper(
+                async_engine,
+                batch_size=args.batch_size,
+                months_ahead=args.months_ahead,
+                session_max_idle=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+            ).run_once()
+        finally:
+            await async_engine.dispose()
+
+    logging.basicConfig(level=logging.INFO)
+    print(f"deleted {asyncio.run(run())} refresh tokens")
+
+
+if __name__ == "__main__":
+    main()
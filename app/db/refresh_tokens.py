@@ -0,0 +1,219 @@
+"""
+Refresh token rotation.
+
+Revoking the presented token is a conditional UPDATE on ``revoked = false``,
+so when two requests race with the same token only one of them matches a
+row; the other sees nothing to rotate. On Postgres the revoke, the insert of
+the replacement and the user lookup run as one statement (data-modifying
+CTEs); elsewhere they run as separate statements in one transaction.
+
+A token only rotates while its session (see ``app.db.user_sessions``) is
+active, so revoking a session cuts off its tokens without touching them.
+The replacement inherits the session, whose ``last_used_at`` is bumped.
+
+Tokens are identified by their 32-byte SHA-256 ``token_digest``. While
+``REFRESH_TOKEN_LEGACY_HEX`` is on, the hex ``token_hash`` is written too and
+rows that only have a hex hash (from instances predating the digest column)
+still match.
+"""
+
+import uuid
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import and_, exists, false, insert, literal, or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.db.models import RefreshToken, User, UserSession, utc_now_naive
+
+
+@dataclass(frozen=True, slots=True)
+class RotatedToken:
+    user_id: uuid.UUID
+    token_version: int
+    session_id: uuid.UUID | None
+
+
+def digest_columns(digest: bytes) -> dict:
+    """Column values identifying a new token with SHA-256 ``digest``."""
+    return {
+        "token_digest": digest,
+        "token_hash": digest.hex() if settings.REFRESH_TOKEN_LEGACY_HEX else None,
+    }
+
+
+def matches_digest(digest: bytes):
+    """WHERE clause selecting the token with SHA-256 ``digest``."""
+    if not settings.REFRESH_TOKEN_LEGACY_HEX:
+        return RefreshToken.token_digest == digest
+    return or_(
+        RefreshToken.token_digest == digest,
+        and_(
+            RefreshToken.token_digest.is_(None), RefreshToken.token_hash == digest.hex()
+        ),
+    )
+
+
+def matches_any_digest(digests: list[bytes]):
+    """WHERE clause selecting the tokens with any of the SHA-256 ``digests``."""
+    if not settings.REFRESH_TOKEN_LEGACY_HEX:
+        return RefreshToken.token_digest.in_(digests)
+    return or_(
+        RefreshToken.token_digest.in_(digests),
+        and_(
+            RefreshToken.token_digest.is_(None),
+            RefreshToken.token_hash.in_([digest.hex() for digest in digests]),
+        ),
+    )
+
+
+async def revoke_refresh_tokens(db, digests: list[bytes]) -> None:
+    """Revoke the tokens with ``digests`` and end their sessions.
+
+    ``db`` is a session or connection; the caller commits.
+    """
+    await db.execute(
+        update(UserSession)
+        .where(
+            UserSession.id.in_(
+                select(RefreshToken.session_id).where(matches_any_digest(digests))
+            ),
+            UserSession.revoked == false(),
+        )
+        .values(revoked=True)
+    )
+    await db.execute(
+        update(RefreshToken)
+        .where(matches_any_digest(digests), RefreshToken.revoked == false())
+        .values(revoked=True)
+    )
+
+
+def _revoke(old_digest: bytes, now: datetime):
+    return (
+        update(RefreshToken)
+        .where(
+            matches_digest(old_digest),
+            RefreshToken.revoked == false(),
+            RefreshToken.expires_at > now,
+            or_(
+                # Tokens issued before sessions existed
+                RefreshToken.session_id.is_(None),
+                exists().where(
+                    UserSession.id == RefreshToken.session_id,
+                    UserSession.revoked == false(),
+                ),
+            ),
+        )
+        .values(revoked=True)
+    )
+
+
+def _touch(session_id, now: datetime):
+    return (
+        update(UserSession).where(UserSession.id == session_id).values(last_used_at=now)
+    )
+
+
+async def rotate_refresh_token(
+    db: AsyncSession,
+    old_digest: bytes,
+    new_digest: bytes,
+    expires_at: datetime,
+    touch_session: bool = True,
+) -> RotatedToken | None:
+    """Revoke the active token ``old_digest`` and store ``new_digest`` in its place.
+
+    Returns the owner, or None if the token is unknown, expired or was
+    already used. Commits on success. With ``touch_session`` false the
+    caller updates the session's ``last_used_at`` itself.
+    """
+    now = utc_now_naive()
+    dialect = db.bind.dialect
+    columns = digest_columns(new_digest)
+
+    if dialect.name == "postgresql":
+        revoked = (
+            _revoke(old_digest, now)
+            .returning(RefreshToken.user_id, RefreshToken.session_id)
+            .cte("revoked")
+        )
+        inserted = (
+            insert(RefreshToken)
+            .from_select(
+                [
+                    "id",
+                    "user_id",
+                    "session_id",
+                    "token_digest",
+                    "token_hash",
+                    "expires_at",
+                    "revoked",
+                    "created_at",
+                ],
+                select(
+                    literal(uuid.uuid4(), RefreshToken.id.type),
+                    revoked.c.user_id,
+                    revoked.c.session_id,
+                    literal(columns["token_digest"], RefreshToken.token_digest.type),
+                    literal(columns["token_hash"], RefreshToken.token_hash.type),
+                    literal(expires_at, RefreshToken.expires_at.type),
+                    literal(False),
+                    literal(now, RefreshToken.created_at.type),
+                ),
+            )
+            .returning(RefreshToken.user_id, RefreshToken.session_id)
+            .cte("inserted")
+        )
+        query = select(User.id, User.token_version, inserted.c.session_id).join(
+            inserted, User.id == inserted.c.user_id
+        )
+        if touch_session:
+            query = query.add_cte(_touch(revoked.c.session_id, now).cte("touched"))
+        row = (await db.execute(query)).first()
+    else:
+        if dialect.update_returning:
+            result = await db.execute(
+                _revoke(old_digest, now).returning(
+                    RefreshToken.user_id, RefreshToken.session_id
+                )
+            )
+            revoked = result.first()
+        else:
+            result = await db.execute(
+                select(RefreshToken.user_id, RefreshToken.session_id).where(
+                    matches_digest(old_digest)
+                )
+            )
+            revoked = result.first()
+            if revoked is not None:
+                result = await db.execute(_revoke(old_digest, now))
+                if result.rowcount != 1:
+                    revoked = None
+        row = None
+        if revoked is not None:
+            user_id, session_id = revoked
+            db.add(
+                RefreshToken(
+                    user_id=user_id,
+                    session_id=session_id,
+                    expires_at=expires_at,
+                    **columns,
+                )
+            )
+            if touch_session and session_id is not None:
+                await db.execute(_touch(session_id, now))
+            token_version = await db.scalar(
+                select(User.token_version).where(User.id == user_id)
+            )
+            row = (user_id, token_version, session_id)
+
+    if row is None:
+        await db.rollback()
+        return None
+    await db.commit()
+    user_id, token_version, session_id = row
+    return RotatedToken(
+        user_id=user_id, token_version=token_version, session_id=session_id
+    )
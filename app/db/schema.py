@@ -0,0 +1,68 @@
+"""
+Schema setup at startup.
+
+Development and test databases get their tables from ``create_all``;
+deployed ones are managed by Alembic. With ``DB_CREATE_TABLES=auto`` the
+``create_all`` pass (one existence check per table and index) is skipped
+when the database is already at the Alembic head. The head is read from the
+migration files directly, since importing Alembic to ask costs more than
+``create_all`` itself.
+"""
+
+import logging
+import re
+from pathlib import Path
+
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from app.db import models  # noqa: F401  (registers the tables)
+from app.db.session import Base
+
+logger = logging.getLogger(__name__)
+
+VERSIONS_DIR = Path(__file__).resolve().parents[2] / "alembic" / "versions"
+
+_REVISION = re.compile(r"^revision(?:\s*:[^=]+)?\s*=\s*['\"](\w+)['\"]", re.M)
+_DOWN_REVISION = re.compile(r"^down_revision(?:\s*:[^=]+)?\s*=\s*(.+)$", re.M)
+_QUOTED = re.compile(r"['\"](\w+)['\"]")
+
+
+def migration_heads(versions_dir: Path = VERSIONS_DIR) -> set[str]:
+    """Revisions no other migration builds on; empty if there are none."""
+    revisions: set[str] = set()
+    parents: set[str] = set()
+    for path in versions_dir.glob("*.py"):
+        source = path.read_text()
+        if match := _REVISION.search(source):
+            revisions.add(match.group(1))
+        if match := _DOWN_REVISION.search(source):
+            parents.update(_QUOTED.findall(match.group(1)))
+    return revisions - parents
+
+
+def _database_revisions(conn) -> set[str]:
+    if not inspect(conn).has_table("alembic_version"):
+        return set()
+    return set(conn.execute(text("SELECT version_num FROM alembic_version")).scalars())
+
+
+async def ensure_schema(engine: AsyncEngine, mode: str = "auto") -> str:
+    """Create missing tables according to ``mode`` ("auto", "always" or
+    "never"); returns "created", "at_head" or "skipped"."""
+    if mode == "never":
+        return "skipped"
+    async with engine.begin() as conn:
+        if mode == "auto":
+            heads = migration_heads()
+            current = await conn.run_sync(_database_revisions)
+            if heads and current == heads:
+                return "at_head"
+            if current:
+                logger.warning(
+                    f"Database is at revision {', '.join(sorted(current))}, not the "
+                    f"migration head {', '.join(sorted(heads))}; "
+                    "run `alembic upgrade head`"
+                )
+        await conn.run_sync(Base.metadata.create_all)
+    return "created"
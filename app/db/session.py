@@ -1,23 +1,68 @@
 """
 Database session configuration.
+
+Request handlers use the async engine. The sync engine is only kept for
+Alembic and ``app.db.init_db``, so it (and its driver) is created on first
+access rather than at import.
 """
 from sqlalchemy import create_engine
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.core.config import settings
+from app.core.metrics import instrument_engine
+from app.db.pool import engine_options, install_idle_pre_ping
+
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def to_async_url(url: str) -> str:
+    """Map a sync database URL onto the matching async driver."""
+    parsed = make_url(url)
+    if parsed.get_driver_name() in ("asyncpg", "aiosqlite"):
+        return url
+    drivername = _ASYNC_DRIVERS.get(parsed.get_backend_name())
+    if drivername is None:
+        raise ValueError(
+            f"No async driver configured for {parsed.get_backend_name()!r}"
+        )
+    return parsed.set(drivername=drivername).render_as_string(hide_password=False)
 
-engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
-SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+_async_url = settings.ASYNC_DATABASE_URL or to_async_url(settings.DATABASE_URL)
+async_engine = create_async_engine(
+    _async_url, **engine_options(_async_url, is_async=True)
+)
+if settings.DB_PRE_PING == "idle":
+    install_idle_pre_ping(async_engine.sync_engine, settings.DB_PRE_PING_IDLE_SECONDS)
+if settings.METRICS_ENABLED:
+    instrument_engine(async_engine.sync_engine)
+# expire_on_commit=False: attributes stay loaded after commit, since async
+# sessions cannot lazy-load them back implicitly.
+AsyncSessionLocal = async_sessionmaker(
+    bind=async_engine, autoflush=False, expire_on_commit=False
+)
 
 
 class Base(DeclarativeBase):
     pass
 
 
-def get_db():
+def __getattr__(name: str):
+    if name in ("engine", "SessionLocal"):
+        engine = create_engine(settings.DATABASE_URL, pool_pre_ping=True)
+        globals().update(
+            engine=engine, SessionLocal=sessionmaker(bind=engine, autoflush=False)
+        )
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+async def get_db():
     """Dependency to get database session."""
-    db = SessionLocal()
-    try:
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
@@ -2,37 +2,44 @@
 Custom SQLAlchemy types for cross-database compatibility.
 """
 import uuid
-from sqlalchemy import String, TypeDecorator, Dialect
+from sqlalchemy import Dialect, LargeBinary, TypeDecorator
 from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
 
 class GUID(TypeDecorator):
     """Platform-independent GUID type.
 
-    Uses PostgreSQL's UUID type when available, otherwise uses String(36).
+    Uses PostgreSQL's UUID type when available, otherwise 16 raw bytes.
+    Values stored as 36-character strings by earlier versions still load.
     """
-    impl = String(36)
+    impl = LargeBinary(16)
     cache_ok = True
 
     def load_dialect_impl(self, dialect: Dialect):
         if dialect.name == "postgresql":
             return dialect.type_descriptor(PG_UUID(as_uuid=True))
         else:
-            return dialect.type_descriptor(String(36))
+            return dialect.type_descriptor(LargeBinary(16))
 
     def process_bind_param(self, value, dialect: Dialect):
         if value is None:
             return value
         elif dialect.name == "postgresql":
+            if not isinstance(value, uuid.UUID):
+                return uuid.UUID(str(value))
             return value
         else:
-            if isinstance(value, uuid.UUID):
-                return str(value)
-            return value
+            if not isinstance(value, uuid.UUID):
+                value = uuid.UUID(str(value))
+            return value.bytes
 
     def process_result_value(self, value, dialect: Dialect):
         if value is None:
             return value
         if isinstance(value, uuid.UUID):
             return value
+        if isinstance(value, bytes):
+            if len(value) == 16:
+                return uuid.UUID(bytes=value)
+            value = value.decode()
         return uuid.UUID(value)
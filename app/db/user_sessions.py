@@ -0,0 +1,117 @@
+"""
+Signed-in sessions (devices).
+
+Each login opens a session and every refresh token rotated from it carries
+its id. Rotation refuses tokens whose session is revoked, so revoking a
+device, or all of them, updates one row per session instead of every token
+row; the reaper removes the tokens afterwards.
+
+Listing uses keyset pagination over ``(created_at, id)``, newest first, so
+each page is an index range scan on ``(user_id, revoked, created_at)``
+however many sessions a user has accumulated.
+"""
+
+import base64
+import uuid
+from datetime import datetime
+
+from sqlalchemy import false, select, tuple_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.db.models import RefreshToken, UserSession, utc_now_naive
+
+
+def new_session(
+    user_id: uuid.UUID,
+    device_label: str | None = None,
+    ip_address: str | None = None,
+    user_agent: str | None = None,
+) -> UserSession:
+    """Build a session with a client-side id, so tokens can reference it unflushed."""
+    now = utc_now_naive()
+    return UserSession(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        device_label=device_label[:100] if device_label else None,
+        ip_address=ip_address[:45] if ip_address else None,
+        user_agent=user_agent[:512] if user_agent else None,
+        revoked=False,
+        created_at=now,
+        last_used_at=now,
+    )
+
+
+def encode_cursor(session: UserSession) -> str:
+    raw = f"{session.created_at.isoformat()}|{session.id.hex}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    """Parse a cursor from ``encode_cursor``; raises ValueError if malformed."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, session_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(hex=session_id)
+    except (TypeError, UnicodeDecodeError, ValueError) as e:
+        raise ValueError("Invalid cursor") from e
+
+
+async def list_sessions(
+    db: AsyncSession,
+    user_id: uuid.UUID,
+    limit: int = 20,
+    cursor: str | None = None,
+) -> tuple[list[UserSession], str | None]:
+    """Return a page of active sessions, newest first, and the next cursor."""
+    query = (
+        select(UserSession)
+        .where(UserSession.user_id == user_id, UserSession.revoked == false())
+        .order_by(UserSession.created_at.desc(), UserSession.id.desc())
+        .limit(limit + 1)
+    )
+    if cursor:
+        query = query.where(
+            tuple_(UserSession.created_at, UserSession.id)
+            < tuple_(*decode_cursor(cursor))
+        )
+    sessions = list((await db.scalars(query)).all())
+    if len(sessions) > limit:
+        del sessions[limit:]
+        return sessions, encode_cursor(sessions[-1])
+    return sessions, None
+
+
+async def revoke_session(
+    db: AsyncSession, user_id: uuid.UUID, session_id: uuid.UUID
+) -> bool:
+    """Revoke one of the user's sessions; False if there is no such active session."""
+    result = await db.execute(
+        update(UserSession)
+        .where(
+            UserSession.id == session_id,
+            UserSession.user_id == user_id,
+            UserSession.revoked == false(),
+        )
+        .values(revoked=True)
+    )
+    return result.rowcount == 1
+
+
+async def revoke_all_sessions(db: AsyncSession, user_id: uuid.UUID) -> int:
+    """Revoke every session of the user; returns the number revoked."""
+    result = await db.execute(
+        update(UserSession)
+        .where(UserSession.user_id == user_id, UserSession.revoked == false())
+        .values(revoked=True)
+    )
+    # Tokens issued before sessions existed have nothing to revoke them by
+    await db.execute(
+        update(RefreshToken)
+        .where(
+            RefreshToken.user_id == user_id,
+            RefreshToken.session_id.is_(None),
+            RefreshToken.revoked == false(),
+        )
+        .values(revoked=True)
+    )
+    return result.rowcount
@@ -1,21 +1,29 @@
+"""
+Application factory.
+
+``create_app(settings)`` builds the ASGI app. Route modules are imported
+when an app is built, and what only startup needs (Redis, the reaper, the
+write-behind queue, the breach store, the schema check) when its lifespan
+runs, so importing this module stays cheap. The default instance ``app`` is
+built on first access, for ``uvicorn app.main:app``; ``uvicorn --factory
+app.main:create_app`` works as well. ``python -m app.server
+--profile-startup`` reports where cold-start time goes.
+
+``settings`` decides what the factory and lifespan set up; modules that
+read ``app.core.config.settings`` at import (JWT keys, rate limits) still
+use the process-wide settings.
+"""
+import asyncio
 import os
 from contextlib import asynccontextmanager
+from datetime import timedelta
 import logging
 
-from fastapi import FastAPI
-from fastapi.middleware.cors import CORSMiddleware
-from fastapi_limiter import FastAPILimiter
-
-from app.api.routes.auth import router as auth_router
-from app.api.routes.users import router as users_router
-from app.core.config import settings
-from app.core.middleware import (
-    SecurityHeadersMiddleware,
-    RequestIDMiddleware,
-    RequestLoggingMiddleware,
-)
-from app.db.session import engine, Base
-from app.db.models import User, RefreshToken  # noqa: F401
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from app.core.config import Settings, settings as default_settings
+from app.core.startup import StartupTimer
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,12 +35,6 @@ TESTING = os.getenv("TESTING", "").lower() in ("1", "true", "yes")
 class FakeRedis:
     """Fake Redis client for testing without a real Redis server."""
 
-    async def evalsha(self, *args, **kwargs):
-        return 0
-
-    async def script_load(self, script):
-        return "fake_sha_hash"
-
     async def close(self):
         pass
 
@@ -49,128 +51,226 @@ class FakeTokenBlacklist:
     async def add(self, jti: str, exp: int):
         self._blacklisted.add(jti)
 
+    async def add_many(self, tokens) -> int:
+        tokens = list(tokens)
+        self._blacklisted.update(jti for jti, _ in tokens)
+        return len(tokens)
+
     async def is_blacklisted(self, jti: str) -> bool:
         return jti in self._blacklisted
 
+    async def are_blacklisted(self, jtis) -> list[bool]:
+        return [jti in self._blacklisted for jti in jtis]
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan - startup and shutdown events."""
+    from app.core.hashing import hashing_executor, resolve_hash_parameters
+    from app.core.token_blacklist import TokenBlacklist
+    from app.core.user_cache import UserCache
+    from app.db.session import async_engine
+    from auth.validator import configure_blacklist, configure_breach_store
+
+    settings: Settings = app.state.settings
+    timer = app.state.startup_timer = StartupTimer()
     logger.info("Starting up...")
 
-    # Initialize database tables
-    logger.info("Creating database tables...")
-    Base.metadata.create_all(bind=engine)
-    logger.info("Database tables ready!")
-
-    if TESTING:
-        logger.info("Testing mode: Using fake Redis...")
-        fake_redis = FakeRedis()
-        await FastAPILimiter.init(fake_redis)
-        app.state.redis = fake_redis
-        app.state.token_blacklist = FakeTokenBlacklist()
-        logger.info("Testing mode: Fake Redis initialized!")
-    else:
-        logger.info("Connecting to Redis...")
-        try:
-            import redis.asyncio as aioredis
-            from app.core.token_blacklist import TokenBlacklist
-
-            redis_client = aioredis.from_url(
-                settings.REDIS_URL,
-                encoding="utf-8",
-                decode_responses=True,
+    with timer.phase("schema"):
+        from app.db.schema import ensure_schema
+
+        schema = await ensure_schema(async_engine, settings.DB_CREATE_TABLES)
+    logger.info(f"Database schema: {schema}")
+
+    with timer.phase("hashing_pool"):
+        hashing_executor.configure(await asyncio.to_thread(resolve_hash_parameters))
+        hashing_executor.start()
+
+    with timer.phase("password_lists"):
+        from auth.breach import open_store
+
+        # Only records the path; the list is opened on first use
+        configure_blacklist(settings.PASSWORD_BLACKLIST_PATH)
+        app.state.breach_store = open_store(
+            settings.BREACHED_PASSWORDS_PATH,
+            settings.BREACHED_PASSWORDS_URL,
+            timeout=settings.BREACHED_PASSWORDS_TIMEOUT_SECONDS,
+            fail_closed=settings.BREACHED_PASSWORDS_FAIL_CLOSED,
+        )
+        configure_breach_store(app.state.breach_store)
+
+    with timer.phase("redis"):
+        if TESTING:
+            logger.info("Testing mode: Using fake Redis...")
+            fake_redis = FakeRedis()
+            app.state.redis = fake_redis
+            app.state.token_blacklist = FakeTokenBlacklist()
+            app.state.user_cache = UserCache(
+                max_size=settings.USER_CACHE_MAX_SIZE,
+                ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+            )
+            logger.info("Testing mode: Fake Redis initialized!")
+        else:
+            logger.info("Connecting to Redis...")
+            try:
+                import redis.asyncio as aioredis
+
+                if settings.REDIS_MAX_CONNECTIONS:
+                    redis_client = aioredis.Redis.from_pool(
+                        aioredis.BlockingConnectionPool.from_url(
+                            settings.REDIS_URL,
+                            max_connections=settings.REDIS_MAX_CONNECTIONS,
+                            encoding="utf-8",
+                            decode_responses=True,
+                        )
+                    )
+                else:
+                    redis_client = aioredis.from_url(
+                        settings.REDIS_URL,
+                        encoding="utf-8",
+                        decode_responses=True,
+                    )
+                app.state.redis = redis_client
+                app.state.token_blacklist = TokenBlacklist(
+                    redis_client,
+                    local_filter=settings.BLACKLIST_LOCAL_FILTER,
+                    filter_capacity=settings.BLACKLIST_FILTER_CAPACITY,
+                    filter_error_rate=settings.BLACKLIST_FILTER_ERROR_RATE,
+                    rebuild_interval=settings.BLACKLIST_FILTER_REBUILD_SECONDS,
+                    batch_window=settings.BLACKLIST_BATCH_WINDOW_MS / 1000,
+                    batch_max_size=settings.BLACKLIST_BATCH_MAX_SIZE,
+                )
+                app.state.token_blacklist.start()
+                app.state.user_cache = UserCache(
+                    max_size=settings.USER_CACHE_MAX_SIZE,
+                    ttl_seconds=settings.USER_CACHE_TTL_SECONDS,
+                    redis_client=redis_client,
+                )
+                app.state.user_cache.start()
+                logger.info("Redis connected!")
+            except Exception as e:
+                logger.warning(f"Redis connection failed: {e}")
+                app.state.redis = None
+                app.state.token_blacklist = None
+                # Without cross-worker invalidation the cache could serve
+                # revoked sessions, so keep it disabled.
+                app.state.user_cache = UserCache(max_size=0)
+
+    with timer.phase("limits"):
+        from app.core.login_throttle import LoginThrottle
+        from app.core.rate_limit import RateLimiter
+
+        # Created per startup so limiter state never outlives the app
+        app.state.rate_limiter = None
+        if settings.RATE_LIMIT_ENABLED:
+            app.state.rate_limiter = RateLimiter(
+                algorithm=settings.RATE_LIMIT_ALGORITHM,
+                redis_client=app.state.redis if not TESTING else None,
+                local_fraction=settings.RATE_LIMIT_LOCAL_FRACTION,
+                max_keys=settings.RATE_LIMIT_MAX_KEYS,
             )
-            await FastAPILimiter.init(redis_client)
-            app.state.redis = redis_client
-            app.state.token_blacklist = TokenBlacklist(redis_client)
-            logger.info("Redis connected!")
-        except Exception as e:
-            logger.warning(f"Redis connection failed: {e}")
-            app.state.redis = None
-            app.state.token_blacklist = None
-
-    logger.info("Auth service ready!")
+
+        app.state.login_throttle = None
+        if settings.LOGIN_THROTTLE_ENABLED:
+            app.state.login_throttle = LoginThrottle(
+                redis_client=app.state.redis if not TESTING else None,
+                max_account_failures=settings.LOGIN_ACCOUNT_MAX_FAILURES,
+                max_ip_failures=settings.LOGIN_IP_MAX_FAILURES,
+                failure_window=settings.LOGIN_FAILURE_WINDOW_SECONDS,
+                base_lockout=settings.LOGIN_LOCKOUT_BASE_SECONDS,
+                max_lockout=settings.LOGIN_LOCKOUT_MAX_SECONDS,
+                local_ttl=settings.LOGIN_THROTTLE_LOCAL_TTL_SECONDS,
+            )
+
+    with timer.phase("background_tasks"):
+        from app.db.reaper import RefreshTokenReaper
+        from app.db.write_behind import RefreshTokenWriter
+
+        app.state.token_reaper = RefreshTokenReaper(
+            async_engine,
+            interval=0 if TESTING else settings.REFRESH_TOKEN_REAPER_INTERVAL_SECONDS,
+            batch_size=settings.REFRESH_TOKEN_REAPER_BATCH_SIZE,
+            months_ahead=settings.REFRESH_TOKEN_PARTITION_MONTHS_AHEAD,
+            session_max_idle=timedelta(days=settings.REFRESH_TOKEN_EXPIRE_DAYS),
+        )
+        app.state.token_reaper.start()
+
+        app.state.token_writer = None
+        if settings.REFRESH_TOKEN_WRITE_BEHIND != "off":
+            app.state.token_writer = RefreshTokenWriter(
+                async_engine,
+                durable=settings.REFRESH_TOKEN_WRITE_BEHIND == "flush",
+                window=settings.REFRESH_TOKEN_WRITE_BEHIND_WINDOW_MS / 1000,
+                max_batch=settings.REFRESH_TOKEN_WRITE_BEHIND_MAX_BATCH,
+                max_pending=settings.REFRESH_TOKEN_WRITE_BEHIND_MAX_PENDING,
+            )
+            app.state.token_writer.start()
+
+    logger.info(f"Auth service ready in {timer.total():.0f}ms ({timer.summary()})")
     yield
     logger.info("Shutting down...")
-    await FastAPILimiter.close()
+    if app.state.token_writer:
+        # Before the engine is disposed, so queued writes are not lost
+        await app.state.token_writer.stop()
+    await app.state.token_reaper.stop()
+    await app.state.user_cache.stop()
+    if isinstance(app.state.token_blacklist, TokenBlacklist):
+        await app.state.token_blacklist.stop()
+    hashing_executor.shutdown()
+    if app.state.breach_store:
+        configure_breach_store(None)
+        await app.state.breach_store.close()
     if hasattr(app.state, 'redis') and app.state.redis and not TESTING:
         await app.state.redis.close()
+    await async_engine.dispose()
 
 
-app = FastAPI(
-    title="Auth Service API",
-    description="""
-## Secure Authentication Service
+async def hashing_pool_busy_handler(request: Request, exc):
+    """Shed load when the password hashing queue is full."""
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Service busy, please retry"},
+        headers={"Retry-After": str(exc.retry_after)},
+    )
+
+
+async def breach_check_unavailable_handler(request: Request, exc):
+    """A fail-closed breached-password check could not be made."""
+    logger.warning(f"Breached-password check unavailable: {exc}")
+    return JSONResponse(
+        status_code=503,
+        content={"detail": "Password check unavailable, please retry"},
+        headers={"Retry-After": "1"},
+    )
 
-### Features:
-- 🔐 JWT-based authentication
-- 🔄 Token refresh flow
-- 🚪 Logout from all devices
-- 🛡️ Rate limiting
-- 📝 Token blacklisting
 
-### Authentication:
-Use the `Authorization: Bearer <token>` header for protected endpoints.
-    """,
-    version="1.0.0",
-    lifespan=lifespan,
-    docs_url="/docs",
-    redoc_url="/redoc",
-    contact={
-        "name": "Jasbir Singh",
-        "url": "https://github.com/Jasbir88/secure-auth-python",
-    },
-    license_info={
-        "name": "MIT",
-    },
-)
-
-# Add middleware
-app.add_middleware(SecurityHeadersMiddleware)
-app.add_middleware(RequestIDMiddleware)
-app.add_middleware(RequestLoggingMiddleware)
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=settings.ALLOWED_ORIGINS,
-    allow_credentials=True,
-    allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"],
-    allow_headers=["*"],
-    expose_headers=["X-Request-ID", "X-Process-Time"],
-)
-
-# Include routers
-app.include_router(auth_router)
-app.include_router(users_router)
-
-
-@app.get("/health")
-@app.head("/health")
 def health():
     """Basic health check."""
     return {"status": "ok"}
 
 
-@app.get("/health/ready")
-@app.head("/health/ready")
-async def readiness():
+async def readiness(request: Request):
     """Readiness check with dependency status."""
+    from sqlalchemy import text
+
+    from app.db.session import async_engine
+
+    state = request.app.state
     redis_ok = False
     db_ok = False
 
     try:
         if TESTING:
             redis_ok = True
-        elif app.state.redis:
-            await app.state.redis.ping()
+        elif state.redis:
+            await state.redis.ping()
             redis_ok = True
     except Exception:
         pass
 
     try:
-        from sqlalchemy import text
-        with engine.connect() as conn:
-            conn.execute(text("SELECT 1"))
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
         db_ok = True
     except Exception:
         pass
@@ -181,11 +281,10 @@ async def readiness():
         "dependencies": {
             "database": "connected" if db_ok else "disconnected",
             "redis": "connected" if redis_ok else "disconnected",
-        }
+        },
     }
 
 
-@app.get("/")
 def root():
     """API root."""
     return {
@@ -193,3 +292,82 @@ def root():
         "version": "1.0.0",
         "docs": "/docs",
     }
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    """Build the application; ``settings`` defaults to the environment's."""
+    from fastapi.middleware.cors import CORSMiddleware
+
+    from app.api.routes.auth import router as auth_router
+    from app.api.routes.breach import router as breach_router
+    from app.api.routes.jwks import router as jwks_router
+    from app.api.routes.metrics import router as metrics_router
+    from app.api.routes.users import router as users_router
+    from app.core.hashing import HashingPoolBusy
+    from app.core.middleware import SecurityMiddleware
+    from auth.breach import BreachCheckUnavailable
+
+    settings = settings or default_settings
+    app = FastAPI(
+        title="Auth Service API",
+        description="""
+## Secure Authentication Service
+
+### Features:
+- 🔐 JWT-based authentication
+- 🔄 Token refresh flow
+- 🚪 Logout from all devices
+- 🛡️ Rate limiting
+- 📝 Token blacklisting
+
+### Authentication:
+Use the `Authorization: Bearer <token>` header for protected endpoints.
+        """,
+        version="1.0.0",
+        lifespan=lifespan,
+        docs_url="/docs",
+        redoc_url="/redoc",
+        contact={
+            "name": "Jasbir Singh",
+            "url": "https://github.com/Jasbir88/secure-auth-python",
+        },
+        license_info={
+            "name": "MIT",
+        },
+    )
+    app.state.settings = settings
+
+    # Add middleware
+    app.add_middleware(SecurityMiddleware, metrics=settings.METRICS_ENABLED)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=settings.ALLOWED_ORIGINS,
+        allow_credentials=True,
+        allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "HEAD", "OPTIONS"],
+        allow_headers=["*"],
+        expose_headers=["X-Request-ID", "X-Process-Time"],
+    )
+
+    # Include routers
+    app.include_router(auth_router)
+    app.include_router(users_router)
+    app.include_router(jwks_router)
+    app.include_router(breach_router)
+    app.include_router(metrics_router)
+
+    app.add_exception_handler(HashingPoolBusy, hashing_pool_busy_handler)
+    app.add_exception_handler(BreachCheckUnavailable, breach_check_unavailable_handler)
+
+    app.get("/health")(health)
+    app.head("/health")(health)
+    app.get("/health/ready")(readiness)
+    app.head("/health/ready")(readiness)
+    app.get("/")(root)
+    return app
+
+
+def __getattr__(name: str):
+    if name == "app":
+        globals()["app"] = create_app()
+        return globals()["app"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,14 +1,16 @@
-from pydantic import BaseModel, EmailStr
+from pydantic import BaseModel, EmailStr, Field
 
 
 class RegisterRequest(BaseModel):
     email: EmailStr
     password: str
+    device_label: str | None = Field(default=None, max_length=100)
 
 
 class LoginRequest(BaseModel):
     email: EmailStr
     password: str
+    device_label: str | None = Field(default=None, max_length=100)
 
 
 class RefreshRequest(BaseModel):
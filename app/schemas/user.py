@@ -36,3 +36,21 @@ class ChangePasswordRequest(BaseModel):
     """Request to change password."""
     current_password: str
     new_password: str
+
+
+class SessionResponse(BaseModel):
+    """A signed-in device."""
+    id: UUID
+    device_label: str | None
+    ip_address: str | None
+    user_agent: str | None
+    created_at: datetime
+    last_used_at: datetime
+
+    model_config = ConfigDict(from_attributes=True)
+
+
+class SessionListResponse(BaseModel):
+    """A page of sessions; pass next_cursor back to get the next one."""
+    items: list[SessionResponse]
+    next_cursor: str | None = None
@@ -0,0 +1,501 @@
+"""
+Server entry point.
+
+    python -m app.server [--host 0.0.0.0] [--port 3000] [--workers N]
+    python -m app.server --profile-startup [--json startup.json]
+
+The master process splits the connection budgets between the workers,
+builds the app once (routes, JWT keys, compiled patterns, the password
+blacklist), creates missing tables, calibrates Argon2 if enabled (so every
+worker hashes with the same parameters), binds the listening socket and then
+forks the workers, which share those pages copy-on-write and accept on the
+same socket. Each worker runs uvicorn with its own event loop and runs the
+app's lifespan itself, so pools, caches and background tasks are per
+worker and never cross a fork.
+
+Signals to the master:
+
+- SIGHUP replaces the workers one at a time: a new worker is started and,
+  once its lifespan is up, an old one is sent SIGTERM and finishes its
+  in-flight requests. Capacity never drops below the worker count. The
+  workers are forked from the already loaded master, so this refreshes
+  connections and opened files, not code; deploy code with a new master.
+- SIGTERM / SIGINT stop the workers gracefully and exit.
+
+Workers that crash are replaced; a worker that fails to start stops the
+master (exit status 3), since its replacements would fail the same way.
+
+With more than one worker, metrics need prometheus_client's multiprocess
+mode: unless ``PROMETHEUS_MULTIPROC_DIR`` is set a temporary directory is
+used, and the files of exited workers are marked dead.
+
+``--profile-startup`` imports the app in stages, builds it and runs its
+lifespan startup and shutdown against the configured database and Redis,
+then prints how long each phase took instead of serving. For a per-module
+breakdown of the import phases use ``python -X importtime -m app.server
+--profile-startup``.
+"""
+
+import argparse
+import asyncio
+import gc
+import importlib
+import json
+import logging
+import os
+import select
+import signal
+import tempfile
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Exit status of a worker (and the master) when the app fails to start
+WORKER_BOOT_ERROR = 3
+READY = b"1"
+# Time allowed for the lifespan shutdown after connections have closed
+SHUTDOWN_GRACE_SECONDS = 5.0
+# The user cache and token blacklist listeners each hold a Redis connection
+MIN_REDIS_CONNECTIONS = 4
+
+# Imported in this order, so each phase only counts what earlier ones did not
+IMPORT_PHASES = [
+    ("fastapi", ("fastapi",)),
+    ("sqlalchemy", ("sqlalchemy.ext.asyncio", "sqlalchemy.orm")),
+    ("settings", ("app.core.config",)),
+    ("database", ("app.db.session", "app.db.models")),
+    ("security", ("app.core.security", "app.core.hashing")),
+    (
+        "routes",
+        (
+            "app.api.routes.auth",
+            "app.api.routes.users",
+            "app.api.routes.jwks",
+            "app.api.routes.breach",
+            "app.api.routes.metrics",
+        ),
+    ),
+    ("app", ("app.main",)),
+]
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and a cgroup v2 quota."""
+    try:
+        count = len(os.sched_getaffinity(0))
+    except AttributeError:
+        count = os.cpu_count() or 1
+    try:
+        quota, period = Path("/sys/fs/cgroup/cpu.max").read_text().split()
+        if quota != "max":
+            count = min(count, max(1, int(quota) // int(period)))
+    except (OSError, ValueError):
+        pass
+    return count
+
+
+def share_budgets(
+    settings, workers: int, cpus: int | None = None
+) -> dict[str, int | None]:
+    """Set this process's pool sizes to its share of the connection and
+    hashing budgets; returns the per-worker values."""
+    if settings.SERVER_DB_CONNECTION_BUDGET:
+        per_worker = max(1, settings.SERVER_DB_CONNECTION_BUDGET // workers)
+        settings.DB_POOL_SIZE = min(settings.DB_POOL_SIZE, per_worker)
+        settings.DB_MAX_OVERFLOW = per_worker - settings.DB_POOL_SIZE
+    if settings.SERVER_REDIS_CONNECTION_BUDGET:
+        settings.REDIS_MAX_CONNECTIONS = max(
+            MIN_REDIS_CONNECTIONS, settings.SERVER_REDIS_CONNECTION_BUDGET // workers
+        )
+    # Argon2 is CPU-bound: every worker's hashing pool draws on the same CPUs
+    hash_budget = settings.SERVER_HASH_POOL_BUDGET or cpus or available_cpus()
+    settings.HASH_POOL_WORKERS = min(
+        settings.HASH_POOL_WORKERS, max(1, hash_budget // workers)
+    )
+    return {
+        "db_pool_size": settings.DB_POOL_SIZE,
+        "db_max_overflow": settings.DB_MAX_OVERFLOW,
+        "redis_max_connections": settings.REDIS_MAX_CONNECTIONS,
+        "hash_pool_workers": settings.HASH_POOL_WORKERS,
+    }
+
+
+def _prepare_metrics_dir(workers: int) -> None:
+    """Before prometheus_client is imported: workers must share a directory,
+    and files left by a previous run would be aggregated as live."""
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if not path and workers > 1:
+        path = os.environ["PROMETHEUS_MULTIPROC_DIR"] = tempfile.mkdtemp(
+            prefix="auth-metrics-"
+        )
+    if path:
+        for stale in Path(path).glob("*.db"):
+            stale.unlink()
+
+
+def _mark_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(pid)
+
+
+@dataclass
+class Worker:
+    pid: int
+    ready_fd: int | None
+
+    def wait_ready(self, timeout: float) -> bool:
+        """Whether the worker's lifespan started within ``timeout``."""
+        if self.ready_fd is None:
+            return True
+        readable, _, _ = select.select([self.ready_fd], [], [], timeout)
+        if not readable:
+            return False
+        ready = os.read(self.ready_fd, 1) == READY
+        self.close()
+        return ready
+
+    def close(self) -> None:
+        if self.ready_fd is not None:
+            os.close(self.ready_fd)
+            self.ready_fd = None
+
+
+def _worker_server(config, ready_fd: int):
+    import uvicorn
+
+    class WorkerServer(uvicorn.Server):
+        """Reports to the master once the lifespan is up and the socket served."""
+
+        async def startup(self, sockets=None):
+            await super().startup(sockets)
+            if self.started:
+                os.write(ready_fd, READY)
+            os.close(ready_fd)
+
+    return WorkerServer(config)
+
+
+class Arbiter:
+    """Forks workers serving one listening socket and keeps them running."""
+
+    def __init__(
+        self,
+        config,
+        sock,
+        workers: int,
+        graceful_timeout: float = 30.0,
+        ready_timeout: float = 60.0,
+    ):
+        self.config = config
+        self.sock = sock
+        self.count = workers
+        self.graceful_timeout = graceful_timeout
+        self.ready_timeout = ready_timeout
+        self.workers: dict[int, Worker] = {}
+        self._expected_exits: set[int] = set()
+        self._halt = False
+        self._signals: list[int] = []
+        self._wakeup = threading.Event()
+
+    def _on_signal(self, signum, frame) -> None:
+        self._signals.append(signum)
+        self._wakeup.set()
+
+    def _stop_requested(self) -> bool:
+        return signal.SIGTERM in self._signals or signal.SIGINT in self._signals
+
+    def spawn(self) -> Worker:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self._run_worker(write_fd)
+        os.close(write_fd)
+        worker = self.workers[pid] = Worker(pid, read_fd)
+        return worker
+
+    def _run_worker(self, ready_fd: int) -> None:
+        code = 1
+        try:
+            # Undo the master's handlers; uvicorn installs its own
+            for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGCHLD):
+                signal.signal(signum, signal.SIG_DFL)
+            signal.signal(signal.SIGHUP, signal.SIG_IGN)
+            for sibling in self.workers.values():
+                sibling.close()
+            server = _worker_server(self.config, ready_fd)
+            server.run(sockets=[self.sock])
+            code = 0 if server.started else WORKER_BOOT_ERROR
+        except SystemExit as e:
+            # uvicorn exits with 3 (WORKER_BOOT_ERROR) when the lifespan fails
+            code = e.code if isinstance(e.code, int) else 1
+        except BaseException:
+            logger.exception(f"Worker {os.getpid()} failed")
+        finally:
+            os._exit(code)
+
+    def _reap(self) -> None:
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            worker = self.workers.pop(pid, None)
+            if worker is None:
+                continue
+            worker.close()
+            _mark_dead(pid)
+            code = os.waitstatus_to_exitcode(status)
+            if pid in self._expected_exits:
+                self._expected_exits.discard(pid)
+            elif code == WORKER_BOOT_ERROR:
+                logger.error(f"Worker {pid} failed to start")
+                self._halt = True
+            else:
+                logger.warning(
+                    f"Worker {pid} exited unexpectedly (status {code}); replacing it"
+                )
+
+    def _wait_exit(self, pids: list[int], timeout: float) -> list[int]:
+        """Reap until ``pids`` have exited or ``timeout`` passes; returns the rest."""
+        deadline = time.monotonic() + timeout
+        while True:
+            self._reap()
+            remaining = [pid for pid in pids if pid in self.workers]
+            if not remaining or time.monotonic() >= deadline:
+                return remaining
+            time.sleep(0.05)
+
+    def _kill(self, pids: list[int], signum: int) -> None:
+        for pid in pids:
+            self._expected_exits.add(pid)
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    def retire(self, workers: list[Worker]) -> None:
+        """Stop ``workers`` gracefully, killing those that overrun the timeout."""
+        pids = [worker.pid for worker in workers if worker.pid in self.workers]
+        self._kill(pids, signal.SIGTERM)
+        remaining = self._wait_exit(
+            pids, self.graceful_timeout + SHUTDOWN_GRACE_SECONDS
+        )
+        if remaining:
+            logger.warning(f"Workers {remaining} did not stop in time; killing them")
+            self._kill(remaining, signal.SIGKILL)
+            self._wait_exit(remaining, SHUTDOWN_GRACE_SECONDS)
+
+    def rolling_restart(self) -> None:
+        logger.info(f"Rolling restart of {len(self.workers)} workers")
+        for old in list(self.workers.values()):
+            if self._stop_requested() or self._halt:
+                return
+            if old.pid not in self.workers:
+                continue
+            new = self.spawn()
+            if not new.wait_ready(self.ready_timeout):
+                logger.error(
+                    "Replacement worker did not start; keeping the current workers"
+                )
+                self.retire([new])
+                return
+            self.retire([old])
+        logger.info("Rolling restart complete")
+
+    def run(self) -> int:
+        """Serve until told to stop; returns the exit status."""
+        for signum in (signal.SIGTERM, signal.SIGINT, signal.SIGHUP, signal.SIGCHLD):
+            signal.signal(signum, self._on_signal)
+
+        booting = [self.spawn() for _ in range(self.count)]
+        if not all(worker.wait_ready(self.ready_timeout) for worker in booting):
+            logger.error("Workers failed to start")
+            self.retire(list(self.workers.values()))
+            return WORKER_BOOT_ERROR
+        logger.info(f"Master {os.getpid()} serving with {self.count} workers")
+
+        while True:
+            self._wakeup.wait(1.0)
+            self._wakeup.clear()
+            self._reap()
+            if self._halt or self._stop_requested():
+                break
+            if signal.SIGHUP in self._signals:
+                self._signals = [s for s in self._signals if s != signal.SIGHUP]
+                self.rolling_restart()
+                continue
+            self._signals.clear()
+            while len(self.workers) < self.count:
+                self.spawn()
+
+        logger.info("Stopping workers...")
+        self.retire(list(self.workers.values()))
+        return WORKER_BOOT_ERROR if self._halt else 0
+
+
+def pin_hash_parameters(settings) -> None:
+    """Resolve the Argon2 parameters once and fix them in ``settings``.
+
+    Workers calibrating in their own lifespans would run concurrently, slow
+    each other down and settle on different parameters, making
+    ``needs_rehash`` rewrite hashes back and forth between them.
+    """
+    from app.core.hashing import resolve_hash_parameters
+
+    params = resolve_hash_parameters()
+    settings.ARGON2_TIME_COST = params.time_cost
+    settings.ARGON2_MEMORY_COST_KIB = params.memory_cost
+    settings.ARGON2_PARALLELISM = params.parallelism
+    settings.ARGON2_CALIBRATE = False
+
+
+async def _prepare_schema(settings) -> str:
+    from app.db.schema import ensure_schema
+    from app.db.session import async_engine
+
+    try:
+        return await ensure_schema(async_engine, settings.DB_CREATE_TABLES)
+    finally:
+        # No connection may cross the fork
+        await async_engine.dispose()
+
+
+def serve(args) -> int:
+    """Build the app, fork the workers and supervise them."""
+    from app.core.config import settings
+
+    workers = args.workers if args.workers > 0 else available_cpus()
+    # Before anything creates an engine, Redis pool, hashing pool or metric
+    budgets = share_budgets(settings, workers)
+    if settings.METRICS_ENABLED:
+        _prepare_metrics_dir(workers)
+
+    import uvicorn
+
+    from app.main import create_app
+    from auth.validator import configure_blacklist, preload_blacklist
+
+    app = create_app(settings)
+    schema = asyncio.run(_prepare_schema(settings))
+    logger.info(f"Database schema: {schema}")
+    # Done once here instead of racing in every worker
+    settings.DB_CREATE_TABLES = "never"
+    pin_hash_parameters(settings)
+    configure_blacklist(settings.PASSWORD_BLACKLIST_PATH)
+    preload_blacklist()
+
+    config = uvicorn.Config(
+        app,
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level,
+        timeout_graceful_shutdown=int(settings.SERVER_GRACEFUL_TIMEOUT_SECONDS),
+    )
+    sock = config.bind_socket()
+    logger.info(f"Per-worker connection limits: {budgets}")
+
+    # Keep the collector from touching (and so copying) the preloaded objects
+    gc.collect()
+    gc.freeze()
+    arbiter = Arbiter(
+        config,
+        sock,
+        workers,
+        graceful_timeout=settings.SERVER_GRACEFUL_TIMEOUT_SECONDS,
+        ready_timeout=settings.SERVER_READY_TIMEOUT_SECONDS,
+    )
+    try:
+        return arbiter.run()
+    finally:
+        sock.close()
+        # Gauges created at import time gave the master metric files too
+        _mark_dead(os.getpid())
+
+
+def _elapsed_ms(start: float) -> float:
+    return round((time.perf_counter() - start) * 1000, 2)
+
+
+async def _run_lifespan(app) -> float:
+    async with app.router.lifespan_context(app):
+        shutdown = time.perf_counter()
+    return _elapsed_ms(shutdown)
+
+
+def profile_startup() -> dict[str, dict[str, float]]:
+    """Wall time in milliseconds of each import, build and lifespan phase."""
+    imports = {}
+    for name, modules in IMPORT_PHASES:
+        start = time.perf_counter()
+        for module in modules:
+            importlib.import_module(module)
+        imports[name] = _elapsed_ms(start)
+
+    from app.main import create_app
+
+    start = time.perf_counter()
+    app = create_app()
+    build = {"create_app": _elapsed_ms(start)}
+
+    shutdown = asyncio.run(_run_lifespan(app))
+    lifespan = dict(app.state.startup_timer.phases)
+    lifespan["shutdown"] = shutdown
+    return {"import": imports, "build": build, "lifespan": lifespan}
+
+
+def _print_profile(profile: dict[str, dict[str, float]]) -> None:
+    total = 0.0
+    for section, phases in profile.items():
+        for name, ms in phases.items():
+            if name != "shutdown":
+                total += ms
+            print(f"{section:<9} {name:<17} {ms:>9.1f} ms")
+    print(f"{'total':<27} {total:>9.1f} ms (to ready)")
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Run the auth service.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=3000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="worker processes, 0 for one per CPU (default: SERVER_WORKERS)",
+    )
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="report startup phase timings and exit instead of serving",
+    )
+    parser.add_argument(
+        "--json", help="with --profile-startup, also write the timings here"
+    )
+    args = parser.parse_args(argv)
+
+    if args.profile_startup:
+        profile = profile_startup()
+        _print_profile(profile)
+        if args.json:
+            with open(args.json, "w") as f:
+                json.dump(profile, f, indent=2)
+                f.write("\n")
+        return
+
+    if args.workers is None:
+        from app.core.config import settings
+
+        args.workers = settings.SERVER_WORKERS
+    raise SystemExit(serve(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+"""
+Compact password blacklist index.
+
+An index file holds the 8-byte BLAKE2b hashes of the listed passwords
+(stripped and lower-cased; lookups lower-case the candidate), sorted and
+de-duplicated, after a 16-byte header:
+
+    b"PWBLIDX1" | uint64 entry count (big-endian) | hash | hash | ...
+
+Lookups binary-search the memory-mapped file, so a corpus of millions of
+passwords costs 8 bytes per entry on disk, nothing is parsed at startup,
+and the pages are shared between workers through the page cache instead
+of each worker holding its own copy. With 64-bit hashes a false positive
+needs a collision, about n / 2**64 per lookup.
+
+Build an index from a plain-text list (one password per line):
+
+    python -m auth.blacklist build passwords.txt passwords.idx
+
+Input of any size is hashed in sorted runs of ``--chunk-size`` entries and
+merged, so memory stays bounded.
+"""
+
+import argparse
+import bisect
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, Iterator
+
+MAGIC = b"PWBLIDX1"
+HEADER = struct.Struct(">8sQ")
+ENTRY_SIZE = 8
+
+
+def normalize(entry: str) -> str:
+    return entry.strip().lower()
+
+
+def password_hash(normalized: str) -> bytes:
+    return hashlib.blake2b(
+        normalized.encode("utf-8", "surrogatepass"), digest_size=ENTRY_SIZE
+    ).digest()
+
+
+class TextBlacklist:
+    """Small blacklist held in memory, from a plain-text file."""
+
+    def __init__(self, path: str | os.PathLike):
+        try:
+            with open(path, encoding="utf-8") as f:
+                self._entries = frozenset(normalize(line) for line in f if line.strip())
+        except FileNotFoundError:
+            self._entries = frozenset()
+
+    def __contains__(self, password: str) -> bool:
+        return password.lower() in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _Entries:
+    """Sequence view of the hashes in an index, for ``bisect``."""
+
+    __slots__ = ("_buffer", "_count")
+
+    def __init__(self, buffer, count: int):
+        self._buffer = buffer
+        self._count = count
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = HEADER.size + index * ENTRY_SIZE
+        return self._buffer[start : start + ENTRY_SIZE]
+
+
+class HashIndexBlacklist:
+    """Memory-mapped index file built by ``build_index``."""
+
+    def __init__(self, path: str | os.PathLike):
+        with open(path, "rb") as f:
+            magic, count = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                raise ValueError(f"{path} is not a password blacklist index")
+            expected = HEADER.size + count * ENTRY_SIZE
+            if os.fstat(f.fileno()).st_size != expected:
+                raise ValueError(f"{path} is truncated or corrupt")
+            self._mmap = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if count else None
+            )
+        if self._mmap is not None and hasattr(mmap, "MADV_RANDOM"):
+            self._mmap.madvise(mmap.MADV_RANDOM)
+        self._entries = _Entries(self._mmap, count)
+
+    def __contains__(self, password: str) -> bool:
+        if not len(self._entries):
+            return False
+        digest = password_hash(password.lower())
+        i = bisect.bisect_left(self._entries, digest)
+        return i < len(self._entries) and self._entries[i] == digest
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+def load(path: str | os.PathLike) -> TextBlacklist | HashIndexBlacklist:
+    """Open an index file, or read a plain-text list."""
+    with open(path, "rb") as f:
+        is_index = f.read(len(MAGIC)) == MAGIC
+    return HashIndexBlacklist(path) if is_index else TextBlacklist(path)
+
+
+def _read_run(f: BinaryIO) -> Iterator[bytes]:
+    while entry := f.read(ENTRY_SIZE):
+        yield entry
+
+
+def build_index(
+    lines: Iterable[str], output: str | os.PathLike, chunk_size: int = 1_000_000
+) -> int:
+    """Write an index of ``lines`` to ``output``; returns the number of entries."""
+    runs: list[BinaryIO] = []
+    try:
+        chunk: set[bytes] = set()
+        for line in lines:
+            if normalized := normalize(line):
+                chunk.add(password_hash(normalized))
+            if len(chunk) >= chunk_size:
+                runs.append(_write_run(chunk))
+                chunk = set()
+        if chunk or not runs:
+            runs.append(_write_run(chunk))
+
+        output = Path(output)
+        tmp = output.with_name(output.name + ".tmp")
+        count, previous = 0, None
+        with open(tmp, "wb") as out:
+            out.write(HEADER.pack(MAGIC, 0))
+            for entry in heapq.merge(*(_read_run(run) for run in runs)):
+                if entry != previous:
+                    out.write(entry)
+                    count += 1
+                    previous = entry
+            out.seek(0)
+            out.write(HEADER.pack(MAGIC, count))
+            out.flush()
+            os.fsync(out.fileno())
+        # Replace atomically so running workers never map a partial file
+        os.replace(tmp, output)
+        return count
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _write_run(chunk: set[bytes]) -> BinaryIO:
+    run = tempfile.TemporaryFile()
+    run.write(b"".join(sorted(chunk)))
+    run.seek(0)
+    return run
+
+
+def _lines(path: str) -> Iterator[str]:
+    # Leaked corpora are not reliably UTF-8; undecodable bytes are replaced.
+    with open(path, encoding="utf-8", errors="replace") as f:
+        yield from f
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="build an index from a plain-text list")
+    build.add_argument("source")
+    build.add_argument("output")
+    build.add_argument("--chunk-size", type=int, default=1_000_000)
+    check = commands.add_parser("check", help="look passwords up in a blacklist")
+    check.add_argument("index")
+    check.add_argument("passwords", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_index(_lines(args.source), args.output, args.chunk_size)
+        print(f"wrote {count} entries to {args.output}")
+    else:
+        blacklist = load(args.index)
+        for password in args.passwords:
+            print(f"{password}: {'listed' if password in blacklist else 'not listed'}")
+
+
+if __name__ == "__main__":
+    main()
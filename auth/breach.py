@@ -0,0 +1,344 @@
+"""
+Breached-password store partitioned by SHA-1 prefix.
+
+Passwords are looked up by the SHA-1 of their UTF-8 bytes, as in the
+Have I Been Pwned "Pwned Passwords" dataset. A store is a directory of
+256 shard files, one per first digest byte (``00.bin`` .. ``ff.bin``),
+each holding the sorted, de-duplicated remaining digest bytes of its
+hashes (``suffix_bytes`` of them, 19 by default), plus ``manifest.json``:
+
+    {"format": "sha1-shards", "version": 1, "suffix_bytes": 19, "count": N}
+
+A lookup memory-maps one shard and binary-searches it, so nothing is
+loaded at startup, a cold lookup touches a few pages, and the pages are
+shared between workers through the page cache. Truncating suffixes
+(``--suffix-bytes 8``) roughly halves the size of a several-hundred-million
+entry corpus while keeping false positives around n / 2**72.
+
+Build a store from the HIBP SHA-1 download (``HASH:COUNT`` lines) or from
+plain-text passwords:
+
+    python -m auth.breach build pwned-passwords-sha1.txt /var/lib/breach
+    python -m auth.breach build --plain leaked.txt /var/lib/breach
+
+The input is bucketed by shard into temporary files and each shard is then
+sorted on its own, so memory is bounded by the largest shard.
+
+Several pods can share one copy: a pod with the store and
+``BREACHED_PASSWORDS_SERVE=true`` answers k-anonymity range queries
+(``GET /breached-passwords/range/{first 5 hex digits}``, HIBP's response
+format), and the others use ``RangeBreachClient`` against it. Only the
+first 20 bits of a digest leave the caller.
+"""
+
+import argparse
+import asyncio
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import tempfile
+import threading
+from pathlib import Path
+from typing import Iterable, Iterator
+
+logger = logging.getLogger(__name__)
+
+FORMAT = "sha1-shards"
+VERSION = 1
+MANIFEST = "manifest.json"
+DIGEST_SIZE = 20
+SHARDS = 256
+# Range queries use the first 5 hex digits; the rest must be stored
+MIN_SUFFIX_BYTES = 3
+RANGE_PREFIX_LENGTH = 5
+
+
+class BreachCheckUnavailable(Exception):
+    """Raised when a fail-closed store cannot answer."""
+
+
+def password_digest(password: str) -> bytes:
+    return hashlib.sha1(password.encode("utf-8", "surrogatepass")).digest()
+
+
+def _shard_name(first_byte: int) -> str:
+    return f"{first_byte:02x}.bin"
+
+
+class _Shard:
+    """Sorted fixed-width records of one memory-mapped shard, for ``bisect``."""
+
+    __slots__ = ("_mmap", "_size", "_count")
+
+    def __init__(self, path: Path, size: int):
+        with open(path, "rb") as f:
+            length = os.fstat(f.fileno()).st_size
+            if length % size:
+                raise ValueError(f"{path} is truncated or corrupt")
+            self._mmap = (
+                mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if length else None
+            )
+        if self._mmap is not None and hasattr(mmap, "MADV_RANDOM"):
+            self._mmap.madvise(mmap.MADV_RANDOM)
+        self._size = size
+        self._count = length // size
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index: int) -> bytes:
+        start = index * self._size
+        return self._mmap[start : start + self._size]
+
+    def __contains__(self, suffix: bytes) -> bool:
+        i = bisect.bisect_left(self, suffix)
+        return i < self._count and self[i] == suffix
+
+    def between(self, low: bytes, high: bytes) -> list[bytes]:
+        """Records ``r`` with ``low <= r <= high``."""
+        start = bisect.bisect_left(self, low)
+        end = bisect.bisect_right(self, high, lo=start)
+        return [self[i] for i in range(start, end)]
+
+    def close(self) -> None:
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+
+
+class ShardedBreachStore:
+    """Local store written by ``build_store``; shards are mapped on first use."""
+
+    def __init__(self, path: str | os.PathLike):
+        self.path = Path(path)
+        with open(self.path / MANIFEST) as f:
+            manifest = json.load(f)
+        if manifest.get("format") != FORMAT or manifest.get("version") != VERSION:
+            raise ValueError(f"{self.path} is not a breached-password store")
+        self.suffix_bytes: int = manifest["suffix_bytes"]
+        self.count: int = manifest["count"]
+        self._shards: list[_Shard | None] = [None] * SHARDS
+        self._lock = threading.Lock()
+
+    def _shard(self, first_byte: int) -> _Shard:
+        shard = self._shards[first_byte]
+        if shard is None:
+            with self._lock:
+                shard = self._shards[first_byte]
+                if shard is None:
+                    shard = _Shard(
+                        self.path / _shard_name(first_byte), self.suffix_bytes
+                    )
+                    self._shards[first_byte] = shard
+        return shard
+
+    def contains_digest(self, digest: bytes) -> bool:
+        return digest[1 : 1 + self.suffix_bytes] in self._shard(digest[0])
+
+    def __contains__(self, password: str) -> bool:
+        return self.contains_digest(password_digest(password))
+
+    def __len__(self) -> int:
+        return self.count
+
+    async def is_breached(self, password: str) -> bool:
+        # A cold shard page is a disk read, so keep it off the event loop
+        return await asyncio.to_thread(self.__contains__, password)
+
+    def range(self, prefix: str) -> list[str]:
+        """Upper-case hex suffixes of the stored digests starting with ``prefix``
+        (5 hex digits), in the format of HIBP's range API."""
+        if len(prefix) != RANGE_PREFIX_LENGTH:
+            raise ValueError(f"prefix must be {RANGE_PREFIX_LENGTH} hex digits")
+        head = bytes.fromhex(prefix[:4])
+        nibble = int(prefix[4], 16) << 4
+        pad = self.suffix_bytes - 2
+        records = self._shard(head[0]).between(
+            bytes([head[1], nibble]) + b"\x00" * pad,
+            bytes([head[1], nibble | 0x0F]) + b"\xff" * pad,
+        )
+        # The first three hex digits of a record are part of the prefix
+        return [record.hex().upper()[3:] for record in records]
+
+    async def close(self) -> None:
+        with self._lock:
+            for shard in self._shards:
+                if shard is not None:
+                    shard.close()
+            self._shards = [None] * SHARDS
+
+
+class RangeBreachClient:
+    """Checks passwords against a range API: a pod serving a local store, or
+    HIBP itself (``https://api.pwnedpasswords.com/range``)."""
+
+    def __init__(
+        self,
+        url: str,
+        timeout: float = 0.5,
+        fail_closed: bool = False,
+        transport=None,
+    ):
+        import httpx
+
+        self.url = url.rstrip("/")
+        self.fail_closed = fail_closed
+        self._client = httpx.AsyncClient(timeout=timeout, transport=transport)
+
+    async def is_breached(self, password: str) -> bool:
+        digest = password_digest(password).hex().upper()
+        prefix, rest = digest[:RANGE_PREFIX_LENGTH], digest[RANGE_PREFIX_LENGTH:]
+        try:
+            response = await self._client.get(f"{self.url}/{prefix}")
+            response.raise_for_status()
+        except Exception as e:
+            if self.fail_closed:
+                raise BreachCheckUnavailable(str(e)) from e
+            logger.warning(f"Breached-password lookup failed, allowing password: {e}")
+            return False
+        # Stores may hold truncated suffixes, so compare at each length served
+        suffixes = {
+            line.split(":", 1)[0].strip() for line in response.text.splitlines()
+        }
+        suffixes.discard("")
+        return any(rest[:n] in suffixes for n in {len(s) for s in suffixes})
+
+    async def close(self) -> None:
+        await self._client.aclose()
+
+
+def open_store(
+    path: str | None,
+    url: str | None,
+    timeout: float = 0.5,
+    fail_closed: bool = False,
+) -> ShardedBreachStore | RangeBreachClient | None:
+    """The local store at ``path`` if set, else a client for ``url``, else None."""
+    if path:
+        return ShardedBreachStore(path)
+    if url:
+        return RangeBreachClient(url, timeout=timeout, fail_closed=fail_closed)
+    return None
+
+
+def parse_hash_line(line: str) -> bytes | None:
+    """Digest of a ``HASH`` or ``HASH:COUNT`` line; None for blank lines."""
+    line = line.strip()
+    if not line:
+        return None
+    digest = bytes.fromhex(line.split(":", 1)[0])
+    if len(digest) != DIGEST_SIZE:
+        raise ValueError(f"not a SHA-1 hash: {line!r}")
+    return digest
+
+
+def build_store(
+    digests: Iterable[bytes],
+    output: str | os.PathLike,
+    suffix_bytes: int = DIGEST_SIZE - 1,
+) -> int:
+    """Write a store of ``digests`` to the new directory ``output``; returns
+    the number of distinct entries."""
+    if not MIN_SUFFIX_BYTES <= suffix_bytes <= DIGEST_SIZE - 1:
+        raise ValueError(
+            f"suffix_bytes must be between {MIN_SUFFIX_BYTES} and {DIGEST_SIZE - 1}"
+        )
+    output = Path(output)
+    # Into a fresh directory only: running workers must never see a mix of
+    # old and new shards. Point the setting at the new store instead.
+    output.mkdir(parents=True)
+    end = 1 + suffix_bytes
+
+    with tempfile.TemporaryDirectory() as scratch:
+        buckets = [open(Path(scratch) / _shard_name(i), "w+b") for i in range(SHARDS)]
+        try:
+            for digest in digests:
+                buckets[digest[0]].write(digest[1:end])
+
+            count = 0
+            for first_byte, bucket in enumerate(buckets):
+                bucket.seek(0)
+                data = bucket.read()
+                records = sorted(
+                    {
+                        data[i : i + suffix_bytes]
+                        for i in range(0, len(data), suffix_bytes)
+                    }
+                )
+                with open(output / _shard_name(first_byte), "wb") as f:
+                    f.write(b"".join(records))
+                    f.flush()
+                    os.fsync(f.fileno())
+                count += len(records)
+                bucket.truncate(0)
+        finally:
+            for bucket in buckets:
+                bucket.close()
+
+    manifest = {
+        "format": FORMAT,
+        "version": VERSION,
+        "suffix_bytes": suffix_bytes,
+        "count": count,
+    }
+    tmp = output / (MANIFEST + ".tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+        f.flush()
+        os.fsync(f.fileno())
+    # The manifest goes last, so a store is only readable once complete
+    os.replace(tmp, output / MANIFEST)
+    return count
+
+
+def _digests(path: str, plain: bool) -> Iterator[bytes]:
+    if plain:
+        with open(path, encoding="utf-8", errors="replace") as f:
+            for line in f:
+                if password := line.rstrip("\r\n"):
+                    yield password_digest(password)
+        return
+    with open(path, encoding="ascii") as f:
+        for line in f:
+            if (digest := parse_hash_line(line)) is not None:
+                yield digest
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser(
+        "build", help="build a store from SHA-1 hashes or passwords"
+    )
+    build.add_argument("source")
+    build.add_argument("output", help="new directory for the store")
+    build.add_argument(
+        "--plain", action="store_true", help="the source lists passwords, not hashes"
+    )
+    build.add_argument(
+        "--suffix-bytes",
+        type=int,
+        default=DIGEST_SIZE - 1,
+        help="digest bytes kept per entry after the shard byte",
+    )
+    check = commands.add_parser("check", help="look passwords up in a store")
+    check.add_argument("store")
+    check.add_argument("passwords", nargs="+")
+    args = parser.parse_args(argv)
+
+    if args.command == "build":
+        count = build_store(
+            _digests(args.source, args.plain), args.output, args.suffix_bytes
+        )
+        print(f"wrote {count} entries to {args.output}")
+    else:
+        store = ShardedBreachStore(args.store)
+        for password in args.passwords:
+            print(f"{password}: {'breached' if password in store else 'not found'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark the host to pick Argon2 parameters.
+
+Run ``python -m auth.calibration --target-ms 250 --memory-budget-mib 64`` to
+print settings for the current machine.
+"""
+
+import argparse
+import time
+from dataclasses import dataclass
+
+from argon2 import PasswordHasher
+
+# OWASP floor for Argon2id: 19 MiB, t=2, p=1 is the minimum recommended
+# configuration; we never calibrate memory below it.
+MIN_MEMORY_COST = 19 * 1024
+MAX_TIME_COST = 10
+
+
+@dataclass(frozen=True)
+class HashParameters:
+    time_cost: int
+    memory_cost: int  # KiB
+    parallelism: int
+
+
+def measure(params: HashParameters, samples: int = 3) -> float:
+    """Return the median wall time in milliseconds to hash with ``params``."""
+    ph = PasswordHasher(
+        time_cost=params.time_cost,
+        memory_cost=params.memory_cost,
+        parallelism=params.parallelism,
+    )
+    # Imported here: statistics is slow to import and only calibration uses it
+    import statistics
+
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        ph.hash("calibration-password")
+        timings.append((time.perf_counter() - start) * 1000)
+    return statistics.median(timings)
+
+
+def calibrate(
+    target_ms: float = 250.0,
+    memory_budget_kib: int = 64 * 1024,
+    parallelism: int = 2,
+    min_memory_kib: int = MIN_MEMORY_COST,
+    max_time_cost: int = MAX_TIME_COST,
+    samples: int = 3,
+) -> HashParameters:
+    """Pick parameters whose hash time approaches ``target_ms``.
+
+    Memory is capped at ``memory_budget_kib`` (the budget for one concurrent
+    hash). If a single pass over that much memory is already slower than the
+    target, memory is scaled down towards ``min_memory_kib``; otherwise the
+    time cost is raised to use up the remaining latency budget.
+    """
+    if target_ms <= 0:
+        raise ValueError("target_ms must be positive")
+
+    memory = max(min_memory_kib, memory_budget_kib)
+    single_pass = measure(HashParameters(1, memory, parallelism), samples)
+
+    while single_pass > target_ms and memory > min_memory_kib:
+        memory = max(min_memory_kib, int(memory * target_ms / single_pass))
+        single_pass = measure(HashParameters(1, memory, parallelism), samples)
+
+    time_cost = int(target_ms // single_pass) if single_pass > 0 else max_time_cost
+    time_cost = max(1, min(max_time_cost, time_cost))
+    return HashParameters(time_cost, memory, parallelism)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=250.0)
+    parser.add_argument("--memory-budget-mib", type=int, default=64)
+    parser.add_argument("--parallelism", type=int, default=2)
+    parser.add_argument("--samples", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    params = calibrate(
+        target_ms=args.target_ms,
+        memory_budget_kib=args.memory_budget_mib * 1024,
+        parallelism=args.parallelism,
+        samples=args.samples,
+    )
+    took = measure(params, args.samples)
+    print(f"ARGON2_TIME_COST={params.time_cost}")
+    print(f"ARGON2_MEMORY_COST_KIB={params.memory_cost}")
+    print(f"ARGON2_PARALLELISM={params.parallelism}")
+    print(f"# measured {took:.1f} ms per hash")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,36 @@
 from argon2 import PasswordHasher
 from argon2.exceptions import VerifyMismatchError, InvalidHash
 
+DEFAULT_TIME_COST = 3
+DEFAULT_MEMORY_COST = 64 * 1024  # 64 MiB
+DEFAULT_PARALLELISM = 2
+
 _ph = PasswordHasher(
-    time_cost=3,
-    memory_cost=64 * 1024,  # 64 MiB
-    parallelism=2,
+    time_cost=DEFAULT_TIME_COST,
+    memory_cost=DEFAULT_MEMORY_COST,
+    parallelism=DEFAULT_PARALLELISM,
 )
 
 
+def configure(time_cost: int, memory_cost: int, parallelism: int) -> None:
+    """Replace the Argon2 parameters used for new hashes.
+
+    Existing hashes keep verifying (parameters are encoded in the hash);
+    ``needs_rehash`` reports them as stale until they are re-hashed.
+    """
+    global _ph
+    _ph = PasswordHasher(
+        time_cost=time_cost,
+        memory_cost=memory_cost,
+        parallelism=parallelism,
+    )
+
+
+def current_parameters() -> tuple[int, int, int]:
+    """Return the active ``(time_cost, memory_cost, parallelism)``."""
+    return _ph.time_cost, _ph.memory_cost, _ph.parallelism
+
+
 def hash_password(password: str) -> str:
     if not isinstance(password, str) or not password:
         raise ValueError("Password must be a non-empty string")
@@ -1,39 +1,99 @@
-import re
+import string
 from pathlib import Path
 
+from auth.blacklist import TextBlacklist, load
+from auth.breach import RangeBreachClient, ShardedBreachStore
+
 _BLACKLIST_PATH = Path(__file__).with_name("password_blacklist.txt")
 
+MIN_LENGTH = 8
 
-def _load_blacklist() -> set[str]:
-    try:
-        return {
-            line.strip().lower()
-            for line in _BLACKLIST_PATH.read_text().splitlines()
-            if line.strip()
-        }
-    except FileNotFoundError:
-        return set()
+_UPPER = frozenset(string.ascii_uppercase)
+_LOWER = frozenset(string.ascii_lowercase)
+_DIGITS = frozenset(string.digits)
+# ASCII characters that are not "special" (\w or \s)
+_WORD_OR_SPACE = frozenset(
+    c for c in map(chr, range(128)) if c.isalnum() or c == "_" or c.isspace()
+)
 
+_blacklist_path: str | None = None
+_blacklist = None
+_breach_store: ShardedBreachStore | RangeBreachClient | None = None
 
-_PASSWORD_BLACKLIST = _load_blacklist()
 
+def configure_blacklist(path: str | None) -> None:
+    """Use the blacklist at ``path`` (an index from ``python -m auth.blacklist
+    build``, or a plain-text list); None restores the bundled list.
 
-def is_valid_password(password: str) -> bool:
-    if not password:
-        return False
+    The file is opened on the first check, not here; an already open list
+    is kept if the path is unchanged.
+    """
+    global _blacklist_path, _blacklist
+    if path != _blacklist_path:
+        _blacklist_path = path
+        _blacklist = None
 
-    if password.lower() in _PASSWORD_BLACKLIST:
-        return False
 
-    if len(password) < 8:
-        return False
-    if not re.search(r"[A-Z]", password):
-        return False
-    if not re.search(r"[a-z]", password):
-        return False
-    if not re.search(r"\d", password):
+def preload_blacklist() -> None:
+    """Open the blacklist now, e.g. before forking workers that share it."""
+    _get_blacklist()
+
+
+def _get_blacklist():
+    global _blacklist
+    if _blacklist is None:
+        _blacklist = (
+            load(_blacklist_path) if _blacklist_path else TextBlacklist(_BLACKLIST_PATH)
+        )
+    return _blacklist
+
+
+def _has_required_classes(password: str) -> bool:
+    """Upper, lower, digit and special character, in one pass over the text."""
+    chars = set(password)
+    if password.isascii():
+        return not (
+            chars.isdisjoint(_UPPER)
+            or chars.isdisjoint(_LOWER)
+            or chars.isdisjoint(_DIGITS)
+            or chars <= _WORD_OR_SPACE
+        )
+    # Same classes as the regexes [A-Z], [a-z], \d and [^\w\s]
+    upper = lower = digit = special = False
+    for c in chars:
+        if c in _UPPER:
+            upper = True
+        elif c in _LOWER:
+            lower = True
+        elif c.isdecimal():
+            digit = True
+        elif not (c.isalnum() or c == "_" or c.isspace()):
+            special = True
+    return upper and lower and digit and special
+
+
+def is_valid_password(password: str) -> bool:
+    if not password or len(password) < MIN_LENGTH:
         return False
-    if not re.search(r"[^\w\s]", password):
+    if not _has_required_classes(password):
         return False
+    return password not in _get_blacklist()
+
 
-    return True
+def configure_breach_store(
+    store: ShardedBreachStore | RangeBreachClient | None,
+) -> None:
+    """Check passwords against ``store`` (see ``auth.breach``); None disables it."""
+    global _breach_store
+    _breach_store = store
+
+
+async def is_breached(password: str) -> bool:
+    """Whether the password is in the breached-password store, if one is set.
+
+    Raises ``auth.breach.BreachCheckUnavailable`` if a fail-closed remote
+    store cannot answer.
+    """
+    if _breach_store is None:
+        return False
+    return await _breach_store.is_breached(password)
@@ -0,0 +1,43 @@
+"""
+Compare JWT codec backends.
+
+    python -m benchmarks.bench_jwt
+"""
+
+import timeit
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from app.core.jwt_codec import HMACCodec, JoseCodec
+
+SECRET = "benchmark-secret-key-min-32-characters-long"
+NUMBER = 5_000
+
+
+def _claims() -> dict:
+    now = datetime.now(timezone.utc)
+    return {
+        "sub": str(uuid.uuid4()),
+        "exp": now + timedelta(minutes=30),
+        "iat": now,
+        "jti": str(uuid.uuid4()),
+        "type": "access",
+        "token_version": 1,
+    }
+
+
+def main() -> None:
+    claims = _claims()
+    print(f"{'backend':<8} {'encode us':>10} {'decode us':>10}")
+    for codec in (JoseCodec(SECRET), HMACCodec(SECRET)):
+        token = codec.encode(claims)
+        encode = timeit.timeit(lambda: codec.encode(claims), number=NUMBER)
+        decode = timeit.timeit(lambda: codec.decode(token), number=NUMBER)
+        name = type(codec).__name__.replace("Codec", "").lower()
+        print(
+            f"{name:<8} {encode / NUMBER * 1e6:>10.1f} {decode / NUMBER * 1e6:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
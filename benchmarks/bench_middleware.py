@@ -0,0 +1,117 @@
+"""
+Per-request middleware overhead: the former three BaseHTTPMiddleware
+layers against the single ASGI ``SecurityMiddleware``.
+
+    python -m benchmarks.bench_middleware
+"""
+
+import asyncio
+import time
+import uuid
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.core.middleware import SecurityMiddleware
+
+NUMBER = 5_000
+
+
+class _LegacySecurityHeaders(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        response = await call_next(request)
+        response.headers["X-Content-Type-Options"] = "nosniff"
+        response.headers["X-Frame-Options"] = "DENY"
+        response.headers["X-XSS-Protection"] = "1; mode=block"
+        response.headers["Referrer-Policy"] = "strict-origin-when-cross-origin"
+        if "/auth/" in request.url.path:
+            response.headers["Cache-Control"] = "no-store, no-cache, must-revalidate"
+        return response
+
+
+class _LegacyRequestID(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        request_id = request.headers.get("X-Request-ID", str(uuid.uuid4()))
+        request.state.request_id = request_id
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request_id
+        return response
+
+
+class _LegacyLogging(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-Process-Time"] = str(
+            round((time.time() - start_time) * 1000, 2)
+        )
+        return response
+
+
+async def _health(request):
+    return JSONResponse({"status": "healthy"})
+
+
+def _build(middleware: list[Middleware]) -> Starlette:
+    return Starlette(routes=[Route("/health", _health)], middleware=middleware)
+
+
+async def _drive(app, number: int) -> float:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/health",
+        "raw_path": b"/health",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"bench")],
+        "client": ("127.0.0.1", 1234),
+        "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    start = time.perf_counter_ns()
+    for _ in range(number):
+        await app(dict(scope, state={}), receive, send)
+    return (time.perf_counter_ns() - start) / number / 1000
+
+
+async def _run() -> None:
+    variants = {
+        "none": _build([]),
+        "legacy": _build(
+            [
+                Middleware(_LegacyLogging),
+                Middleware(_LegacyRequestID),
+                Middleware(_LegacySecurityHeaders),
+            ]
+        ),
+        "asgi": _build([Middleware(SecurityMiddleware)]),
+    }
+    results = {}
+    for name, app in variants.items():
+        await _drive(app, 200)  # warm up
+        results[name] = await _drive(app, NUMBER)
+
+    print(f"{'stack':<8} {'us/request':>11} {'overhead us':>12}")
+    for name, us in results.items():
+        print(f"{name:<8} {us:>11.1f} {us - results['none']:>12.1f}")
+
+
+def main() -> None:
+    asyncio.run(_run())
+
+
+if __name__ == "__main__":
+    main()
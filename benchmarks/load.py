@@ -0,0 +1,194 @@
+"""
+In-process load test of the auth flows.
+
+    python -m benchmarks.load [--users 16] [--iterations 10] [--json results.json]
+
+Runs the ASGI app (lifespan included) behind httpx's ASGI transport, with no
+network or server in between, against a temporary SQLite database unless
+--database-url is given. Each virtual user loops through register, a few
+GET /users/me, refresh, login, logout and logout-all; latency is recorded
+per endpoint. Redis is replaced by the in-memory test doubles and rate
+limiting and the login throttle are off, so the numbers cover the app and
+its database only. --fast-hash lowers the Argon2 cost to expose everything
+else; without it register and login are dominated by hashing.
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+import tracemalloc
+import uuid
+from collections import defaultdict
+
+from benchmarks import report
+
+PASSWORD = "Load-Test-Passw0rd!"
+
+
+def _configure(database_url: str | None, fast_hash: bool) -> None:
+    """Settings are read at import time, so this runs before importing the app."""
+    os.environ["DATABASE_URL"] = database_url or (
+        f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'load.db')}"
+    )
+    os.environ["TESTING"] = "true"
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    os.environ["LOGIN_THROTTLE_ENABLED"] = "false"
+    if fast_hash:
+        os.environ["ARGON2_TIME_COST"] = "1"
+        os.environ["ARGON2_MEMORY_COST_KIB"] = "8192"
+        os.environ["ARGON2_PARALLELISM"] = "1"
+        os.environ["ARGON2_CALIBRATE"] = "false"
+
+
+class _Recorder:
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = defaultdict(list)
+        self.errors: dict[str, int] = defaultdict(int)
+
+    async def call(self, name: str, request, expected: int) -> dict | None:
+        start = time.perf_counter()
+        response = await request
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code != expected:
+            self.errors[name] += 1
+            return None
+        return response.json()
+
+
+def _auth(tokens: dict) -> dict:
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+async def _virtual_user(
+    client, recorder: _Recorder, iterations: int, reads: int
+) -> None:
+    for _ in range(iterations):
+        email = f"load-{uuid.uuid4().hex[:12]}@bench.example"
+        credentials = {"email": email, "password": PASSWORD}
+        tokens = await recorder.call(
+            "register", client.post("/auth/register", json=credentials), 201
+        )
+        if tokens is None:
+            continue
+        for _ in range(reads):
+            await recorder.call(
+                "users_me", client.get("/users/me", headers=_auth(tokens)), 200
+            )
+        refreshed = await recorder.call(
+            "refresh",
+            client.post(
+                "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+            ),
+            200,
+        )
+        login = await recorder.call(
+            "login", client.post("/auth/login", json=credentials), 200
+        )
+        if login is not None:
+            await recorder.call(
+                "logout",
+                client.post(
+                    "/auth/logout",
+                    json={"refresh_token": login["refresh_token"]},
+                    headers=_auth(login),
+                ),
+                200,
+            )
+        if refreshed is not None:
+            await recorder.call(
+                "logout_all",
+                client.post("/auth/logout-all", headers=_auth(refreshed)),
+                200,
+            )
+
+
+async def _run(args) -> dict[str, dict]:
+    import httpx
+
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(
+            transport=transport, base_url="http://bench"
+        ) as client:
+            # Warm up pools, caches and the hashing workers.
+            await _virtual_user(client, _Recorder(), 1, args.reads)
+
+            recorder = _Recorder()
+            if args.trace_allocations:
+                tracemalloc.start()
+            start = time.perf_counter()
+            await asyncio.gather(
+                *(
+                    _virtual_user(client, recorder, args.iterations, args.reads)
+                    for _ in range(args.users)
+                )
+            )
+            elapsed = time.perf_counter() - start
+            peak = None
+            if args.trace_allocations:
+                peak = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+                tracemalloc.stop()
+
+    results = {
+        name: report.summarize(latencies, elapsed, recorder.errors[name])
+        for name, latencies in recorder.latencies.items()
+    }
+    everything = [
+        latency for latencies in recorder.latencies.values() for latency in latencies
+    ]
+    extra = {"alloc_kib": peak} if peak is not None else {}
+    results["all"] = report.summarize(
+        everything, elapsed, sum(recorder.errors.values()), **extra
+    )
+    return results
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--users", type=int, default=16, help="concurrent virtual users"
+    )
+    parser.add_argument(
+        "--iterations", type=int, default=10, help="flows per virtual user"
+    )
+    parser.add_argument("--reads", type=int, default=5, help="GET /users/me per flow")
+    parser.add_argument(
+        "--database-url", help="database to use (default: temporary SQLite file)"
+    )
+    parser.add_argument(
+        "--fast-hash", action="store_true", help="use minimal Argon2 costs"
+    )
+    parser.add_argument(
+        "--trace-allocations",
+        action="store_true",
+        help="record peak traced memory (slows the run down)",
+    )
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    _configure(args.database_url, args.fast_hash)
+    results = asyncio.run(_run(args))
+    report.print_table(results)
+    if args.json:
+        config = {
+            key: getattr(args, key)
+            for key in (
+                "users",
+                "iterations",
+                "reads",
+                "fast_hash",
+                "trace_allocations",
+            )
+        }
+        config["database"] = (
+            "sqlite" if not args.database_url else args.database_url.split(":")[0]
+        )
+        report.write(args.json, report.document("load", results, config))
+
+
+if __name__ == "__main__":
+    main()
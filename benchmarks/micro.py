@@ -0,0 +1,210 @@
+"""
+Micro-benchmarks of the per-request building blocks.
+
+    python -m benchmarks.micro [-k jwt] [--json results.json]
+
+Each benchmark is timed in rounds of ``number`` calls, with ``number``
+calibrated so a round takes about 10ms. Percentiles are over the per-call
+time of each round. ``alloc_kib`` is the peak memory traced by tracemalloc
+during one extra round (run separately, as tracing slows everything down).
+"""
+
+import argparse
+import asyncio
+import inspect
+import itertools
+import time
+import tracemalloc
+import uuid
+from datetime import datetime, timezone
+from typing import Callable
+
+from benchmarks import report
+
+BENCHMARKS: dict[str, Callable[[], Callable]] = {}
+
+
+def benchmark(name: str):
+    """Register a setup function returning the callable to time."""
+
+    def register(setup):
+        BENCHMARKS[name] = setup
+        return setup
+
+    return register
+
+
+@benchmark("jwt_encode")
+def _jwt_encode():
+    from app.core.security import create_access_token
+
+    subject = str(uuid.uuid4())
+    return lambda: create_access_token(subject, 1)
+
+
+@benchmark("jwt_decode")
+def _jwt_decode():
+    from app.core.security import create_access_token, jwt_codec
+
+    token = create_access_token(str(uuid.uuid4()), 1)
+    return lambda: jwt_codec.decode(token)
+
+
+@benchmark("jwt_decode_cached")
+def _jwt_decode_cached():
+    from app.core.security import create_access_token, decode_access_token
+
+    token = create_access_token(str(uuid.uuid4()), 1)
+    decode_access_token(token)
+    return lambda: decode_access_token(token)
+
+
+@benchmark("refresh_token_digest")
+def _refresh_token_digest():
+    from app.core.security import create_refresh_token, refresh_token_digest
+
+    token = create_refresh_token()
+    return lambda: refresh_token_digest(token)
+
+
+@benchmark("argon2_verify")
+def _argon2_verify():
+    from auth.password import hash_password, verify_password
+
+    hashed = hash_password("SecurePass123!")
+    return lambda: verify_password("SecurePass123!", hashed)
+
+
+@benchmark("password_validate")
+def _password_validate():
+    from auth.validator import is_valid_password
+
+    return lambda: is_valid_password("Correct-Horse-Battery-9")
+
+
+@benchmark("breach_lookup")
+def _breach_lookup():
+    import tempfile
+
+    from auth.breach import ShardedBreachStore, build_store, password_digest
+
+    path = f"{tempfile.mkdtemp()}/store"
+    build_store((password_digest(uuid.uuid4().hex) for _ in range(200_000)), path)
+    store = ShardedBreachStore(path)
+    return lambda: "Correct-Horse-Battery-9" in store
+
+
+@benchmark("bloom_lookup")
+def _bloom_lookup():
+    from app.core.bloom import BloomFilter
+
+    bloom = BloomFilter(100_000, 0.001)
+    for _ in range(50_000):
+        bloom.add(uuid.uuid4().hex)
+    jti = uuid.uuid4().hex
+    return lambda: jti in bloom
+
+
+@benchmark("rate_limiter_hit")
+def _rate_limiter_hit():
+    from app.core.rate_limit import RateLimiter, RateLimitRule
+
+    limiter = RateLimiter()
+    rule = RateLimitRule.parse("100/minute")
+    keys = itertools.cycle([f"bench:10.0.{i // 256}.{i % 256}" for i in range(10_000)])
+    return lambda: limiter.hit(next(keys), rule)
+
+
+@benchmark("user_cache_get")
+def _user_cache_get():
+    from app.core.user_cache import UserCache, UserSnapshot
+
+    cache = UserCache(max_size=10_000, ttl_seconds=60)
+    snapshot = UserSnapshot(
+        id=uuid.uuid4(),
+        email="bench@example.com",
+        is_active=True,
+        created_at=datetime.now(timezone.utc),
+        token_version=1,
+    )
+    cache.put(snapshot, cache.epoch())
+    user_id = str(snapshot.id)
+    return lambda: cache.get(user_id)
+
+
+def _runner(fn: Callable) -> Callable[[int], float]:
+    """Return ``run(number) -> seconds`` for a sync or async callable."""
+    probe = fn()
+    if inspect.iscoroutine(probe):
+        probe.close()
+        loop = asyncio.new_event_loop()
+
+        async def many(number):
+            start = time.perf_counter()
+            for _ in range(number):
+                await fn()
+            return time.perf_counter() - start
+
+        return lambda number: loop.run_until_complete(many(number))
+
+    def run(number):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        return time.perf_counter() - start
+
+    return run
+
+
+def measure(fn: Callable, min_time: float = 1.0, round_time: float = 0.01) -> dict:
+    run = _runner(fn)
+    number = 1
+    while run(number) < round_time:
+        number *= 2
+
+    per_call, calls, total = [], 0, 0.0
+    while total < min_time or len(per_call) < 5:
+        elapsed = run(number)
+        per_call.append(elapsed / number)
+        calls += number
+        total += elapsed
+
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        run(number)
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+
+    result = report.summarize(per_call, total, alloc_kib=round(peak / 1024, 1))
+    result["count"] = calls
+    result["throughput_per_s"] = round(calls / total, 2)
+    return result
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "-k", dest="pattern", default="", help="only names containing this"
+    )
+    parser.add_argument(
+        "--min-time", type=float, default=1.0, help="seconds per benchmark"
+    )
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args(argv)
+
+    results = {}
+    for name, setup in BENCHMARKS.items():
+        if args.pattern in name:
+            results[name] = measure(setup(), args.min_time)
+    report.print_table(results)
+    if args.json:
+        report.write(
+            args.json, report.document("micro", results, {"min_time": args.min_time})
+        )
+
+
+if __name__ == "__main__":
+    main()
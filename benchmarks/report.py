@@ -0,0 +1,139 @@
+"""
+Benchmark results: summary statistics, JSON files and comparison.
+
+Both ``benchmarks.micro`` and ``benchmarks.load`` write the same format, so
+runs from two commits can be diffed:
+
+    python -m benchmarks.report before.json after.json [--threshold 10]
+
+The exit status is 1 if any benchmark's p95 latency rose, or its
+throughput fell, by more than the threshold percentage.
+"""
+
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+
+def percentile(sorted_values: list[float], pct: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, round(pct / 100 * len(sorted_values)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(
+    latencies_s: list[float], elapsed_s: float, errors: int = 0, **extra
+) -> dict:
+    """Throughput and latency distribution (in milliseconds) of one benchmark."""
+    values = sorted(latencies_s)
+    ms = 1000.0
+    return {
+        "count": len(values),
+        "errors": errors,
+        "throughput_per_s": round(len(values) / elapsed_s, 2) if elapsed_s else 0.0,
+        "mean_ms": round(statistics.fmean(values) * ms, 4) if values else 0.0,
+        "p50_ms": round(percentile(values, 50) * ms, 4),
+        "p95_ms": round(percentile(values, 95) * ms, 4),
+        "p99_ms": round(percentile(values, 99) * ms, 4),
+        "max_ms": round(values[-1] * ms, 4) if values else 0.0,
+        **extra,
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def document(kind: str, results: dict[str, dict], config: dict) -> dict:
+    return {
+        "kind": kind,
+        "commit": _commit(),
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "config": config,
+        "results": results,
+    }
+
+
+def write(path: str, doc: dict) -> None:
+    with open(path, "w") as f:
+        json.dump(doc, f, indent=2, sort_keys=True)
+        f.write("\n")
+
+
+def print_table(results: dict[str, dict]) -> None:
+    print(
+        f"{'benchmark':<22} {'count':>7} {'err':>4} {'per s':>10} "
+        f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'alloc KiB':>10}"
+    )
+    for name, r in results.items():
+        alloc = r.get("alloc_kib")
+        print(
+            f"{name:<22} {r['count']:>7} {r['errors']:>4} "
+            f"{r['throughput_per_s']:>10.1f} "
+            f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} {r['p99_ms']:>9.3f} "
+            f"{'-' if alloc is None else f'{alloc:.1f}':>10}"
+        )
+
+
+def _change(old: float, new: float) -> float:
+    return (new - old) / old * 100 if old else 0.0
+
+
+def compare(before: dict, after: dict, threshold: float) -> list[str]:
+    """Print a side-by-side diff; return the names of regressed benchmarks."""
+    print(f"{before.get('commit')} -> {after.get('commit')}")
+    print(f"{'benchmark':<22} {'p95 ms':>19} {'change':>8} {'per s':>21} {'change':>8}")
+    regressed = []
+    for name, new in after["results"].items():
+        old = before["results"].get(name)
+        if old is None:
+            print(f"{name:<22} (new)")
+            continue
+        latency = _change(old["p95_ms"], new["p95_ms"])
+        throughput = _change(old["throughput_per_s"], new["throughput_per_s"])
+        flag = ""
+        if latency > threshold or throughput < -threshold:
+            regressed.append(name)
+            flag = "  REGRESSED"
+        print(
+            f"{name:<22} {old['p95_ms']:>9.3f} {new['p95_ms']:>9.3f} {latency:>+7.1f}% "
+            f"{old['throughput_per_s']:>10.1f} {new['throughput_per_s']:>10.1f} "
+            f"{throughput:>+7.1f}%{flag}"
+        )
+    return regressed
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Compare two benchmark result files.")
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument(
+        "--threshold", type=float, default=10.0, help="allowed change in percent"
+    )
+    args = parser.parse_args(argv)
+    with open(args.before) as f:
+        before = json.load(f)
+    with open(args.after) as f:
+        after = json.load(f)
+    if compare(before, after, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
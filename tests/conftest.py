@@ -1,3 +1,4 @@
+import shutil
 import sys
 import os
 
@@ -11,12 +12,13 @@ if not os.getenv("USE_DOCKER_DB"):
 
 import pytest
 from sqlalchemy import create_engine, event
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import NullPool
 
 # Now import app modules (after setting environment variables)
-from app.db.session import Base
-from app.db.models import User, RefreshToken  # Register models with Base
+from app.db.session import Base, to_async_url
+from app.db.models import User, RefreshToken, UserSession  # noqa: F401 (registers them)
 from app.main import app
 from app.deps import get_db
 
@@ -31,32 +33,67 @@ def get_test_database_url():
 TEST_DATABASE_URL = get_test_database_url()
 IS_SQLITE = TEST_DATABASE_URL.startswith("sqlite")
 
-# Configure engine based on database type
-if IS_SQLITE:
-    engine = create_engine(
-        TEST_DATABASE_URL,
-        connect_args={"check_same_thread": False},
-        poolclass=StaticPool,
-    )
-
-    # Enable foreign key support for SQLite
-    @event.listens_for(engine, "connect")
-    def set_sqlite_pragma(dbapi_connection, connection_record):
-        cursor = dbapi_connection.cursor()
-        cursor.execute("PRAGMA foreign_keys=ON")
-        cursor.close()
-else:
-    engine = create_engine(TEST_DATABASE_URL)
 
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+def set_sqlite_pragma(dbapi_connection, connection_record):
+    """Enable foreign key support for SQLite."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA foreign_keys=ON")
+    cursor.close()
+
+
+@pytest.fixture(scope="session")
+def database_url(tmp_path_factory):
+    """TEST_DATABASE_URL, with in-memory SQLite replaced by a temporary file.
+
+    The app talks to the database through aiosqlite on its own event loop,
+    so tests share a file rather than a single in-memory connection.
+    """
+    if TEST_DATABASE_URL not in ("sqlite://", "sqlite:///:memory:"):
+        yield TEST_DATABASE_URL
+        return
+    directory = tmp_path_factory.mktemp("db")
+    yield f"sqlite:///{directory / 'test.db'}"
+    shutil.rmtree(directory, ignore_errors=True)
+
+
+@pytest.fixture(scope="session")
+def engine(database_url):
+    """Sync engine: manages the schema and lets tests inspect rows."""
+    if IS_SQLITE:
+        engine = create_engine(
+            database_url,
+            connect_args={"check_same_thread": False},
+        )
+        event.listen(engine, "connect", set_sqlite_pragma)
+    else:
+        engine = create_engine(database_url)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def async_engine(database_url):
+    """Async engine behind the app's database sessions."""
+    async_engine = create_async_engine(to_async_url(database_url), poolclass=NullPool)
+    if IS_SQLITE:
+        event.listen(async_engine.sync_engine, "connect", set_sqlite_pragma)
+    return async_engine
+
+
+@pytest.fixture(scope="session")
+def async_session_factory(async_engine):
+    """Sessions the app receives from ``get_db``."""
+    return async_sessionmaker(
+        bind=async_engine, autoflush=False, expire_on_commit=False
+    )
 
 
 @pytest.fixture(scope="function")
-def db_session():
+def db_session(engine):
     """Creates a fresh database session for each test."""
     Base.metadata.create_all(bind=engine)
 
-    session = TestingSessionLocal()
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
     try:
         yield session
     finally:
@@ -64,16 +101,29 @@ def db_session():
         Base.metadata.drop_all(bind=engine)
 
 
+@pytest.fixture
+def user(request, db_session):
+    """A stored user.
+
+    Columns can be overridden with
+    ``@pytest.mark.parametrize("user", [{...}], indirect=True)``.
+    """
+    columns = {"email": "user@example.com", "password_hash": "x"}
+    columns.update(getattr(request, "param", {}))
+    user = User(**columns)
+    db_session.add(user)
+    db_session.commit()
+    return user
+
+
 @pytest.fixture(scope="function")
-def client(db_session):
+def client(db_session, async_session_factory):
     """Test client with database dependency override."""
     from fastapi.testclient import TestClient
 
-    def override_get_db():
-        try:
-            yield db_session
-        finally:
-            pass
+    async def override_get_db():
+        async with async_session_factory() as session:
+            yield session
 
     app.dependency_overrides[get_db] = override_get_db
 
@@ -81,3 +131,11 @@ def client(db_session):
         yield test_client
 
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def behind_proxy(monkeypatch):
+    """Treat the test client's peer as a trusted reverse proxy."""
+    from app.core.config import settings
+
+    monkeypatch.setattr(settings, "FORWARDED_ALLOW_IPS", ["testclient"])
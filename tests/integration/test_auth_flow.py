@@ -57,3 +57,39 @@ class TestAuthFlow:
         # Second registration - should fail
         response = client.post("/auth/register", json=user_data)
         assert response.status_code == 409
+
+    def test_failed_registration_writes_nothing(self, client, db_session):
+        """Test that the user, session and token are committed together."""
+        from app.db.models import RefreshToken, User, UserSession
+
+        user_data = {"email": "once@example.com", "password": "SecurePass123!"}
+        assert client.post("/auth/register", json=user_data).status_code == 201
+        assert client.post("/auth/register", json=user_data).status_code == 409
+
+        assert db_session.query(User).count() == 1
+        assert db_session.query(UserSession).count() == 1
+        assert db_session.query(RefreshToken).count() == 1
+
+    def test_login_upgrades_stale_hash(self, client, db_session):
+        """Test that a successful login re-hashes outdated parameters."""
+        from argon2 import PasswordHasher
+
+        from app.db.models import User
+        from auth.password import needs_rehash
+
+        weak_hash = PasswordHasher(time_cost=1, memory_cost=1024, parallelism=1).hash(
+            "SecurePass123!"
+        )
+        db_session.add(User(email="legacy@example.com", password_hash=weak_hash))
+        db_session.commit()
+
+        response = client.post("/auth/login", json={
+            "email": "legacy@example.com",
+            "password": "SecurePass123!",
+        })
+        assert response.status_code == 200
+
+        db_session.expire_all()
+        user = db_session.query(User).filter(User.email == "legacy@example.com").one()
+        assert user.password_hash != weak_hash
+        assert needs_rehash(user.password_hash) is False
@@ -63,6 +63,19 @@ class TestLogoutAll:
         # Expect success
         assert response.status_code in [200, 204], f"Logout failed: {response.json()}"
 
+    def test_logout_all_revokes_cached_access_token(self, client, authenticated_user):
+        """Test that a cached user is invalidated by logout_all."""
+        headers = {"Authorization": f"Bearer {authenticated_user['access_token']}"}
+
+        # Populate the user cache
+        assert client.get("/users/me", headers=headers).status_code == 200
+
+        response = client.post("/auth/logout-all", headers=headers)
+        assert response.status_code in [200, 204]
+
+        response = client.get("/users/me", headers=headers)
+        assert response.status_code == 401
+
     def test_logout_all_requires_authentication(self, client, db_session):
         """Test that logout_all requires valid authentication."""
         response = client.post("/auth/logout-all")
@@ -0,0 +1,42 @@
+"""
+Tests for the benchmark result format and comparison.
+"""
+
+from benchmarks import report
+
+
+def test_percentiles_use_nearest_rank():
+    values = [i / 1000 for i in range(1, 101)]
+
+    summary = report.summarize(values, elapsed_s=2.0, errors=1)
+
+    assert summary["count"] == 100
+    assert summary["errors"] == 1
+    assert summary["throughput_per_s"] == 50.0
+    assert (summary["p50_ms"], summary["p95_ms"], summary["p99_ms"]) == (
+        50.0,
+        95.0,
+        99.0,
+    )
+
+
+def test_compare_flags_latency_and_throughput_regressions(capsys):
+    def doc(**results):
+        return {
+            "commit": "abc",
+            "results": {
+                name: {"p95_ms": p95, "throughput_per_s": rate}
+                for name, (p95, rate) in results.items()
+            },
+        }
+
+    before = doc(login=(10.0, 100.0), refresh=(5.0, 200.0), users_me=(1.0, 900.0))
+    after = doc(
+        login=(12.0, 100.0),
+        refresh=(5.0, 150.0),
+        users_me=(1.05, 890.0),
+        logout=(3.0, 10.0),
+    )
+
+    assert report.compare(before, after, threshold=10.0) == ["login", "refresh"]
+    assert "(new)" in capsys.readouterr().out
@@ -0,0 +1,175 @@
+"""
+Tests for the prefix-sharded breached-password store and range API.
+"""
+
+import hashlib
+
+import httpx
+import pytest
+
+from app.core.config import settings
+from app.main import app
+from auth import validator
+from auth.breach import (
+    BreachCheckUnavailable,
+    RangeBreachClient,
+    ShardedBreachStore,
+    build_store,
+    main,
+    password_digest,
+)
+
+BREACHED = ["password123", "Sup3r$ecret", "Tr0ub4dor&3", "ünïcödé-P4ss"]
+
+
+def _sha1(password: str) -> str:
+    return hashlib.sha1(password.encode()).hexdigest().upper()
+
+
+@pytest.fixture
+def store_path(tmp_path):
+    path = tmp_path / "store"
+    digests = [
+        password_digest(p) for p in BREACHED + [f"filler-{i}" for i in range(2000)]
+    ]
+    assert build_store(digests + digests[:10], path) == len(BREACHED) + 2000
+    return path
+
+
+def test_lookups(store_path):
+    store = ShardedBreachStore(store_path)
+
+    assert len(store) == len(BREACHED) + 2000
+    for password in BREACHED:
+        assert password in store
+    assert "filler-1999" in store
+    assert "PASSWORD123" not in store  # case-sensitive, like the SHA-1 corpus
+    assert "filler-2000" not in store
+
+
+def test_truncated_suffixes(tmp_path):
+    path = tmp_path / "store"
+    build_store((password_digest(p) for p in BREACHED), path, suffix_bytes=8)
+    store = ShardedBreachStore(path)
+
+    assert all(p in store for p in BREACHED)
+    assert "not-breached" not in store
+    assert (path / "00.bin").stat().st_size % 8 == 0
+
+
+def test_build_refuses_existing_directory(store_path):
+    with pytest.raises(FileExistsError):
+        build_store([], store_path)
+
+
+def test_range_matches_hibp_format(store_path):
+    store = ShardedBreachStore(store_path)
+    digest = _sha1("Sup3r$ecret")
+
+    suffixes = store.range(digest[:5])
+
+    assert digest[5:] in suffixes
+    assert all(len(s) == 35 for s in suffixes)
+
+
+async def test_client_fails_open_or_closed():
+    def unavailable(request):
+        return httpx.Response(503)
+
+    client = RangeBreachClient(
+        "http://breach/range", transport=httpx.MockTransport(unavailable)
+    )
+    assert await client.is_breached("password123") is False
+    await client.close()
+
+    client = RangeBreachClient(
+        "http://breach/range",
+        fail_closed=True,
+        transport=httpx.MockTransport(unavailable),
+    )
+    with pytest.raises(BreachCheckUnavailable):
+        await client.is_breached("password123")
+    await client.close()
+
+
+async def test_client_sends_only_the_prefix():
+    digest = _sha1("password123")
+    seen = []
+
+    def hibp(request):
+        seen.append(request.url.path)
+        return httpx.Response(
+            200, text=f"0000000000000000000000000000000000A:2\r\n{digest[5:]}:42\r\n"
+        )
+
+    client = RangeBreachClient(
+        "http://breach/range/", transport=httpx.MockTransport(hibp)
+    )
+    assert await client.is_breached("password123") is True
+    assert await client.is_breached("not-in-the-response") is False
+    await client.close()
+
+    assert seen[0] == f"/range/{digest[:5]}"
+
+
+def test_served_range_end_to_end(client, store_path, monkeypatch):
+    monkeypatch.setattr(settings, "BREACHED_PASSWORDS_SERVE", True)
+    monkeypatch.setattr(app.state, "breach_store", ShardedBreachStore(store_path))
+
+    async def check():
+        remote = RangeBreachClient(
+            "http://auth/breached-passwords/range",
+            transport=httpx.ASGITransport(app=app),
+        )
+        try:
+            return [
+                await remote.is_breached(p) for p in ("Tr0ub4dor&3", "correct horse")
+            ]
+        finally:
+            await remote.close()
+
+    assert client.portal.call(check) == [True, False]
+    assert client.get("/breached-passwords/range/xyz12").status_code == 422
+
+
+def test_range_not_served_by_default(client):
+    assert client.get("/breached-passwords/range/ABCDE").status_code == 404
+
+
+def test_register_and_change_password_reject_breached(client, store_path):
+    validator.configure_breach_store(ShardedBreachStore(store_path))
+    try:
+        response = client.post(
+            "/auth/register",
+            json={"email": "breach@example.com", "password": "Sup3r$ecret"},
+        )
+        assert response.status_code == 400
+
+        response = client.post(
+            "/auth/register",
+            json={"email": "breach@example.com", "password": "SecurePass123!"},
+        )
+        assert response.status_code == 201
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        response = client.post(
+            "/users/me/change-password",
+            json={"current_password": "SecurePass123!", "new_password": "Tr0ub4dor&3"},
+            headers=headers,
+        )
+        assert response.status_code == 400
+    finally:
+        validator.configure_breach_store(None)
+
+
+def test_cli(tmp_path, capsys):
+    source = tmp_path / "pwned.txt"
+    source.write_text(f"{_sha1('hunter2')}:17\n\n{_sha1('letmein')}:3\n")
+
+    main(["build", str(source), str(tmp_path / "store")])
+    main(["check", str(tmp_path / "store"), "hunter2", "hunter3"])
+
+    out = capsys.readouterr().out
+    assert "wrote 2 entries" in out
+    assert "hunter2: breached" in out
+    assert "hunter3: not found" in out
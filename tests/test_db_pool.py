@@ -0,0 +1,93 @@
+"""
+Tests for connection pool tuning and instrumentation.
+"""
+
+from unittest.mock import patch
+
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.db.pool import InstrumentedQueuePool, engine_options, install_idle_pre_ping
+
+
+def _sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name, {"pool": "sync"}) or 0.0
+
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+    )
+    yield engine
+    engine.dispose()
+
+
+def test_checkouts_are_exported(engine):
+    before = _sample("db_pool_checkout_wait_seconds_count")
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        assert _sample("db_pool_checked_out") == 1
+
+    assert _sample("db_pool_checkout_wait_seconds_count") == before + 1
+    assert _sample("db_pool_checked_out") == 0
+    assert _sample("db_pool_overflow") == 0
+
+
+def test_overflow_is_exported(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'overflow.db'}",
+        poolclass=InstrumentedQueuePool,
+        pool_size=1,
+        max_overflow=1,
+    )
+    try:
+        with engine.connect(), engine.connect():
+            assert _sample("db_pool_checked_out") == 2
+            assert _sample("db_pool_overflow") == 1
+    finally:
+        engine.dispose()
+
+
+def test_slow_checkout_is_logged(engine, monkeypatch, caplog):
+    monkeypatch.setattr("app.db.pool.settings.DB_SLOW_CHECKOUT_MS", 0)
+
+    with engine.connect():
+        pass
+
+    assert "Slow database connection checkout" in caplog.text
+
+
+def test_idle_pre_ping_replaces_dead_connection(engine):
+    install_idle_pre_ping(engine, idle_seconds=0)
+
+    with engine.connect() as conn:
+        first = conn.connection.dbapi_connection
+
+    with patch.object(engine.dialect, "do_ping", side_effect=Exception("gone")):
+        with engine.connect() as conn:
+            assert conn.execute(text("SELECT 1")).scalar() == 1
+            assert conn.connection.dbapi_connection is not first
+
+
+def test_idle_pre_ping_skips_recent_connections(engine):
+    install_idle_pre_ping(engine, idle_seconds=3600)
+
+    with engine.connect():
+        pass
+    with patch.object(engine.dialect, "do_ping") as do_ping:
+        with engine.connect():
+            pass
+    do_ping.assert_not_called()
+
+
+def test_engine_options_sizes_server_pools():
+    options = engine_options("postgresql+asyncpg://u:p@db/auth", is_async=True)
+    assert options["pool_size"] > 0
+    assert "poolclass" in options
+
+    assert "pool_size" not in engine_options("sqlite:///:memory:", is_async=False)
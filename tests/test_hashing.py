@@ -0,0 +1,84 @@
+"""
+Tests for the password hashing executor.
+"""
+
+import asyncio
+
+import pytest
+from prometheus_client import REGISTRY
+
+from app.core.hashing import HashingExecutor, HashingPoolBusy
+
+
+def _sample(name: str) -> float:
+    return REGISTRY.get_sample_value(name) or 0.0
+
+
+class TestHashingExecutor:
+    """Unit tests for HashingExecutor."""
+
+    @pytest.fixture
+    def executor(self):
+        pool = HashingExecutor(workers=1, max_queue=0, kind="thread", retry_after=3)
+        yield pool
+        pool.shutdown()
+
+    async def test_hash_and_verify_roundtrip(self, executor):
+        hashed = await executor.hash("Secure@123")
+        assert await executor.verify("Secure@123", hashed) is True
+        assert await executor.verify("WrongPass!", hashed) is False
+
+    async def test_sheds_load_when_full(self, executor):
+        results = await asyncio.gather(
+            executor.hash("Secure@123"),
+            executor.hash("Secure@123"),
+            return_exceptions=True,
+        )
+
+        busy = [r for r in results if isinstance(r, HashingPoolBusy)]
+        assert len(busy) == 1
+        assert busy[0].retry_after == 3
+        assert executor.stats()["rejected"] == 1
+        assert executor.stats()["completed"] == 1
+
+    async def test_exports_queue_gauges(self):
+        pool = HashingExecutor(workers=1, max_queue=2, kind="thread")
+        rejected = _sample("argon2_rejected_total")
+        seen = []
+
+        async def watch():
+            # Once the hashes are submitted: one runs, two wait, one is shed
+            for _ in range(100):
+                await asyncio.sleep(0)
+                if _sample("argon2_queue_depth"):
+                    seen.append(
+                        (_sample("argon2_in_flight"), _sample("argon2_queue_depth"))
+                    )
+                    return
+
+        try:
+            results = await asyncio.gather(
+                watch(),
+                *(pool.hash("Secure@123") for _ in range(4)),
+                return_exceptions=True,
+            )
+        finally:
+            pool.shutdown()
+
+        assert seen == [(1, 2)]
+        assert sum(isinstance(r, HashingPoolBusy) for r in results) == 1
+        assert _sample("argon2_rejected_total") == rejected + 1
+        assert _sample("argon2_in_flight") == 0
+        assert _sample("argon2_queue_depth") == 0
+
+    async def test_process_pool_roundtrip(self):
+        pool = HashingExecutor(workers=1, max_queue=4, kind="process")
+        try:
+            hashed = await pool.hash("Secure@123")
+            assert await pool.verify("Secure@123", hashed) is True
+        finally:
+            pool.shutdown()
+
+    def test_invalid_configuration(self):
+        with pytest.raises(ValueError):
+            HashingExecutor(workers=0)
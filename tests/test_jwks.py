@@ -0,0 +1,19 @@
+"""JWKS endpoint tests."""
+
+from fastapi.testclient import TestClient
+
+from app.main import app
+
+client = TestClient(app)
+
+
+def test_jwks_is_cacheable():
+    response = client.get("/.well-known/jwks.json")
+    assert response.status_code == 200
+    assert response.json() == {"keys": []}  # HS256 publishes no keys
+    assert "max-age" in response.headers["Cache-Control"]
+
+    etag = response.headers["ETag"]
+    response = client.get("/.well-known/jwks.json", headers={"If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.headers["ETag"] == etag
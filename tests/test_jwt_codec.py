@@ -0,0 +1,188 @@
+"""
+Shared test vectors for the JWT codec backends.
+"""
+
+import base64
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+from jose.exceptions import ExpiredSignatureError, JWTClaimsError, JWTError
+
+from app.core.jwt_codec import AsymmetricCodec, HMACCodec, JoseCodec, build_codec
+
+# RFC 7515, Appendix A.1 (HS256)
+RFC7515_KEY = base64.urlsafe_b64decode(
+    "AyM1SysPpbyDfgZld3umj1qzKObwVMkoqQ-EstJQLr_T-1qS0gZH75aKtMN3Yj0iPS4hcgUuTwjA"
+    "zZr1Z9CAow=="
+)
+RFC7515_TOKEN = (
+    "eyJ0eXAiOiJKV1QiLA0KICJhbGciOiJIUzI1NiJ9"
+    ".eyJpc3MiOiJqb2UiLA0KICJleHAiOjEzMDA4MTkzODAsDQogImh0dHA6Ly9leGFtcGxlLmNvbS"
+    "9pc19yb290Ijp0cnVlfQ"
+    ".dBjftJeZ4CVP-mB92K27uhbUJU1p1r_wW1gFWFOEjXk"
+)
+RFC7515_CLAIMS = {"iss": "joe", "exp": 1300819380, "http://example.com/is_root": True}
+
+SECRET = "test-secret-key-for-codec-vectors-min-32-chars"
+BACKENDS = [JoseCodec, HMACCodec]
+
+
+@pytest.mark.parametrize("codec_cls", BACKENDS)
+def test_rfc7515_vector(codec_cls):
+    codec = codec_cls(RFC7515_KEY, "HS256")
+    assert codec.decode(RFC7515_TOKEN, verify_exp=False) == RFC7515_CLAIMS
+
+    with pytest.raises(ExpiredSignatureError):
+        codec.decode(RFC7515_TOKEN)
+
+
+@pytest.mark.parametrize("algorithm", ["HS256", "HS384", "HS512"])
+@pytest.mark.parametrize("encoder_cls", BACKENDS)
+@pytest.mark.parametrize("decoder_cls", BACKENDS)
+def test_backends_interoperate(encoder_cls, decoder_cls, algorithm):
+    now = datetime.now(timezone.utc)
+    claims = {
+        "sub": "user-id",
+        "exp": now + timedelta(minutes=5),
+        "iat": now,
+        "jti": "abc",
+        "token_version": 2,
+    }
+    token = encoder_cls(SECRET, algorithm).encode(claims)
+    decoded = decoder_cls(SECRET, algorithm).decode(token)
+
+    assert decoded["sub"] == "user-id"
+    assert decoded["token_version"] == 2
+    assert decoded["exp"] == int((now + timedelta(minutes=5)).timestamp())
+
+
+@pytest.mark.parametrize(
+    "claims",
+    [
+        {"exp": 4102444800.5},
+        {"exp": "4102444800"},
+        {"exp": 946684800.5},
+        {"exp": "soon"},
+        {"nbf": 946684800.5, "iat": "946684800"},
+        {"nbf": "4102444800"},
+        {"iat": "yesterday"},
+    ],
+)
+def test_time_claims_match_jose(claims):
+    token = JoseCodec(SECRET).encode({"sub": "user", **claims})
+    results = []
+    for codec_cls in BACKENDS:
+        try:
+            results.append(codec_cls(SECRET).decode(token))
+        except JWTError as e:
+            results.append((type(e), str(e)))
+
+    assert results[0] == results[1]
+
+
+@pytest.mark.parametrize("value", [None, [1], {"at": 1}])
+def test_rejects_non_numeric_time_claims(value):
+    token = JoseCodec(SECRET).encode({"sub": "user", "exp": value})
+
+    with pytest.raises(JWTClaimsError, match="exp"):
+        HMACCodec(SECRET).decode(token)
+
+
+@pytest.mark.parametrize("codec_cls", BACKENDS)
+def test_rejects_tampered_and_foreign_tokens(codec_cls):
+    codec = codec_cls(SECRET, "HS256")
+    token = codec.encode({"sub": "user-id", "exp": int(time.time()) + 60})
+    header, payload, signature = token.split(".")
+
+    bad_tokens = [
+        f"{header}.{payload}.{signature[:-2]}AA",
+        JoseCodec("another-secret-key-that-is-long-enough", "HS256").encode(
+            {"sub": "x"}
+        ),
+        JoseCodec(SECRET, "HS512").encode({"sub": "x"}),
+        f"eyJhbGciOiJub25lIiwidHlwIjoiSldUIn0.{payload}.",
+        "not-a-token",
+        "a.b.c.d",
+    ]
+    for bad in bad_tokens:
+        with pytest.raises(JWTError):
+            codec.decode(bad)
+
+
+def test_build_codec():
+    assert isinstance(build_codec("jose", SECRET, "HS256"), JoseCodec)
+    assert isinstance(build_codec("hmac", SECRET, "HS256"), HMACCodec)
+    with pytest.raises(ValueError):
+        build_codec("unknown", SECRET, "HS256")
+    with pytest.raises(ValueError):
+        build_codec("hmac", SECRET, "RS256")
+
+
+def _private_pem(key) -> bytes:
+    return key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    )
+
+
+def _public_pem(key) -> bytes:
+    return key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo,
+    )
+
+
+ASYMMETRIC_KEYS = {
+    "EdDSA": ed25519.Ed25519PrivateKey.generate,
+    "ES256": lambda: ec.generate_private_key(ec.SECP256R1()),
+}
+
+
+@pytest.mark.parametrize("algorithm", ["EdDSA", "ES256"])
+def test_asymmetric_roundtrip(algorithm):
+    codec = build_codec("jose", _private_pem(ASYMMETRIC_KEYS[algorithm]()), algorithm)
+    token = codec.encode({"sub": "user-id", "exp": int(time.time()) + 60})
+
+    assert codec.decode(token)["sub"] == "user-id"
+    header, payload, signature = token.split(".")
+    with pytest.raises(JWTError):
+        codec.decode(f"{header}.{payload}.{signature[:-4]}AAAA")
+
+
+def test_asymmetric_key_rotation():
+    old_key = ed25519.Ed25519PrivateKey.generate()
+    new_key = ec.generate_private_key(ec.SECP256R1())
+    old_codec = AsymmetricCodec(old_key)
+    old_token = old_codec.encode({"sub": "user-id"})
+
+    rotated = AsymmetricCodec.from_pem(_private_pem(new_key), [_public_pem(old_key)])
+    assert rotated.decode(old_token)["sub"] == "user-id"
+    assert rotated.algorithm == "ES256"
+
+    # Once the old key is dropped its tokens are rejected
+    with pytest.raises(JWTError):
+        AsymmetricCodec(new_key).decode(old_token)
+
+    jwks = rotated.jwks()["keys"]
+    assert {key["kid"] for key in jwks} == {rotated.kid, old_codec.kid}
+    assert {key["alg"] for key in jwks} == {"EdDSA", "ES256"}
+
+
+def test_asymmetric_key_must_match_algorithm():
+    with pytest.raises(ValueError):
+        build_codec("jose", _private_pem(ed25519.Ed25519PrivateKey.generate()), "ES256")
+
+
+def test_jose_verifies_es256_tokens_from_jwks():
+    """Tokens must be verifiable by a standard library from the JWKS alone."""
+    codec = AsymmetricCodec(ec.generate_private_key(ec.SECP256R1()))
+    token = codec.encode({"sub": "user-id"})
+    jwk = codec.jwks()["keys"][0]
+
+    from jose import jwt
+
+    assert jwt.decode(token, jwk, algorithms=["ES256"])["sub"] == "user-id"
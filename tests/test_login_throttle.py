@@ -0,0 +1,145 @@
+"""
+Tests for the failed-login throttle.
+"""
+
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from app.core.login_throttle import LoginThrottle
+
+
+@pytest.fixture
+def throttle():
+    return LoginThrottle(max_account_failures=3, max_ip_failures=5, base_lockout=10)
+
+
+async def test_account_locked_after_threshold(throttle):
+    for _ in range(2):
+        await throttle.record_failure("user@example.com", "1.1.1.1")
+    assert await throttle.check("user@example.com", "1.1.1.1") == 0
+
+    await throttle.record_failure("user@example.com", "1.1.1.1")
+
+    assert await throttle.check("USER@example.com", "2.2.2.2") == pytest.approx(
+        10, abs=1
+    )
+    assert await throttle.check("other@example.com", "2.2.2.2") == 0
+
+
+async def test_lockout_backs_off_exponentially(throttle):
+    for _ in range(5):
+        await throttle.record_failure("user@example.com", "1.1.1.1")
+
+    assert await throttle.check("user@example.com", "9.9.9.9") == pytest.approx(
+        40, abs=1
+    )
+
+
+async def test_ip_locked_across_accounts(throttle):
+    for i in range(5):
+        await throttle.record_failure(f"user{i}@example.com", "1.1.1.1")
+
+    assert await throttle.check("new@example.com", "1.1.1.1") > 0
+    assert await throttle.check("new@example.com", "2.2.2.2") == 0
+
+
+async def test_success_clears_account_failures(throttle):
+    for _ in range(2):
+        await throttle.record_failure("user@example.com", "1.1.1.1")
+    await throttle.record_success("user@example.com", "1.1.1.1")
+    await throttle.record_failure("user@example.com", "1.1.1.1")
+
+    assert await throttle.check("user@example.com", "1.1.1.1") == 0
+
+
+def _redis_client(failures: int):
+    client = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(return_value=[failures, True, 1, True])
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    client.pipeline = MagicMock(return_value=pipe)
+    client.mget.return_value = [None, None]
+    return client
+
+
+async def test_redis_lock_cached_locally():
+    client = _redis_client(failures=3)
+    throttle = LoginThrottle(client, max_account_failures=3, base_lockout=10)
+
+    await throttle.record_failure("user@example.com", "1.1.1.1")
+
+    client.set.assert_awaited_once()
+    assert client.set.await_args.kwargs["px"] == 10_000
+    assert await throttle.check("user@example.com", "1.1.1.1") > 0
+    client.mget.assert_not_called()
+
+
+async def test_redis_checked_for_other_workers_locks():
+    client = _redis_client(failures=0)
+    throttle = LoginThrottle(client)
+    client.mget.return_value = [None, None]
+
+    assert await throttle.check("user@example.com", "1.1.1.1") == 0
+    assert await throttle.check("user@example.com", "1.1.1.1") == 0
+
+    # The negative answer is cached for local_ttl
+    client.mget.assert_awaited_once()
+
+
+async def test_redis_errors_fail_open():
+    client = _redis_client(failures=0)
+    client.mget.side_effect = ConnectionError("down")
+    throttle = LoginThrottle(client)
+
+    assert await throttle.check("user@example.com", "1.1.1.1") == 0
+
+
+def test_locked_login_skips_password_check(client, behind_proxy):
+    payload = {"email": "victim@example.com", "password": "SecurePass123!"}
+    client.post("/auth/register", json=payload)
+    wrong = {**payload, "password": "WrongPass123!"}
+    # A different source address each time, so only the account is throttled
+    for i in range(5):
+        headers = {"X-Forwarded-For": f"10.0.0.{i}"}
+        assert (
+            client.post("/auth/login", json=wrong, headers=headers).status_code == 401
+        )
+
+    with patch("app.api.routes.auth.averify_password") as verify:
+        response = client.post(
+            "/auth/login", json=payload, headers={"X-Forwarded-For": "10.0.1.1"}
+        )
+
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) > 0
+    verify.assert_not_called()
+
+
+def test_spoofed_forwarded_for_cannot_dodge_ip_lockout(client, monkeypatch):
+    monkeypatch.setattr(
+        client.app.state,
+        "login_throttle",
+        LoginThrottle(max_account_failures=100, max_ip_failures=3, base_lockout=10),
+    )
+    # Without a trusted proxy the header is ignored, so rotating it neither
+    # spreads the failures over several addresses nor escapes the lockout.
+    for i in range(3):
+        response = client.post(
+            "/auth/login",
+            json={"email": f"user{i}@example.com", "password": "WrongPass123!"},
+            headers={"X-Forwarded-For": f"10.0.0.{i}"},
+        )
+        assert response.status_code == 401
+
+    with patch("app.api.routes.auth.averify_password") as verify:
+        response = client.post(
+            "/auth/login",
+            json={"email": "fresh@example.com", "password": "WrongPass123!"},
+            headers={"X-Forwarded-For": "10.0.1.1"},
+        )
+
+    assert response.status_code == 429
+    assert "failed login attempts" in response.json()["detail"]
+    verify.assert_not_called()
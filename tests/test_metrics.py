@@ -0,0 +1,86 @@
+"""
+Tests for the Prometheus metrics.
+"""
+
+from prometheus_client import REGISTRY
+from sqlalchemy import create_engine, text
+
+from app.core.metrics import instrument_engine
+
+
+def _sample(name: str, **labels) -> float:
+    return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def test_request_latency_by_route_template(client):
+    before = _sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/health",
+        status="200",
+    )
+
+    client.get("/health")
+    client.get("/health")
+
+    after = _sample(
+        "http_request_duration_seconds_count",
+        method="GET",
+        route="/health",
+        status="200",
+    )
+    assert after - before == 2
+
+
+def test_hot_path_timers(client):
+    def count(operation):
+        return _sample("auth_operation_duration_seconds_count", operation=operation)
+
+    before = {
+        op: count(op)
+        for op in ("argon2_hash", "jwt_encode", "jwt_decode", "blacklist_lookup")
+    }
+
+    response = client.post(
+        "/auth/register",
+        json={
+            "email": "metrics@example.com",
+            "password": "SecurePass123!",
+        },
+    )
+    token = response.json()["access_token"]
+    client.get("/users/me", headers={"Authorization": f"Bearer {token}"})
+
+    for op, value in before.items():
+        assert count(op) > value, op
+
+
+def test_metrics_endpoint(client):
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="/health"' in response.text
+    assert "auth_operation_duration_seconds_bucket" in response.text
+
+
+def test_readiness_omits_internal_counters(client):
+    response = client.get("/health/ready")
+
+    assert set(response.json()) == {"status", "dependencies"}
+
+
+def test_instrument_engine_times_queries():
+    engine = create_engine("sqlite://")
+    instrument_engine(engine)
+    before = _sample("auth_operation_duration_seconds_count", operation="db_query")
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+
+    assert (
+        _sample("auth_operation_duration_seconds_count", operation="db_query")
+        == before + 1
+    )
@@ -0,0 +1,54 @@
+"""
+Tests for the security/request-ID/timing middleware.
+"""
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.core.middleware import SecurityMiddleware
+
+app = FastAPI()
+app.add_middleware(SecurityMiddleware)
+
+
+@app.get("/ping")
+async def ping(request: Request):
+    return {"request_id": request.state.request_id}
+
+
+@app.get("/auth/cached")
+async def cached():
+    return JSONResponse({}, headers={"Cache-Control": "max-age=60"})
+
+
+client = TestClient(app)
+
+
+def test_security_headers_and_timing():
+    response = client.get("/ping")
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+    assert response.headers["X-Frame-Options"] == "DENY"
+    assert response.headers["Referrer-Policy"] == "strict-origin-when-cross-origin"
+    assert float(response.headers["X-Process-Time"]) >= 0
+    assert "Cache-Control" not in response.headers
+
+
+def test_request_id_generated_and_unique():
+    first = client.get("/ping")
+    second = client.get("/ping")
+    assert first.headers["X-Request-ID"] == first.json()["request_id"]
+    assert first.headers["X-Request-ID"] != second.headers["X-Request-ID"]
+
+
+def test_request_id_echoed():
+    response = client.get("/ping", headers={"X-Request-ID": "abc-123"})
+    assert response.headers["X-Request-ID"] == "abc-123"
+    assert response.json()["request_id"] == "abc-123"
+
+
+def test_auth_paths_are_not_cached():
+    response = client.get("/auth/cached")
+    assert response.headers.get_list("Cache-Control") == [
+        "no-store, no-cache, must-revalidate"
+    ]
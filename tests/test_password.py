@@ -64,3 +64,31 @@ def test_unicode_roundtrip():
     pwd = "Sëcürê@123"
     hashed = hash_password(pwd)
     assert verify_password(pwd, hashed) is True
+
+
+def test_configure_marks_old_hashes_stale():
+    from auth import password
+
+    original = password.current_parameters()
+    hashed = hash_password("Secure@123")
+    try:
+        password.configure(time_cost=1, memory_cost=1024, parallelism=1)
+        assert needs_rehash(hashed) is True
+        assert verify_password("Secure@123", hashed) is True
+    finally:
+        password.configure(*original)
+
+
+def test_calibrate_respects_memory_budget():
+    from auth.calibration import calibrate
+
+    params = calibrate(
+        target_ms=5,
+        memory_budget_kib=1024,
+        parallelism=1,
+        min_memory_kib=64,
+        samples=1,
+    )
+    assert 64 <= params.memory_cost <= 1024
+    assert params.time_cost >= 1
+    assert params.parallelism == 1
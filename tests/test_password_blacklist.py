@@ -0,0 +1,91 @@
+"""
+Tests for the password blacklist index and the validator using it.
+"""
+
+import pytest
+
+from auth import validator
+from auth.blacklist import HashIndexBlacklist, TextBlacklist, build_index, load, main
+
+
+@pytest.fixture
+def index(tmp_path):
+    path = tmp_path / "breached.idx"
+    lines = [f"leaked-{i}\n" for i in range(1000)] + [
+        "  Hunter2-Secret!  \n",
+        "leaked-7\n",
+        "\n",
+    ]
+    # A small chunk size forces several sorted runs to be merged
+    assert build_index(lines, path, chunk_size=64) == 1001
+    return path
+
+
+def test_index_lookups(index):
+    blacklist = HashIndexBlacklist(index)
+
+    assert len(blacklist) == 1001
+    assert "leaked-0" in blacklist
+    assert "LEAKED-999" in blacklist
+    assert "hunter2-secret!" in blacklist
+    assert "leaked-1000" not in blacklist
+    assert "" not in blacklist
+    blacklist.close()
+
+
+def test_empty_index(tmp_path):
+    path = tmp_path / "empty.idx"
+    assert build_index([], path) == 0
+
+    assert "anything" not in HashIndexBlacklist(path)
+
+
+def test_load_detects_format(index, tmp_path):
+    text = tmp_path / "list.txt"
+    text.write_text("Password1!\n")
+
+    assert isinstance(load(index), HashIndexBlacklist)
+    assert isinstance(load(text), TextBlacklist)
+    assert "password1!" in load(text)
+
+
+def test_rejects_truncated_index(index):
+    index.write_bytes(index.read_bytes()[:-3])
+
+    with pytest.raises(ValueError):
+        HashIndexBlacklist(index)
+
+
+def test_validator_uses_configured_index_lazily(index, tmp_path):
+    try:
+        validator.configure_blacklist(str(index))
+        assert validator._blacklist is None
+        assert validator.is_valid_password("Hunter2-Secret!") is False
+        assert validator.is_valid_password("Correct-Horse-9") is True
+        assert isinstance(validator._blacklist, HashIndexBlacklist)
+    finally:
+        validator.configure_blacklist(None)
+
+    assert validator.is_valid_password("Hunter2-Secret!") is True
+
+
+def test_character_classes_match_previous_rules():
+    assert validator.is_valid_password("Sëcürê@123") is True
+    assert validator.is_valid_password("Secure_123") is False  # "_" is not special
+    assert validator.is_valid_password("Secure 123") is False  # nor is whitespace
+    assert validator.is_valid_password("Secure@١٢٣") is True  # Unicode digits count
+    assert validator.is_valid_password("SECURE@123") is False
+
+
+def test_cli_build(tmp_path, capsys):
+    source = tmp_path / "corpus.txt"
+    source.write_bytes(b"alpha\nbeta\n\xff\xfe\n")
+    output = tmp_path / "corpus.idx"
+
+    main(["build", str(source), str(output)])
+    main(["check", str(output), "ALPHA", "gamma"])
+
+    out = capsys.readouterr().out
+    assert "wrote 3 entries" in out
+    assert "ALPHA: listed" in out
+    assert "gamma: not listed" in out
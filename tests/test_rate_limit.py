@@ -0,0 +1,159 @@
+"""
+Tests for the two-tier rate limiter.
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+from starlette.requests import Request
+
+from app.core.config import settings
+from app.core.rate_limit import (
+    RateLimiter,
+    RateLimitRule,
+    SlidingWindowLog,
+    TokenBucket,
+    client_identifier,
+)
+
+RULE = RateLimitRule(times=4, seconds=60)
+
+
+def test_parse_rule():
+    assert RateLimitRule.parse("5/minute") == RateLimitRule(5, 60)
+    assert RateLimitRule.parse("100/hour") == RateLimitRule(100, 3600)
+    assert RateLimitRule.parse("10/30") == RateLimitRule(10, 30)
+    with pytest.raises(ValueError):
+        RateLimitRule.parse("five per minute")
+    with pytest.raises(ValueError):
+        RateLimitRule.parse("0/minute")
+
+
+def test_sliding_window_log():
+    window = SlidingWindowLog(RULE)
+    assert [window.hit(t, RULE) for t in (0, 1, 2, 3)] == [
+        (0.0, 3),
+        (0.0, 2),
+        (0.0, 1),
+        (0.0, 0),
+    ]
+    assert window.hit(10, RULE) == (50, 0)
+    # The first hit leaves the window at t=60
+    assert window.hit(60, RULE) == (0.0, 0)
+
+
+def test_token_bucket_refills():
+    bucket = TokenBucket(RULE)
+    now = bucket.updated
+    for _ in range(4):
+        assert bucket.hit(now, RULE)[0] == 0
+    retry_after, _ = bucket.hit(now, RULE)
+    assert retry_after == pytest.approx(15)
+    assert bucket.hit(now + 15, RULE)[0] == 0
+
+
+@pytest.mark.parametrize("algorithm", ["sliding_window", "token_bucket"])
+async def test_local_only_limiter(algorithm):
+    limiter = RateLimiter(algorithm=algorithm)
+
+    results = [await limiter.hit("login:1.2.3.4", RULE) for _ in range(5)]
+
+    assert results[:4] == [0, 0, 0, 0]
+    assert results[4] > 0
+    assert await limiter.hit("login:5.6.7.8", RULE) == 0
+
+
+async def test_idle_keys_are_evicted():
+    limiter = RateLimiter(max_keys=2)
+    for key in ("a", "b", "c"):
+        await limiter.hit(key, RULE)
+    assert list(limiter._entries) == ["b", "c"]
+
+
+def _redis_client(script):
+    client = MagicMock()
+    client.register_script.return_value = script
+    return client
+
+
+async def test_redis_consulted_only_near_limit():
+    script = AsyncMock(return_value=0)
+    limiter = RateLimiter(redis_client=_redis_client(script), local_fraction=0.5)
+
+    await limiter.hit("k", RULE)
+    await limiter.hit("k", RULE)
+    script.assert_not_called()
+
+    await limiter.hit("k", RULE)
+    # The two locally admitted hits are reported with the third
+    script.assert_awaited_once()
+    args = script.await_args.kwargs["args"]
+    assert args[:3] == [4, 60_000, 2]
+
+
+async def test_redis_decision_applies():
+    script = AsyncMock(return_value=1500)
+    limiter = RateLimiter(redis_client=_redis_client(script), local_fraction=0)
+
+    assert await limiter.hit("k", RULE) == 1.5
+
+
+async def test_redis_errors_fall_back_to_local():
+    script = AsyncMock(side_effect=ConnectionError("down"))
+    limiter = RateLimiter(redis_client=_redis_client(script), local_fraction=0)
+
+    assert await limiter.hit("k", RULE) == 0
+    assert limiter._entries["k"].unsynced == 1
+
+
+def test_route_limit_returns_429(client):
+    payload = {"email": "nobody@example.com", "password": "WrongPass123!"}
+    statuses = [client.post("/auth/login", json=payload).status_code for _ in range(6)]
+
+    assert statuses[:5] == [401] * 5
+    assert statuses[5] == 429
+    response = client.post("/auth/login", json=payload)
+    assert int(response.headers["Retry-After"]) > 0
+
+
+def _request(peer, *forwarded):
+    headers = [(b"x-forwarded-for", value.encode()) for value in forwarded]
+    return Request({"type": "http", "client": (peer, 1234), "headers": headers})
+
+
+@pytest.mark.parametrize(
+    "allowed,peer,forwarded,expected",
+    [
+        # Untrusted peers are keyed on their own address
+        (["127.0.0.1"], "203.0.113.9", ["1.2.3.4"], "203.0.113.9"),
+        (["127.0.0.1"], "127.0.0.1", [], "127.0.0.1"),
+        # The proxy appends the real client after whatever it was sent
+        (["127.0.0.1"], "127.0.0.1", ["1.2.3.4, 198.51.100.7"], "198.51.100.7"),
+        (
+            ["127.0.0.1", "10.0.0.0/8"],
+            "127.0.0.1",
+            ["6.6.6.6, 198.51.100.7, 10.1.2.3"],
+            "198.51.100.7",
+        ),
+        (["10.0.0.0/8"], "10.0.0.1", ["198.51.100.7", "10.0.0.2"], "198.51.100.7"),
+        (["10.0.0.0/8"], "10.0.0.1", ["10.0.0.3, 10.0.0.2"], "10.0.0.3"),
+        # Trusting everyone trusts every hop, so the left-most one wins
+        (["*"], "203.0.113.9", ["1.2.3.4, 198.51.100.7"], "1.2.3.4"),
+    ],
+)
+def test_client_identifier(monkeypatch, allowed, peer, forwarded, expected):
+    monkeypatch.setattr(settings, "FORWARDED_ALLOW_IPS", allowed)
+
+    assert client_identifier(_request(peer, *forwarded)) == expected
+
+
+def test_spoofed_forwarded_for_shares_the_peer_limit(client):
+    payload = {"email": "nobody@example.com", "password": "WrongPass123!"}
+    statuses = [
+        client.post(
+            "/auth/login", json=payload, headers={"X-Forwarded-For": f"10.9.0.{i}"}
+        ).status_code
+        for i in range(6)
+    ]
+
+    assert statuses[5] == 429
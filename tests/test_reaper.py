@@ -0,0 +1,66 @@
+"""
+Tests for the refresh token reaper.
+"""
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.db.models import RefreshToken, User
+from app.db.reaper import _month_start, maintain_partitions, reap_refresh_tokens
+
+
+def _seed(db_session, now):
+    user = User(email="reaper@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    rows = {
+        "live": (now + timedelta(days=1), False),
+        "expired": (now - timedelta(seconds=1), False),
+        "revoked": (now + timedelta(days=1), True),
+    }
+    for name, (expires_at, revoked) in rows.items():
+        db_session.add(
+            RefreshToken(
+                user_id=user.id, token_hash=name, expires_at=expires_at, revoked=revoked
+            )
+        )
+    for i in range(5):
+        db_session.add(
+            RefreshToken(
+                user_id=user.id,
+                token_hash=f"old-{i}",
+                expires_at=now - timedelta(days=i + 1),
+            )
+        )
+    db_session.commit()
+
+
+async def test_reaps_expired_and_revoked_in_batches(db_session, async_engine):
+    now = datetime(2026, 1, 15, 12, 0)
+    _seed(db_session, now)
+
+    deleted = await reap_refresh_tokens(async_engine, batch_size=2, now=now)
+
+    assert deleted == 7
+    db_session.expire_all()
+    remaining = db_session.scalars(select(RefreshToken.token_hash)).all()
+    assert remaining == ["live"]
+
+
+async def test_reap_is_idempotent(db_session, async_engine):
+    now = datetime(2026, 1, 15, 12, 0)
+    _seed(db_session, now)
+
+    await reap_refresh_tokens(async_engine, now=now)
+
+    assert await reap_refresh_tokens(async_engine, now=now) == 0
+
+
+async def test_partition_maintenance_skipped_off_postgres(async_engine):
+    assert await maintain_partitions(async_engine) == ([], [])
+
+
+def test_month_start_rolls_over_years():
+    assert _month_start(datetime(2026, 11, 20), 2) == datetime(2027, 1, 1)
+    assert _month_start(datetime(2026, 1, 5), -1) == datetime(2025, 12, 1)
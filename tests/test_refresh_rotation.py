@@ -0,0 +1,136 @@
+"""
+Tests for refresh token rotation and the active-token index.
+"""
+
+import asyncio
+from datetime import timedelta
+from unittest.mock import patch
+
+import pytest
+from sqlalchemy import select, text
+from sqlalchemy.exc import IntegrityError
+
+from app.core.security import refresh_token_digest
+from app.db.models import RefreshToken, utc_now_naive
+from app.db.refresh_tokens import digest_columns, rotate_refresh_token
+from tests.conftest import IS_SQLITE
+
+OLD = refresh_token_digest("old")
+
+pytestmark = pytest.mark.parametrize("user", [{"token_version": 3}], indirect=True)
+
+
+@pytest.fixture(autouse=True)
+def old_token(user, db_session):
+    db_session.add(
+        RefreshToken(
+            user_id=user.id,
+            expires_at=utc_now_naive() + timedelta(days=1),
+            **digest_columns(OLD),
+        )
+    )
+    db_session.commit()
+
+
+@pytest.fixture
+def rotate(async_session_factory):
+    async def rotate(old, new):
+        async with async_session_factory() as db:
+            return await rotate_refresh_token(
+                db,
+                refresh_token_digest(old),
+                refresh_token_digest(new),
+                utc_now_naive() + timedelta(days=1),
+            )
+
+    return rotate
+
+
+async def test_rotation_revokes_and_replaces(user, db_session, rotate):
+    rotated = await rotate("old", "new")
+
+    assert rotated.user_id == user.id
+    assert rotated.token_version == 3
+    db_session.expire_all()
+    tokens = {
+        t.token_digest: t.revoked for t in db_session.scalars(select(RefreshToken))
+    }
+    assert tokens == {OLD: True, refresh_token_digest("new"): False}
+
+
+async def test_used_or_unknown_token_is_rejected(user, rotate):
+    assert await rotate("old", "new") is not None
+    assert await rotate("old", "newer") is None
+    assert await rotate("missing", "other") is None
+
+
+async def test_expired_token_is_rejected(user, db_session, rotate):
+    db_session.add(
+        RefreshToken(
+            user_id=user.id,
+            expires_at=utc_now_naive() - timedelta(seconds=1),
+            **digest_columns(refresh_token_digest("stale")),
+        )
+    )
+    db_session.commit()
+
+    assert await rotate("stale", "new") is None
+
+
+async def test_concurrent_rotation_succeeds_once(user, rotate):
+    results = await asyncio.gather(rotate("old", "a"), rotate("old", "b"))
+
+    assert sum(r is not None for r in results) == 1
+
+
+async def test_legacy_hex_rows_still_rotate(user, db_session, rotate):
+    # Written by an instance that predates token_digest
+    db_session.add(
+        RefreshToken(
+            user_id=user.id,
+            expires_at=utc_now_naive() + timedelta(days=1),
+            token_hash=refresh_token_digest("legacy").hex(),
+        )
+    )
+    db_session.commit()
+
+    assert await rotate("legacy", "new") is not None
+    with patch("app.core.config.settings.REFRESH_TOKEN_LEGACY_HEX", False):
+        assert await rotate("new", "newer") is not None
+
+
+async def test_digest_only_when_legacy_hex_disabled(user, db_session, rotate):
+    with patch("app.core.config.settings.REFRESH_TOKEN_LEGACY_HEX", False):
+        await rotate("old", "new")
+
+    db_session.expire_all()
+    new = db_session.scalar(
+        select(RefreshToken).where(
+            RefreshToken.token_digest == refresh_token_digest("new")
+        )
+    )
+    assert new.token_hash is None
+
+
+def test_active_token_digest_is_unique(user, db_session):
+    expires_at = utc_now_naive() + timedelta(days=1)
+    db_session.add(
+        RefreshToken(user_id=user.id, expires_at=expires_at, **digest_columns(OLD))
+    )
+    with pytest.raises(IntegrityError):
+        db_session.commit()
+    db_session.rollback()
+
+    # Revoked rows do not take part in the index
+    db_session.add(
+        RefreshToken(
+            user_id=user.id, expires_at=expires_at, revoked=True, **digest_columns(OLD)
+        )
+    )
+    db_session.commit()
+
+
+@pytest.mark.skipif(not IS_SQLITE, reason="Postgres uses its native UUID type")
+def test_uuids_stored_as_16_bytes(user, db_session):
+    raw = db_session.execute(text("SELECT id FROM users")).scalar()
+    assert raw == user.id.bytes
@@ -0,0 +1,195 @@
+"""
+Tests for the preforking server entry point.
+"""
+
+import os
+import re
+import signal
+import socket
+import subprocess
+import sys
+import time
+from pathlib import Path
+from unittest.mock import MagicMock
+
+import httpx
+
+from app.core.config import Settings, settings
+from app.core.hashing import resolve_hash_parameters
+from app.server import MIN_REDIS_CONNECTIONS, pin_hash_parameters, share_budgets
+from auth.calibration import HashParameters
+
+ROOT = Path(__file__).resolve().parents[1]
+
+
+def test_share_budgets():
+    settings = Settings(
+        DB_POOL_SIZE=5,
+        DB_MAX_OVERFLOW=10,
+        SERVER_DB_CONNECTION_BUDGET=24,
+        SERVER_REDIS_CONNECTION_BUDGET=40,
+    )
+
+    limits = share_budgets(settings, 8, cpus=8)
+
+    assert limits == {
+        "db_pool_size": 3,
+        "db_max_overflow": 0,
+        "redis_max_connections": 5,
+        "hash_pool_workers": 1,
+    }
+    assert settings.DB_POOL_SIZE + settings.DB_MAX_OVERFLOW == 3
+
+    settings = Settings(SERVER_REDIS_CONNECTION_BUDGET=10)
+    assert share_budgets(settings, 8)["redis_max_connections"] == MIN_REDIS_CONNECTIONS
+    settings = Settings(DB_POOL_SIZE=5, DB_MAX_OVERFLOW=10)
+    assert share_budgets(settings, 8)["db_max_overflow"] == 10
+
+
+def test_share_budgets_divides_hashing_between_workers():
+    # One worker per CPU: one hashing process each, not HASH_POOL_WORKERS
+    settings = Settings(HASH_POOL_WORKERS=2)
+    assert share_budgets(settings, 8, cpus=8)["hash_pool_workers"] == 1
+    assert settings.HASH_POOL_WORKERS == 1
+
+    # Spare CPUs are shared out, up to HASH_POOL_WORKERS
+    for pool, expected in ((2, 2), (8, 4)):
+        settings = Settings(HASH_POOL_WORKERS=pool)
+        assert share_budgets(settings, 2, cpus=8)["hash_pool_workers"] == expected
+
+    # An explicit budget overrides the CPU count
+    settings = Settings(HASH_POOL_WORKERS=8, SERVER_HASH_POOL_BUDGET=6)
+    assert share_budgets(settings, 2, cpus=8)["hash_pool_workers"] == 3
+
+
+def test_hash_parameters_are_calibrated_once_for_all_workers(monkeypatch):
+    calibrated = HashParameters(time_cost=4, memory_cost=32 * 1024, parallelism=1)
+    calibrate = MagicMock(return_value=calibrated)
+    monkeypatch.setattr("app.core.hashing.calibrate", calibrate)
+    for name in (
+        "ARGON2_CALIBRATE",
+        "ARGON2_TIME_COST",
+        "ARGON2_MEMORY_COST_KIB",
+        "ARGON2_PARALLELISM",
+    ):
+        monkeypatch.setattr(settings, name, getattr(settings, name))
+    monkeypatch.setattr(settings, "ARGON2_CALIBRATE", True)
+
+    pin_hash_parameters(settings)
+
+    # What each worker's lifespan resolves after the fork
+    assert resolve_hash_parameters() == calibrated
+    assert not settings.ARGON2_CALIBRATE
+    calibrate.assert_called_once()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _wait_for(
+    log: Path, pattern: str, count: int = 1, timeout: float = 60.0
+) -> list[str]:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        found = re.findall(pattern, log.read_text())
+        if len(found) >= count:
+            return found
+        time.sleep(0.1)
+    raise AssertionError(f"{pattern!r} not logged:\n{log.read_text()}")
+
+
+def _start(tmp_path, port: int, **env) -> tuple[subprocess.Popen, Path]:
+    log = tmp_path / "server.log"
+    (tmp_path / "metrics").mkdir(exist_ok=True)
+    env = {
+        **os.environ,
+        "TESTING": "1",
+        "DATABASE_URL": f"sqlite:///{tmp_path / 'server.db'}",
+        "PROMETHEUS_MULTIPROC_DIR": str(tmp_path / "metrics"),
+        "HASH_POOL_KIND": "thread",
+        "SERVER_GRACEFUL_TIMEOUT_SECONDS": "5",
+        **env,
+    }
+    with open(log, "w") as out:
+        master = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "app.server",
+                "--host",
+                "127.0.0.1",
+                "--port",
+                str(port),
+                "--workers",
+                "2",
+            ],
+            cwd=ROOT,
+            env=env,
+            stdout=out,
+            stderr=subprocess.STDOUT,
+        )
+    return master, log
+
+
+def _worker_pids(log: Path) -> set[int]:
+    return {
+        int(pid)
+        for pid in re.findall(r"Started server process \[(\d+)\]", log.read_text())
+    }
+
+
+def test_prefork_rolling_restart_and_shutdown(tmp_path):
+    port = _free_port()
+    master, log = _start(tmp_path, port)
+    try:
+        _wait_for(log, r"serving with 2 workers")
+        assert httpx.get(f"http://127.0.0.1:{port}/health").json() == {"status": "ok"}
+        before = _worker_pids(log)
+        assert len(before) == 2
+
+        master.send_signal(signal.SIGHUP)
+        _wait_for(log, r"Rolling restart complete")
+        assert len(_worker_pids(log) - before) == 2
+        assert httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200
+
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+    # Every exited worker's metric files were marked dead
+    assert not list((tmp_path / "metrics").glob("gauge_live*"))
+
+
+def test_crashed_worker_is_replaced(tmp_path):
+    port = _free_port()
+    master, log = _start(tmp_path, port)
+    try:
+        _wait_for(log, r"serving with 2 workers")
+        os.kill(min(_worker_pids(log)), signal.SIGKILL)
+        _wait_for(log, r"exited unexpectedly")
+        _wait_for(log, r"Started server process", count=3)
+        assert httpx.get(f"http://127.0.0.1:{port}/health").status_code == 200
+        master.send_signal(signal.SIGTERM)
+        assert master.wait(timeout=30) == 0
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+
+
+def test_master_exits_when_workers_cannot_start(tmp_path):
+    master, log = _start(
+        tmp_path, _free_port(), BREACHED_PASSWORDS_PATH=str(tmp_path / "missing")
+    )
+    try:
+        assert master.wait(timeout=60) == 3
+    finally:
+        if master.poll() is None:
+            master.kill()
+            master.wait()
+    assert "Workers failed to start" in log.read_text()
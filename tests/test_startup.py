@@ -0,0 +1,114 @@
+"""
+Tests for the app factory, the startup schema check and startup profiling.
+"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import NullPool
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from app.core.config import Settings
+from app.db.schema import ensure_schema, migration_heads
+from app.main import create_app
+from app.server import main
+
+
+def test_migration_heads_match_alembic():
+    heads = ScriptDirectory.from_config(Config("alembic.ini")).get_heads()
+
+    assert migration_heads() == set(heads)
+
+
+async def _tables(engine) -> set[str]:
+    async with engine.connect() as conn:
+        rows = await conn.execute(
+            text("SELECT name FROM sqlite_master WHERE type = 'table'")
+        )
+        return set(rows.scalars())
+
+
+async def test_ensure_schema_skips_create_all_at_head(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}", poolclass=NullPool
+    )
+    (head,) = migration_heads()
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+        )
+        await conn.execute(text("INSERT INTO alembic_version VALUES (:v)"), {"v": head})
+
+    assert await ensure_schema(engine, "never") == "skipped"
+    assert await ensure_schema(engine, "auto") == "at_head"
+    assert "users" not in await _tables(engine)
+
+    assert await ensure_schema(engine, "always") == "created"
+    assert "users" in await _tables(engine)
+    await engine.dispose()
+
+
+async def test_ensure_schema_creates_tables_behind_head(tmp_path):
+    engine = create_async_engine(
+        f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}", poolclass=NullPool
+    )
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("CREATE TABLE alembic_version (version_num VARCHAR(32) NOT NULL)")
+        )
+        await conn.execute(text("INSERT INTO alembic_version VALUES ('0000000000')"))
+
+    assert await ensure_schema(engine, "auto") == "created"
+    assert {"users", "refresh_tokens", "user_sessions"} <= await _tables(engine)
+    await engine.dispose()
+
+
+def test_create_app_uses_given_settings():
+    app = create_app(
+        Settings(ALLOWED_ORIGINS="https://example.com", METRICS_ENABLED=False)
+    )
+
+    assert app.state.settings.ALLOWED_ORIGINS == ["https://example.com"]
+    assert any(route.path == "/auth/login" for route in app.routes)
+
+
+def test_startup_phases_exported(client):
+    body = client.get("/metrics").text
+
+    for phase in ("schema", "hashing_pool", "redis", "limits", "background_tasks"):
+        assert f'startup_phase_seconds{{phase="{phase}"}}' in body
+
+
+def test_import_defers_startup_only_modules():
+    code = (
+        "import sys, app.main; app.main.create_app(); "
+        "print(sorted("
+        "m for m in ('redis', 'alembic', 'statistics') if m in sys.modules"
+        "))"
+    )
+    out = subprocess.run(
+        [sys.executable, "-c", code],
+        capture_output=True,
+        text=True,
+        check=True,
+        cwd=Path(__file__).resolve().parents[1],
+        env={"TESTING": "1", "PATH": ""},
+    ).stdout
+
+    assert out.strip() == "[]"
+
+
+def test_profile_startup(tmp_path, capsys):
+    output = tmp_path / "startup.json"
+
+    main(["--profile-startup", "--json", str(output)])
+
+    profile = json.loads(output.read_text())
+    assert set(profile) == {"import", "build", "lifespan"}
+    assert "schema" in profile["lifespan"] and "shutdown" in profile["lifespan"]
+    assert "(to ready)" in capsys.readouterr().out
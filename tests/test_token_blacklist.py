@@ -1,11 +1,14 @@
 """
 Tests for token blacklist functionality.
 """
+import asyncio
+
 import pytest
 from datetime import datetime, timezone, timedelta
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from app.core.token_blacklist import TokenBlacklist
+from app.core.bloom import BloomFilter
+from app.core.token_blacklist import REVOCATION_CHANNEL, TokenBlacklist
 
 
 class TestTokenBlacklist:
@@ -28,6 +31,7 @@ class TestTokenBlacklist:
             await blacklist.add(jti, exp)
 
             mock_client.setex.assert_called_once()
+            mock_client.publish.assert_called_once_with(REVOCATION_CHANNEL, jti)
 
     @pytest.mark.asyncio
     async def test_is_blacklisted_returns_true(self, blacklist):
@@ -70,3 +74,205 @@ class TestTokenBlacklist:
             await blacklist.add(jti, exp)
 
             mock_client.setex.assert_not_called()
+
+
+class TestBloomFilter:
+    """Unit tests for the local Bloom filter."""
+
+    def test_no_false_negatives(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        items = [f"jti-{i}" for i in range(1000)]
+        for item in items:
+            bloom.add(item)
+        assert all(item in bloom for item in items)
+
+    def test_false_positive_rate_near_target(self):
+        bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        false_positives = sum(f"other-{i}" in bloom for i in range(10_000))
+        assert false_positives < 300
+
+
+class TestTokenBlacklistLocalFilter:
+    """The local filter answers negatives without touching Redis."""
+
+    @pytest.fixture
+    def redis_client(self):
+        client = AsyncMock()
+
+        async def scan_iter(match=None, count=None):
+            for key in ("token_blacklist:revoked-1", "token_blacklist:revoked-2"):
+                yield key
+
+        client.scan_iter = scan_iter
+        client.exists.return_value = 1
+        return client
+
+    async def test_unsynced_filter_falls_through_to_redis(self, redis_client):
+        blacklist = TokenBlacklist(redis_client, local_filter=True)
+
+        assert await blacklist.is_blacklisted("unknown") is True
+        redis_client.exists.assert_called_once()
+
+    async def test_negative_lookup_is_local(self, redis_client):
+        blacklist = TokenBlacklist(redis_client, local_filter=True)
+        await blacklist.rebuild_filter()
+
+        assert await blacklist.is_blacklisted("never-revoked") is False
+        redis_client.exists.assert_not_called()
+
+        assert await blacklist.is_blacklisted("revoked-1") is True
+        redis_client.exists.assert_called_once_with("token_blacklist:revoked-1")
+
+    async def test_add_updates_filter_and_publishes(self, redis_client):
+        blacklist = TokenBlacklist(redis_client, local_filter=True)
+        await blacklist.rebuild_filter()
+        exp = int((datetime.now(timezone.utc) + timedelta(hours=1)).timestamp())
+
+        await blacklist.add("new-jti", exp)
+
+        redis_client.publish.assert_called_once_with(REVOCATION_CHANNEL, "new-jti")
+        assert await blacklist.is_blacklisted("new-jti") is True
+
+    async def test_revocation_during_rebuild_reaches_both_filters(self):
+        messages: asyncio.Queue = asyncio.Queue()
+        scanning = asyncio.Event()
+        release = asyncio.Event()
+        scans = 0
+
+        async def scan_iter(match=None, count=None):
+            nonlocal scans
+            scans += 1
+            yield "token_blacklist:revoked-1"
+            if scans > 1:
+                scanning.set()
+                await release.wait()
+
+        async def get_message(ignore_subscribe_messages=False, timeout=None):
+            try:
+                data = await asyncio.wait_for(messages.get(), timeout)
+            except asyncio.TimeoutError:
+                return None
+            return {"type": "message", "data": data}
+
+        pubsub = MagicMock()
+        pubsub.subscribe = AsyncMock()
+        pubsub.close = AsyncMock()
+        pubsub.get_message = get_message
+        redis_client = MagicMock()
+        redis_client.scan_iter = scan_iter
+        redis_client.pubsub.return_value = pubsub
+        blacklist = TokenBlacklist(
+            redis_client, local_filter=True, rebuild_interval=0.01
+        )
+
+        blacklist.start()
+        try:
+            await asyncio.wait_for(scanning.wait(), 1)
+            # No further rebuild: the scan does not list the new key
+            blacklist.rebuild_interval = 60
+            old, new = blacklist._filter, blacklist._building
+            await messages.put("revoked-mid-scan")
+            async with asyncio.timeout(1):
+                while "revoked-mid-scan" not in new:
+                    await asyncio.sleep(0.001)
+
+            assert "revoked-mid-scan" in old
+            release.set()
+            async with asyncio.timeout(1):
+                while blacklist._filter is old:
+                    await asyncio.sleep(0.001)
+            assert blacklist._filter is new
+        finally:
+            release.set()
+            await blacklist.stop()
+
+
+class TestTokenBlacklistBatching:
+    """Bulk writes and coalesced lookups."""
+
+    @pytest.fixture
+    def redis_client(self):
+        client = AsyncMock()
+        client.mget.side_effect = lambda keys: [
+            "1" if key.endswith("revoked") else None for key in keys
+        ]
+        pipe = MagicMock()
+        pipe.execute = AsyncMock()
+        pipe.__aenter__ = AsyncMock(return_value=pipe)
+        pipe.__aexit__ = AsyncMock(return_value=False)
+        client.pipeline = MagicMock(return_value=pipe)
+        return client
+
+    async def test_add_many_uses_one_pipeline(self, redis_client):
+        blacklist = TokenBlacklist(redis_client)
+        now = datetime.now(timezone.utc)
+        live = int((now + timedelta(hours=1)).timestamp())
+        expired = int((now - timedelta(hours=1)).timestamp())
+
+        written = await blacklist.add_many([("a", live), ("b", live), ("c", expired)])
+
+        assert written == 2
+        pipe = redis_client.pipeline.return_value
+        assert pipe.setex.call_count == 2
+        assert pipe.publish.call_count == 2
+        pipe.execute.assert_awaited_once()
+        redis_client.setex.assert_not_called()
+
+    async def test_are_blacklisted_uses_mget(self, redis_client):
+        blacklist = TokenBlacklist(redis_client)
+
+        result = await blacklist.are_blacklisted(["x-revoked", "y", "z-revoked"])
+
+        assert result == [True, False, True]
+        redis_client.mget.assert_called_once()
+
+    async def test_concurrent_lookups_are_coalesced(self, redis_client):
+        blacklist = TokenBlacklist(redis_client, batch_window=0.01)
+
+        results = await asyncio.gather(
+            blacklist.is_blacklisted("a-revoked"),
+            blacklist.is_blacklisted("b"),
+            blacklist.is_blacklisted("a-revoked"),
+        )
+
+        assert results == [True, False, True]
+        redis_client.mget.assert_called_once_with(
+            ["token_blacklist:a-revoked", "token_blacklist:b"]
+        )
+        redis_client.exists.assert_not_called()
+
+    async def test_batch_flushes_when_full(self, redis_client):
+        blacklist = TokenBlacklist(redis_client, batch_window=60, batch_max_size=2)
+
+        results = await asyncio.wait_for(
+            asyncio.gather(
+                blacklist.is_blacklisted("a"), blacklist.is_blacklisted("b")
+            ),
+            timeout=1,
+        )
+
+        assert results == [False, False]
+
+    async def test_batch_errors_reach_every_caller(self, redis_client):
+        redis_client.mget.side_effect = ConnectionError("down")
+        blacklist = TokenBlacklist(redis_client, batch_window=0.01)
+
+        results = await asyncio.gather(
+            blacklist.is_blacklisted("a"),
+            blacklist.is_blacklisted("b"),
+            return_exceptions=True,
+        )
+
+        assert all(isinstance(r, ConnectionError) for r in results)
+
+    async def test_stop_resolves_pending_batches(self, redis_client):
+        blacklist = TokenBlacklist(redis_client, batch_window=60)
+
+        lookup = asyncio.ensure_future(blacklist.is_blacklisted("a-revoked"))
+        await asyncio.sleep(0)
+        await blacklist.stop()
+
+        assert lookup.done() and lookup.result() is True
+        assert not blacklist._tasks
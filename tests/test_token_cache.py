@@ -0,0 +1,107 @@
+"""
+Tests for the verified JWT claims cache.
+"""
+
+import time
+from unittest.mock import patch
+
+import pytest
+from jose import JWTError
+from prometheus_client import REGISTRY
+
+from app.core import security
+from app.core.security import (
+    create_access_token,
+    decode_access_token,
+    get_token_payload,
+)
+from app.core.token_cache import VerifiedTokenCache
+
+
+class TestVerifiedTokenCache:
+    """Unit tests for VerifiedTokenCache."""
+
+    def test_hit_after_put(self):
+        cache = VerifiedTokenCache(max_size=10)
+        claims = {"sub": "user", "exp": int(time.time()) + 60}
+        cache.put("token", claims)
+
+        assert cache.get("token") == claims
+        assert cache.get("other-token") is None
+        assert cache.stats()["hits"] == 1
+        assert cache.stats()["misses"] == 1
+
+    def test_lookups_are_exported(self):
+        def sample(name, **labels):
+            return REGISTRY.get_sample_value(name, labels) or 0.0
+
+        cache = VerifiedTokenCache(max_size=10)
+        hits = sample("jwt_cache_lookups_total", result="hit")
+        misses = sample("jwt_cache_lookups_total", result="miss")
+        cache.put("token", {"sub": "user", "exp": int(time.time()) + 60})
+
+        cache.get("token")
+        cache.get("other-token")
+
+        assert sample("jwt_cache_lookups_total", result="hit") == hits + 1
+        assert sample("jwt_cache_lookups_total", result="miss") == misses + 1
+        assert sample("jwt_cache_entries") == 1
+
+    def test_entry_expires_with_token(self):
+        cache = VerifiedTokenCache(max_size=10)
+        exp = int(time.time()) + 60
+        cache.put("token", {"exp": exp})
+
+        with patch("app.core.token_cache.time.time", return_value=exp + 1):
+            assert cache.get("token") is None
+
+    def test_expired_or_exp_less_claims_not_cached(self):
+        cache = VerifiedTokenCache(max_size=10)
+        cache.put("expired", {"exp": int(time.time()) - 1})
+        cache.put("no-exp", {"sub": "user"})
+
+        assert cache.get("expired") is None
+        assert cache.get("no-exp") is None
+
+    def test_bounded(self):
+        cache = VerifiedTokenCache(max_size=2)
+        exp = int(time.time()) + 60
+        for token in ("a", "b", "c"):
+            cache.put(token, {"exp": exp})
+
+        assert cache.get("a") is None
+        assert cache.get("c") is not None
+
+    def test_returns_copies(self):
+        cache = VerifiedTokenCache(max_size=10)
+        cache.put("token", {"exp": int(time.time()) + 60})
+        cache.get("token")["exp"] = 0
+
+        assert cache.get("token")["exp"] != 0
+
+
+class TestDecodeAccessToken:
+    """decode_access_token should verify each token only once."""
+
+    @pytest.fixture(autouse=True)
+    def fresh_cache(self, monkeypatch):
+        monkeypatch.setattr(security, "token_cache", VerifiedTokenCache(max_size=10))
+
+    def test_second_decode_is_cached(self):
+        token = create_access_token("user-id")
+        with patch.object(
+            security.jwt_codec, "decode", wraps=security.jwt_codec.decode
+        ) as decode:
+            first = decode_access_token(token)
+            second = decode_access_token(token)
+            assert get_token_payload(token) == first
+
+        assert first == second
+        assert decode.call_count == 1
+
+    def test_invalid_token_not_cached(self):
+        token = create_access_token("user-id") + "x"
+        for _ in range(2):
+            with pytest.raises(JWTError):
+                decode_access_token(token)
+        assert security.token_cache.stats()["size"] == 0
@@ -0,0 +1,146 @@
+"""
+Tests for the authenticated user cache.
+"""
+
+import asyncio
+import uuid
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+import pytest
+
+from app.core import user_cache as user_cache_module
+from app.core.user_cache import INVALIDATION_CHANNEL, UserCache, UserSnapshot
+
+
+def make_snapshot(token_version: int = 1) -> UserSnapshot:
+    return UserSnapshot(
+        id=uuid.uuid4(),
+        email="user@example.com",
+        is_active=True,
+        created_at=datetime(2025, 1, 1),
+        token_version=token_version,
+    )
+
+
+class TestUserCache:
+    """Unit tests for UserCache."""
+
+    def test_put_and_get(self):
+        cache = UserCache(max_size=10, ttl_seconds=60)
+        snapshot = make_snapshot()
+        cache.put(snapshot, cache.epoch())
+
+        assert cache.get(str(snapshot.id)) == snapshot
+        assert cache.hits == 1
+
+    def test_lru_eviction(self):
+        cache = UserCache(max_size=2, ttl_seconds=60)
+        first, second, third = make_snapshot(), make_snapshot(), make_snapshot()
+        for snapshot in (first, second):
+            cache.put(snapshot, cache.epoch())
+        cache.get(str(first.id))  # first becomes most recently used
+        cache.put(third, cache.epoch())
+
+        assert cache.get(str(second.id)) is None
+        assert cache.get(str(first.id)) == first
+        assert cache.get(str(third.id)) == third
+
+    def test_ttl_expiry(self):
+        cache = UserCache(max_size=10, ttl_seconds=30)
+        snapshot = make_snapshot()
+        with patch("app.core.user_cache.time.monotonic", return_value=1000.0):
+            cache.put(snapshot, cache.epoch())
+        with patch("app.core.user_cache.time.monotonic", return_value=1031.0):
+            assert cache.get(str(snapshot.id)) is None
+
+    def test_stale_put_after_invalidation_is_ignored(self):
+        cache = UserCache(max_size=10, ttl_seconds=60)
+        snapshot = make_snapshot()
+        epoch = cache.epoch()
+        cache.invalidate_local(str(snapshot.id))
+        cache.put(snapshot, epoch)
+
+        assert cache.get(str(snapshot.id)) is None
+
+    async def test_invalidate_publishes(self):
+        redis_client = AsyncMock()
+        cache = UserCache(max_size=10, ttl_seconds=60, redis_client=redis_client)
+        cache._subscribed = True
+        snapshot = make_snapshot()
+        cache.put(snapshot, cache.epoch())
+
+        await cache.invalidate(snapshot.id)
+
+        assert cache.get(str(snapshot.id)) is None
+        redis_client.publish.assert_called_once_with(
+            INVALIDATION_CHANNEL, str(snapshot.id)
+        )
+
+    @pytest.mark.parametrize("max_size,ttl", [(0, 60), (10, 0)])
+    def test_disabled(self, max_size, ttl):
+        cache = UserCache(max_size=max_size, ttl_seconds=ttl)
+        snapshot = make_snapshot()
+        cache.put(snapshot, cache.epoch())
+        assert cache.get(str(snapshot.id)) is None
+
+
+class FlakyPubSub:
+    """Pub/sub whose first connection drops after one message."""
+
+    connections = 0
+
+    def __init__(self, messages: asyncio.Queue):
+        self.messages = messages
+
+    async def subscribe(self, channel):
+        FlakyPubSub.connections += 1
+
+    async def listen(self):
+        if FlakyPubSub.connections == 1:
+            yield {"type": "subscribe", "data": 1}
+            raise ConnectionError("connection reset")
+        while True:
+            yield await self.messages.get()
+
+    async def close(self):
+        pass
+
+
+class TestUserCacheListener:
+    """The invalidation listener and its reconnects."""
+
+    def test_bypassed_until_subscribed(self):
+        cache = UserCache(max_size=10, ttl_seconds=60, redis_client=AsyncMock())
+        snapshot = make_snapshot()
+        cache.put(snapshot, cache.epoch())
+
+        assert not cache.active
+        assert cache.get(str(snapshot.id)) is None
+
+    async def test_reconnects_and_clears_after_drop(self, monkeypatch):
+        monkeypatch.setattr(user_cache_module, "RECONNECT_BACKOFF_INITIAL_SECONDS", 0)
+        FlakyPubSub.connections = 0
+        messages: asyncio.Queue = asyncio.Queue()
+        redis_client = AsyncMock()
+        redis_client.pubsub = lambda: FlakyPubSub(messages)
+        cache = UserCache(max_size=10, ttl_seconds=60, redis_client=redis_client)
+        snapshot = make_snapshot()
+
+        cache.start()
+        for _ in range(100):
+            if FlakyPubSub.connections == 2 and cache.active:
+                break
+            await asyncio.sleep(0)
+        assert FlakyPubSub.connections == 2
+        assert cache.active
+
+        cache.put(snapshot, cache.epoch())
+        assert cache.get(str(snapshot.id)) == snapshot
+        await messages.put({"type": "message", "data": str(snapshot.id).encode()})
+        for _ in range(10):
+            await asyncio.sleep(0)
+        assert cache.get(str(snapshot.id)) is None
+
+        await cache.stop()
+        assert not cache.active
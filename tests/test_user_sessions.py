@@ -0,0 +1,208 @@
+"""
+Tests for session listing and revocation.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from app.db.models import RefreshToken, User, UserSession
+from app.db.reaper import reap_refresh_tokens, reap_sessions
+from app.db.user_sessions import decode_cursor, encode_cursor
+
+PASSWORD = "SecurePass123!"
+
+
+def _login(client, email, device, ip):
+    response = client.post(
+        "/auth/login",
+        json={"email": email, "password": PASSWORD, "device_label": device},
+        headers={"X-Forwarded-For": ip, "User-Agent": f"{device}-agent"},
+    )
+    assert response.status_code == 200
+    return response.json()
+
+
+def _signed_in(client, email="sessions@example.com", devices=("laptop", "phone")):
+    response = client.post(
+        "/auth/register",
+        json={
+            "email": email,
+            "password": PASSWORD,
+            "device_label": "signup",
+        },
+    )
+    assert response.status_code == 201
+    return [
+        _login(client, email, device, f"10.2.0.{i}") for i, device in enumerate(devices)
+    ]
+
+
+def _auth(tokens):
+    return {"Authorization": f"Bearer {tokens['access_token']}"}
+
+
+def _sessions(client, tokens):
+    return client.get("/users/me/sessions", headers=_auth(tokens)).json()["items"]
+
+
+def _refresh(client, tokens):
+    return client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+
+
+def test_lists_sessions_newest_first_with_keyset_pages(client, behind_proxy):
+    laptop, phone = _signed_in(client)
+
+    first = client.get("/users/me/sessions?limit=2", headers=_auth(phone)).json()
+    assert [s["device_label"] for s in first["items"]] == ["phone", "laptop"]
+    assert first["items"][0]["ip_address"] == "10.2.0.1"
+    assert first["items"][0]["user_agent"] == "phone-agent"
+    assert first["next_cursor"]
+
+    rest = client.get(
+        "/users/me/sessions",
+        params={"limit": 2, "cursor": first["next_cursor"]},
+        headers=_auth(phone),
+    ).json()
+    assert [s["device_label"] for s in rest["items"]] == ["signup"]
+    assert rest["next_cursor"] is None
+
+
+def test_session_ip_ignores_untrusted_forwarded_for(client):
+    _signed_in(client, devices=("laptop",))
+    tokens = _login(client, "sessions@example.com", "phone", "6.6.6.6")
+
+    items = _sessions(client, tokens)
+
+    assert {s["ip_address"] for s in items} == {"testclient"}
+
+
+def test_session_ip_is_client_behind_trusted_proxy(client, behind_proxy):
+    _signed_in(client, devices=())
+    tokens = _login(client, "sessions@example.com", "phone", "6.6.6.6, 198.51.100.7")
+
+    items = _sessions(client, tokens)
+
+    assert items[0]["ip_address"] == "198.51.100.7"
+
+
+def test_invalid_cursor_is_rejected(client):
+    _, phone = _signed_in(client)
+
+    response = client.get("/users/me/sessions?cursor=bogus", headers=_auth(phone))
+
+    assert response.status_code == 400
+
+
+def test_revoking_a_session_stops_only_its_refresh_token(client):
+    laptop, phone = _signed_in(client)
+    sessions = _sessions(client, phone)
+    laptop_id = next(s["id"] for s in sessions if s["device_label"] == "laptop")
+
+    response = client.delete(f"/users/me/sessions/{laptop_id}", headers=_auth(phone))
+    assert response.status_code == 200
+
+    assert _refresh(client, laptop).status_code == 401
+    assert _refresh(client, phone).status_code == 200
+    labels = [s["device_label"] for s in _sessions(client, phone)]
+    assert labels == ["phone", "signup"]
+
+    # Already revoked
+    response = client.delete(f"/users/me/sessions/{laptop_id}", headers=_auth(phone))
+    assert response.status_code == 404
+
+
+def test_cannot_revoke_another_users_session(client):
+    (mine,) = _signed_in(client, "mine@example.com", devices=("laptop",))
+    (theirs,) = _signed_in(client, "theirs@example.com", devices=("phone",))
+    their_id = _sessions(client, theirs)[0]["id"]
+
+    response = client.delete(f"/users/me/sessions/{their_id}", headers=_auth(mine))
+
+    assert response.status_code == 404
+
+
+def test_refresh_keeps_the_session(client, db_session):
+    (laptop,) = _signed_in(client, devices=("laptop",))
+
+    refreshed = _refresh(client, laptop)
+
+    assert refreshed.status_code == 200
+    sessions = _sessions(client, refreshed.json())
+    assert [s["device_label"] for s in sessions] == ["laptop", "signup"]
+    assert sessions[0]["last_used_at"] >= sessions[0]["created_at"]
+
+
+def test_logout_all_revokes_every_session(client, db_session):
+    laptop, phone = _signed_in(client)
+
+    response = client.post("/auth/logout-all", headers=_auth(phone))
+    assert response.status_code == 200
+
+    db_session.expire_all()
+    assert db_session.scalars(select(UserSession.revoked)).all() == [True, True, True]
+    assert _refresh(client, laptop).status_code == 401
+
+
+def test_logout_ends_the_session(client, db_session):
+    (laptop,) = _signed_in(client, devices=("laptop",))
+
+    client.post(
+        "/auth/logout",
+        json={"refresh_token": laptop["refresh_token"]},
+        headers=_auth(laptop),
+    )
+
+    db_session.expire_all()
+    revoked = dict(
+        db_session.execute(select(UserSession.device_label, UserSession.revoked)).all()
+    )
+    assert revoked == {"laptop": True, "signup": False}
+
+
+def test_cursor_round_trip():
+    session = UserSession(
+        id=uuid.uuid4(), created_at=datetime(2026, 3, 1, 12, 30, 15, 250)
+    )
+
+    assert decode_cursor(encode_cursor(session)) == (session.created_at, session.id)
+
+
+async def test_reaper_removes_revoked_and_idle_sessions(db_session, async_engine):
+    now = datetime(2026, 1, 15, 12, 0)
+    user = User(email="reap-sessions@example.com", password_hash="x")
+    db_session.add(user)
+    db_session.flush()
+    sessions = {
+        "live": UserSession(user_id=user.id, last_used_at=now, device_label="live"),
+        "revoked": UserSession(
+            user_id=user.id, last_used_at=now, revoked=True, device_label="revoked"
+        ),
+        "idle": UserSession(
+            user_id=user.id, last_used_at=now - timedelta(days=8), device_label="idle"
+        ),
+    }
+    db_session.add_all(sessions.values())
+    db_session.flush()
+    for name, session in sessions.items():
+        db_session.add(
+            RefreshToken(
+                user_id=user.id,
+                session_id=session.id,
+                token_hash=name,
+                expires_at=(
+                    now + timedelta(days=1)
+                    if name != "idle"
+                    else now - timedelta(days=1)
+                ),
+            )
+        )
+    db_session.commit()
+
+    assert await reap_refresh_tokens(async_engine, now=now) == 2
+    assert await reap_sessions(async_engine, timedelta(days=7), now=now) == 2
+
+    db_session.expire_all()
+    assert db_session.scalars(select(UserSession.device_label)).all() == ["live"]
+    assert db_session.scalars(select(RefreshToken.token_hash)).all() == ["live"]
@@ -0,0 +1,137 @@
+"""
+Tests for the write-behind queue of session and refresh-token writes.
+"""
+
+import asyncio
+import uuid
+from datetime import timedelta
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from app.core.security import refresh_token_digest
+from app.db.models import RefreshToken, UserSession, utc_now_naive
+from app.db.refresh_tokens import digest_columns
+from app.db.user_sessions import new_session
+from app.db.write_behind import RefreshTokenWriter
+
+
+def _rows(user_id, name):
+    session = new_session(user_id, device_label=name)
+    token = RefreshToken(
+        id=uuid.uuid4(),
+        user_id=user_id,
+        session_id=session.id,
+        expires_at=session.created_at + timedelta(days=1),
+        revoked=False,
+        created_at=session.created_at,
+        **digest_columns(refresh_token_digest(name)),
+    )
+    return session, token
+
+
+async def test_concurrent_writes_share_one_commit(user, db_session, async_engine):
+    writer = RefreshTokenWriter(async_engine, window=0.01)
+    writer.start()
+
+    await asyncio.gather(
+        *(writer.open_session(*_rows(user.id, f"d{i}")) for i in range(5))
+    )
+    await writer.stop()
+
+    assert writer.stats()["batches"] == 1
+    assert writer.stats()["writes"] == 5
+    labels = db_session.scalars(
+        select(UserSession.device_label).order_by(UserSession.device_label)
+    ).all()
+    assert labels == ["d0", "d1", "d2", "d3", "d4"]
+    assert len(db_session.scalars(select(RefreshToken)).all()) == 5
+
+
+async def test_async_mode_returns_before_commit_and_drains_on_stop(
+    user, db_session, async_engine
+):
+    writer = RefreshTokenWriter(async_engine, durable=False, window=10)
+    writer.start()
+
+    await writer.open_session(*_rows(user.id, "laptop"))
+    assert writer.stats()["pending"] == 1
+    assert db_session.scalars(select(UserSession)).all() == []
+
+    await writer.stop()
+    assert db_session.scalars(select(UserSession.device_label)).all() == ["laptop"]
+
+
+async def test_failed_batch_falls_back_to_single_writes(user, db_session, async_engine):
+    writer = RefreshTokenWriter(async_engine, window=0.01)
+    writer.start()
+
+    results = await asyncio.gather(
+        writer.open_session(*_rows(user.id, "good")),
+        writer.open_session(*_rows(uuid.uuid4(), "orphan")),
+        return_exceptions=True,
+    )
+    await writer.stop()
+
+    assert results[0] is None
+    assert isinstance(results[1], IntegrityError)
+    assert writer.stats()["fallbacks"] == 1
+    assert db_session.scalars(select(UserSession.device_label)).all() == ["good"]
+
+
+async def test_revocations_and_touches_are_coalesced(user, db_session, async_engine):
+    writer = RefreshTokenWriter(async_engine, window=0.01)
+    rows = [_rows(user.id, name) for name in ("a", "b")]
+    for session, token in rows:
+        await writer.open_session(session, token)
+    later = utc_now_naive() + timedelta(minutes=5)
+    writer.start()
+
+    await asyncio.gather(
+        writer.revoke(refresh_token_digest("a")),
+        writer.touch_session(rows[1][0].id, later - timedelta(minutes=1)),
+        writer.touch_session(rows[1][0].id, later),
+    )
+    await writer.stop()
+
+    assert writer.stats()["batches"] == 3
+    db_session.expire_all()
+    sessions = {s.device_label: s for s in db_session.scalars(select(UserSession))}
+    assert sessions["a"].revoked and not sessions["b"].revoked
+    assert sessions["b"].last_used_at == later
+    revoked = dict(
+        db_session.execute(select(RefreshToken.session_id, RefreshToken.revoked)).all()
+    )
+    assert revoked == {rows[0][0].id: True, rows[1][0].id: False}
+
+
+def test_routes_use_the_writer(client, db_session, async_engine):
+    from app.main import app
+
+    writer = RefreshTokenWriter(async_engine, window=0.001)
+    client.portal.call(writer.start)
+    app.state.token_writer = writer
+    try:
+        tokens = client.post(
+            "/auth/register",
+            json={
+                "email": "queued@example.com",
+                "password": "SecurePass123!",
+            },
+        ).json()
+        refreshed = client.post(
+            "/auth/refresh", json={"refresh_token": tokens["refresh_token"]}
+        )
+        assert refreshed.status_code == 200
+        client.post(
+            "/auth/logout",
+            json={"refresh_token": refreshed.json()["refresh_token"]},
+            headers={"Authorization": f"Bearer {refreshed.json()['access_token']}"},
+        )
+    finally:
+        client.portal.call(writer.stop)
+
+    # Register commits its own transaction; refresh and logout are queued
+    assert writer.stats()["writes"] == 2
+    db_session.expire_all()
+    assert db_session.scalars(select(UserSession.revoked)).all() == [True]